@@ -0,0 +1,366 @@
+# core/audio_cache.py
+# Cache su disco dell'audio decodificato: ogni file (MP3, FLAC, WAV...) viene decodificato
+# una sola volta in un file PCM float32 (.npy) identificato dall'hash del contenuto.
+# Le tracce con frequenza diversa da quella del brano vengono ricampionate una sola
+# volta in una voce separata (hash + frequenza di destinazione).
+# In riproduzione il PCM viene aperto con np.memmap: seek e letture sono semplici
+# slice di memoria e il caricamento delle pagine è lasciato alla page cache del sistema.
+
+import hashlib
+import json
+import os
+import queue
+import threading
+import time
+import numpy as np
+import soundfile as sf
+from core.audio_resample import Ricampionatore, ricampiona_in
+
+# Limite di default della cache su disco (MB)
+DEFAULT_CACHE_MAX_MB = 4096
+# Frame decodificati per ogni lettura durante la creazione del PCM
+DECODE_CHUNK_FRAMES = 65536
+# Dimensione dei blocchi letti per calcolare l'hash del contenuto
+HASH_CHUNK_BYTES = 1 << 20
+# Intervallo massimo (s) tra una modifica dell'indice (es. ultimo accesso) e la sua scrittura su disco
+INDEX_FLUSH_S = 30.0
+
+
+class CachePCM:
+    """
+    Cache LRU di file PCM decodificati, con limite di dimensione.
+
+    L'indice (index.json) conserva, per ogni hash, dimensione, samplerate e ultimo
+    accesso; per ogni percorso sorgente, la firma (dimensione, mtime) e l'hash
+    calcolato, così il contenuto viene riletto solo quando il file cambia.
+    La decodifica avviene in un thread dedicato (richiedi) o su richiesta (prepara).
+
+    [MODIFICATO] 'ottieni' non calcola hash e non scrive su disco (è chiamata da avvio e
+    seek): l'hash dei file nuovi o modificati viene calcolato solo dal thread della cache,
+    e l'indice modificato viene scritto da quel thread a intervalli o con 'salva_indice'.
+    """
+    def __init__(self, cache_dir: str, max_mb: int = DEFAULT_CACHE_MAX_MB):
+        self.cache_dir = cache_dir
+        self.max_bytes = int(max_mb) * 1024 * 1024
+        self.index_path = os.path.join(cache_dir, "index.json")
+        os.makedirs(cache_dir, exist_ok=True)
+
+        self._lock = threading.RLock()
+        self._index = {"voci": {}, "sorgenti": {}}
+        self._indice_modificato = False
+        self._carica_indice()
+
+        self._coda = queue.Queue()
+        self._in_coda = set()
+        self._worker = None
+
+    # -------------------------------------------------------------
+    # INDICE
+    # -------------------------------------------------------------
+
+    def _carica_indice(self):
+        if not os.path.exists(self.index_path):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            self._index["voci"] = data.get("voci", {})
+            self._index["sorgenti"] = data.get("sorgenti", {})
+        except (json.JSONDecodeError, OSError) as e:
+            print(f"Errore lettura indice cache PCM: {e}. La cache verrà ricostruita.")
+
+        # Scarta le voci il cui file PCM non esiste più
+        self._index["voci"] = {
+            h: voce for h, voce in self._index["voci"].items() if os.path.exists(self._percorso_pcm(h))
+        }
+
+    def salva_indice(self):
+        """Scrive l'indice su disco se è stato modificato (es. alla chiusura dell'applicazione)."""
+        with self._lock:
+            if self._indice_modificato:
+                self._salva_indice()
+
+    def _salva_indice(self):
+        self._indice_modificato = False
+        try:
+            tmp_path = self.index_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._index, f, indent=2)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            print(f"Errore salvataggio indice cache PCM: {e}")
+
+    def _percorso_pcm(self, chiave: str) -> str:
+        return os.path.join(self.cache_dir, f"{chiave}.npy")
+
+    @staticmethod
+    def _chiave_ricampionata(chiave: str, samplerate: int) -> str:
+        return f"{chiave}_{int(samplerate)}"
+
+    def set_limite_mb(self, max_mb: int):
+        """Imposta il limite della cache (MB) ed elimina le voci in eccesso."""
+        self.max_bytes = max(0, int(max_mb)) * 1024 * 1024
+        with self._lock:
+            self._applica_limite()
+            self._salva_indice()
+
+    # -------------------------------------------------------------
+    # HASH DEL CONTENUTO
+    # -------------------------------------------------------------
+
+    @staticmethod
+    def _firma(file_path: str) -> list | None:
+        try:
+            stat = os.stat(file_path)
+        except OSError:
+            return None
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def chiave_nota(self, file_path: str) -> str | None:
+        """Hash già calcolato per il file, se dimensione e mtime non sono cambiati (non legge il contenuto)."""
+        firma = self._firma(file_path)
+        if firma is None:
+            return None
+        with self._lock:
+            sorgente = self._index["sorgenti"].get(file_path)
+            if sorgente and sorgente.get("firma") == firma:
+                return sorgente["hash"]
+        return None
+
+    def chiave(self, file_path: str) -> str | None:
+        """
+        Hash del contenuto del file (ricalcolato solo se dimensione o mtime cambiano).
+        Può leggere tutto il file: usare solo fuori dalla UI (thread della cache o worker).
+        """
+        firma = self._firma(file_path)
+        if firma is None:
+            return None
+        with self._lock:
+            sorgente = self._index["sorgenti"].get(file_path)
+            if sorgente and sorgente.get("firma") == firma:
+                return sorgente["hash"]
+
+        digest = hashlib.blake2b(digest_size=16)
+        try:
+            with open(file_path, "rb") as f:
+                for blocco in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+                    digest.update(blocco)
+        except OSError as e:
+            print(f"Errore calcolo hash {file_path}: {e}")
+            return None
+
+        chiave = digest.hexdigest()
+        with self._lock:
+            self._index["sorgenti"][file_path] = {"firma": firma, "hash": chiave}
+            self._indice_modificato = True
+        return chiave
+
+    # -------------------------------------------------------------
+    # ACCESSO E DECODIFICA
+    # -------------------------------------------------------------
+
+    def ottieni(self, file_path: str, samplerate: int | None = None) -> tuple[np.ndarray, int] | None:
+        """
+        Restituisce (pcm, samplerate) se il file è già in cache, altrimenti None.
+        'pcm' è un np.memmap in sola lettura (frame x canali, float32).
+        [MODIFICATO] Con 'samplerate' restituisce solo un PCM a quella frequenza
+        (l'originale o la sua versione ricampionata). Un file mai visto o modificato
+        risulta non in cache finché il thread della cache non ne ha calcolato l'hash.
+        """
+        chiave = self.chiave_nota(file_path)
+        if chiave is None:
+            return None
+        with self._lock:
+            voce = self._index["voci"].get(chiave)
+            if samplerate and voce is not None and voce["samplerate"] != samplerate:
+                chiave = self._chiave_ricampionata(chiave, samplerate)
+                voce = self._index["voci"].get(chiave)
+            if voce is None:
+                return None
+            # Solo in memoria: l'indice viene scritto dal thread della cache o da salva_indice
+            voce["ultimo_accesso"] = time.time()
+            self._indice_modificato = True
+        try:
+            return np.load(self._percorso_pcm(chiave), mmap_mode='r'), voce["samplerate"]
+        except (OSError, ValueError) as e:
+            print(f"Errore apertura PCM in cache per {file_path}: {e}")
+            with self._lock:
+                self._index["voci"].pop(chiave, None)
+                self._indice_modificato = True
+            return None
+
+    def prepara(self, file_path: str, samplerate: int | None = None) -> bool:
+        """
+        Decodifica il file nella cache (se non è già presente). Bloccante: usare fuori dalla UI.
+        [MODIFICATO] Con 'samplerate' diverso da quello del file crea anche la versione ricampionata.
+        """
+        chiave = self.chiave(file_path)
+        if chiave is None:
+            return False
+        if not self._decodifica(file_path, chiave):
+            return False
+        if samplerate:
+            return self._ricampiona(file_path, chiave, int(samplerate))
+        return True
+
+    def _decodifica(self, file_path: str, chiave: str) -> bool:
+        with self._lock:
+            if chiave in self._index["voci"]:
+                return True
+
+        pcm_path = self._percorso_pcm(chiave)
+        tmp_path = pcm_path + ".tmp.npy"
+        try:
+            with sf.SoundFile(file_path, 'r') as f:
+                samplerate = f.samplerate
+                pcm = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                                shape=(max(0, f.frames), f.channels))
+                pos = 0
+                while pos < len(pcm):
+                    letti = f.read(min(DECODE_CHUNK_FRAMES, len(pcm) - pos), dtype='float32',
+                                   always_2d=True, out=pcm[pos:pos + DECODE_CHUNK_FRAMES])
+                    if len(letti) == 0:
+                        break
+                    pos += len(letti)
+                pcm.flush()
+                del pcm
+            if pos == 0:
+                os.remove(tmp_path)
+                return False
+            os.replace(tmp_path, pcm_path)
+        except Exception as e:
+            print(f"Errore decodifica in cache di {file_path}: {e}")
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return False
+
+        with self._lock:
+            self._index["voci"][chiave] = {
+                "size": os.path.getsize(pcm_path),
+                "samplerate": samplerate,
+                "ultimo_accesso": time.time()
+            }
+            self._applica_limite(proteggi=chiave)
+            self._salva_indice()
+        print(f"Audio decodificato in cache: {os.path.basename(file_path)}")
+        return True
+
+    def _ricampiona(self, file_path: str, chiave: str, samplerate: int) -> bool:
+        """Crea (una volta) la voce ricampionata a 'samplerate' a partire dal PCM originale in cache."""
+        with self._lock:
+            voce = self._index["voci"].get(chiave)
+            if voce is None:
+                return False
+            sr_originale = voce["samplerate"]
+            chiave_rs = self._chiave_ricampionata(chiave, samplerate)
+            if sr_originale == samplerate or chiave_rs in self._index["voci"]:
+                return True
+
+        pcm_path = self._percorso_pcm(chiave_rs)
+        tmp_path = pcm_path + ".tmp.npy"
+        try:
+            sorgente = np.load(self._percorso_pcm(chiave), mmap_mode='r')
+            frames = Ricampionatore(sr_originale, samplerate, sorgente.shape[1]).frame_uscita(len(sorgente))
+            pcm = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                            shape=(frames, sorgente.shape[1]))
+            ricampiona_in(sorgente, pcm, sr_originale, samplerate)
+            pcm.flush()
+            del pcm, sorgente
+            os.replace(tmp_path, pcm_path)
+        except Exception as e:
+            print(f"Errore ricampionamento in cache di {file_path}: {e}")
+            if os.path.exists(tmp_path):
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+            return False
+
+        with self._lock:
+            self._index["voci"][chiave_rs] = {
+                "size": os.path.getsize(pcm_path),
+                "samplerate": samplerate,
+                "ultimo_accesso": time.time()
+            }
+            self._applica_limite(proteggi=chiave_rs)
+            self._salva_indice()
+        print(f"Audio ricampionato in cache ({sr_originale} -> {samplerate} Hz): {os.path.basename(file_path)}")
+        return True
+
+    def richiedi(self, file_path: str, samplerate: int | None = None, riferimento: str | None = None):
+        """
+        Accoda la decodifica (ed eventuale ricampionamento) del file nel thread della cache (non bloccante).
+        Con 'riferimento' la frequenza di destinazione è quella di quel file, letta dal thread.
+        """
+        if not file_path:
+            return
+        richiesta = (file_path, samplerate, riferimento)
+        with self._lock:
+            if richiesta in self._in_coda:
+                return
+            self._in_coda.add(richiesta)
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(target=self._loop_worker, daemon=True)
+                self._worker.start()
+        self._coda.put(richiesta)
+
+    def richiedi_brano(self, file_paths: list[str]):
+        """
+        [NUOVO] Accoda tutte le tracce di un brano alla frequenza della traccia 0
+        (quella dello stream in riproduzione), letta dal thread della cache.
+        """
+        file_paths = [f for f in file_paths if f]
+        for file_path in file_paths:
+            self.richiedi(file_path, riferimento=file_paths[0])
+
+    def _loop_worker(self):
+        while True:
+            try:
+                richiesta = self._coda.get(timeout=INDEX_FLUSH_S)
+            except queue.Empty:
+                self.salva_indice()
+                continue
+            file_path, samplerate, riferimento = richiesta
+            try:
+                if samplerate is None and riferimento:
+                    try:
+                        samplerate = sf.info(riferimento).samplerate
+                    except Exception:
+                        samplerate = None
+                self.prepara(file_path, samplerate)
+            finally:
+                with self._lock:
+                    self._in_coda.discard(richiesta)
+                if self._coda.empty():
+                    self.salva_indice()
+
+    # -------------------------------------------------------------
+    # LIMITE E SFRATTO LRU
+    # -------------------------------------------------------------
+
+    def dimensione_totale(self) -> int:
+        with self._lock:
+            return sum(voce.get("size", 0) for voce in self._index["voci"].values())
+
+    def _applica_limite(self, proteggi: str | None = None):
+        """Elimina le voci usate meno di recente finché la cache rientra nel limite."""
+        totale = sum(voce.get("size", 0) for voce in self._index["voci"].values())
+        lru = sorted(self._index["voci"].items(), key=lambda kv: kv[1].get("ultimo_accesso", 0.0))
+        for chiave, voce in lru:
+            if totale <= self.max_bytes:
+                break
+            if chiave == proteggi:
+                continue
+            try:
+                os.remove(self._percorso_pcm(chiave))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                # Es. file ancora mappato in riproduzione (Windows): verrà rimosso in seguito
+                print(f"Cache PCM: impossibile eliminare {chiave}: {e}")
+                continue
+            self._index["voci"].pop(chiave, None)
+            totale -= voce.get("size", 0)
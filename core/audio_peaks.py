@@ -0,0 +1,158 @@
+# core/audio_peaks.py
+# Indice dei picchi (waveform) di una traccia audio: min/max per blocchi di campioni a
+# più livelli di zoom, salvato in un file .peaks.npz accanto al file audio nella cartella
+# del brano. Permette di disegnare la forma d'onda di tracce lunghe senza decodificarle.
+
+import os
+import numpy as np
+import soundfile as sf
+
+# Campioni per blocco del livello più dettagliato
+PEAKS_BASE_FRAMES = 256
+# Fattore di riduzione tra due livelli consecutivi
+PEAKS_LEVEL_FACTOR = 4
+# Numero di livelli di zoom (256, 1024, 4096, 16384, 65536 campioni per blocco)
+PEAKS_LEVELS = 5
+# Frame letti per ogni blocco durante la creazione (multiplo di PEAKS_BASE_FRAMES)
+PEAKS_READ_FRAMES = PEAKS_BASE_FRAMES * 1024
+# Scala di quantizzazione dei picchi (int8)
+PEAKS_SCALE = 127.0
+# Estensione del file indice
+PEAKS_EXTENSION = ".peaks.npz"
+
+
+def percorso_indice(file_path: str) -> str:
+    """Percorso del file indice associato a un file audio."""
+    return file_path + PEAKS_EXTENSION
+
+
+class IndicePicchi:
+    """
+    Picchi min/max (int8, mono: inviluppo di tutti i canali) a più livelli di zoom.
+    'livelli[i]' è un array (blocchi x 2) con PEAKS_BASE_FRAMES * PEAKS_LEVEL_FACTOR**i
+    campioni per blocco. 'hash' è l'hash del contenuto del file da cui è stato creato.
+    """
+    def __init__(self, livelli: list[np.ndarray], samplerate: int, frames: int, hash_file: str):
+        self.livelli = livelli
+        self.samplerate = samplerate
+        self.frames = frames
+        self.hash = hash_file
+
+    @property
+    def durata(self) -> float:
+        return self.frames / self.samplerate if self.samplerate else 0.0
+
+    @staticmethod
+    def frames_per_blocco(livello: int) -> int:
+        return PEAKS_BASE_FRAMES * PEAKS_LEVEL_FACTOR ** livello
+
+    def picchi(self, inizio_s: float, fine_s: float, colonne: int) -> np.ndarray:
+        """
+        Restituisce (colonne x 2) valori min/max in [-1, 1] per l'intervallo indicato,
+        usando il livello più grossolano che ha ancora almeno due blocchi per colonna
+        (i bordi delle colonne sono arrotondati al blocco, la fine dell'ultima per eccesso).
+        """
+        colonne = max(1, int(colonne))
+        if not self.samplerate or fine_s <= inizio_s:
+            return np.zeros((colonne, 2), dtype=np.float32)
+
+        frame_inizio = max(0, int(inizio_s * self.samplerate))
+        frame_fine = max(frame_inizio + 1, int(fine_s * self.samplerate))
+        frames_colonna = (frame_fine - frame_inizio) / colonne
+
+        livello = 0
+        while (livello + 1 < len(self.livelli)
+               and self.frames_per_blocco(livello + 1) * 2 <= frames_colonna):
+            livello += 1
+        dati = self.livelli[livello]
+        passo = self.frames_per_blocco(livello)
+
+        # Blocco di partenza di ogni colonna; le colonne oltre la fine del file restano a zero
+        limiti = (frame_inizio + np.arange(colonne + 1) * frames_colonna) // passo
+        limiti = np.minimum(limiti.astype(np.int64), len(dati))
+        # La fine dell'ultima colonna è arrotondata per eccesso: include il blocco parziale finale
+        limiti[-1] = min(len(dati), -(-frame_fine // passo))
+        risultato = np.zeros((colonne, 2), dtype=np.float32)
+        validi = limiti[:-1] < len(dati)
+        if np.any(validi):
+            inizi = limiti[:-1][validi]
+            # reduceat: ogni colonna va dal suo blocco iniziale a quello della colonna successiva
+            sezione = dati[:max(limiti[-1], inizi[-1] + 1)]
+            risultato[validi, 0] = np.minimum.reduceat(sezione[:, 0], inizi) / PEAKS_SCALE
+            risultato[validi, 1] = np.maximum.reduceat(sezione[:, 1], inizi) / PEAKS_SCALE
+        return risultato
+
+    # -------------------------------------------------------------
+    # PERSISTENZA
+    # -------------------------------------------------------------
+
+    def salva(self, path: str):
+        tmp_path = path + ".tmp.npz"
+        arrays = {f"livello_{i}": livello for i, livello in enumerate(self.livelli)}
+        np.savez(tmp_path, samplerate=self.samplerate, frames=self.frames, hash=self.hash, **arrays)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def carica(cls, path: str) -> "IndicePicchi | None":
+        try:
+            with np.load(path) as data:
+                numero = sum(1 for k in data.files if k.startswith("livello_"))
+                livelli = [data[f"livello_{i}"] for i in range(numero)]
+                return cls(livelli, int(data["samplerate"]), int(data["frames"]), str(data["hash"]))
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Errore lettura indice picchi {path}: {e}")
+            return None
+
+
+def crea_indice(file_path: str, hash_file: str, pcm: np.ndarray | None = None,
+                pcm_samplerate: int = 0) -> IndicePicchi | None:
+    """
+    Calcola l'indice dei picchi di un file audio, leggendo il PCM in cache se disponibile
+    (np.memmap) oppure decodificando il file a blocchi. Bloccante: usare fuori dalla UI.
+    """
+    blocchi_min, blocchi_max = [], []
+    frames = 0
+
+    def _accumula(blocco: np.ndarray):
+        nonlocal frames
+        frames += len(blocco)
+        n = -(-len(blocco) // PEAKS_BASE_FRAMES)
+        pad = n * PEAKS_BASE_FRAMES - len(blocco)
+        if pad:
+            # Padding con l'ultimo campione: non altera min/max dell'ultimo blocco
+            blocco = np.concatenate([blocco, np.repeat(blocco[-1:], pad, axis=0)])
+        gruppi = blocco.reshape(n, PEAKS_BASE_FRAMES * blocco.shape[1])
+        blocchi_min.append(gruppi.min(axis=1))
+        blocchi_max.append(gruppi.max(axis=1))
+
+    try:
+        if pcm is not None:
+            samplerate = pcm_samplerate
+            for inizio in range(0, len(pcm), PEAKS_READ_FRAMES):
+                _accumula(np.asarray(pcm[inizio:inizio + PEAKS_READ_FRAMES]))
+        else:
+            with sf.SoundFile(file_path, 'r') as f:
+                samplerate = f.samplerate
+                for blocco in f.blocks(blocksize=PEAKS_READ_FRAMES, dtype='float32', always_2d=True):
+                    _accumula(blocco)
+    except Exception as e:
+        print(f"Errore creazione indice picchi di {file_path}: {e}")
+        return None
+
+    if not blocchi_min:
+        return None
+    base = np.stack([np.concatenate(blocchi_min), np.concatenate(blocchi_max)], axis=1)
+    base = np.clip(np.round(base * PEAKS_SCALE), -PEAKS_SCALE, PEAKS_SCALE).astype(np.int8)
+
+    livelli = [base]
+    for _ in range(1, PEAKS_LEVELS):
+        precedente = livelli[-1]
+        n = -(-len(precedente) // PEAKS_LEVEL_FACTOR)
+        pad = n * PEAKS_LEVEL_FACTOR - len(precedente)
+        if pad:
+            # Padding con l'ultimo blocco: non altera min/max
+            precedente = np.concatenate([precedente, np.repeat(precedente[-1:], pad, axis=0)])
+        gruppi = precedente.reshape(n, PEAKS_LEVEL_FACTOR, 2)
+        livelli.append(np.stack([gruppi[:, :, 0].min(axis=1), gruppi[:, :, 1].max(axis=1)], axis=1))
+
+    return IndicePicchi(livelli, samplerate, frames, hash_file)
@@ -0,0 +1,114 @@
+# core/audio_resample.py
+# Conversione della frequenza di campionamento con un filtro polifase (sinc finestrato
+# Kaiser) in NumPy. Usato dalla cache PCM (conversione una tantum su disco) e dal
+# thread di decodifica per le tracce non ancora in cache: il callback copia solo campioni.
+
+import math
+import numpy as np
+
+# Semi-lunghezza del filtro (campioni di ingresso per lato, prima dello scaling in downsampling)
+SEMI_TAPS = 16
+# Frazione della banda di Nyquist conservata (il resto è la banda di transizione)
+ROLLOFF = 0.94
+# Parametro beta della finestra di Kaiser (attenuazione in banda oscura ~80 dB)
+KAISER_BETA = 8.6
+# Fasi massime della tabella dei coefficienti (oltre, la fase viene quantizzata)
+MAX_FASI = 1024
+
+
+class Ricampionatore:
+    """
+    Ricampionatore polifase a rapporto razionale (sr_out / sr_in = up / down) in streaming.
+
+    'elabora' accetta blocchi consecutivi di ingresso (frame x canali) e restituisce i
+    frame di uscita già calcolabili; gli ultimi campioni di ingresso restano in una
+    breve storia finché il filtro non ha abbastanza contesto a destra. Con fine=True
+    la coda viene completata con zeri e viene emessa tutta l'uscita rimanente.
+    Le posizioni sono calcolate in aritmetica intera: nessuna deriva su file lunghi.
+    """
+    def __init__(self, sr_in: int, sr_out: int, canali: int):
+        g = math.gcd(int(sr_in), int(sr_out))
+        self.up = int(sr_out) // g
+        self.down = int(sr_in) // g
+        self.canali = max(1, int(canali))
+
+        # In downsampling la banda passante si restringe e il filtro si allunga in proporzione
+        fc = ROLLOFF * min(1.0, self.up / self.down)
+        self.semi = int(math.ceil(SEMI_TAPS / min(1.0, self.up / self.down)))
+        self._offsets = np.arange(-self.semi + 1, self.semi + 1)
+        self.fasi = min(self.up, MAX_FASI)
+        self._tabella = self._crea_tabella(fc)
+
+        self.reset()
+
+    def _crea_tabella(self, fc: float) -> np.ndarray:
+        """Coefficienti per ogni fase (fasi x 2*semi), normalizzati a guadagno unitario in continua."""
+        frazioni = np.arange(self.fasi)[:, None] / self.fasi
+        u = frazioni - self._offsets[None, :]                     # Distanza (in campioni di ingresso) dal punto di uscita
+        finestra = np.i0(KAISER_BETA * np.sqrt(np.clip(1.0 - (u / self.semi) ** 2, 0.0, 1.0))) / np.i0(KAISER_BETA)
+        tabella = fc * np.sinc(fc * u) * finestra
+        tabella /= tabella.sum(axis=1, keepdims=True)
+        return tabella.astype(np.float32)
+
+    def reset(self):
+        """Riparte da zero (nuovo file o seek): la storia iniziale è silenzio."""
+        self._storia = np.zeros((self.semi, self.canali), dtype=np.float32)
+        self._base = -self.semi     # Indice di ingresso del primo frame in storia
+        self._uscita = 0            # Indice del prossimo frame di uscita
+        self._ingresso = 0          # Frame di ingresso ricevuti
+
+    def frame_uscita(self, frame_ingresso: int) -> int:
+        """Numero di frame di uscita corrispondenti a 'frame_ingresso' frame di ingresso."""
+        return -(-int(frame_ingresso) * self.up // self.down)
+
+    def frame_ingresso(self, frame_uscita: int) -> int:
+        """Frame di ingresso corrispondente al frame di uscita indicato (per il seek)."""
+        return int(frame_uscita) * self.down // self.up
+
+    def elabora(self, blocco: np.ndarray, fine: bool = False) -> np.ndarray:
+        """Accoda 'blocco' (frame x canali, float32) e restituisce i frame di uscita pronti."""
+        self._ingresso += len(blocco)
+        parti = [self._storia, blocco]
+        if fine:
+            parti.append(np.zeros((self.semi, self.canali), dtype=np.float32))
+        buf = np.concatenate(parti) if len(blocco) or fine else self._storia
+        fine_buf = self._base + len(buf)
+
+        # Ultimo frame calcolabile: serve contesto fino a n + semi
+        m_fine = ((fine_buf - self.semi) * self.up + self.down - 1) // self.down
+        if fine:
+            m_fine = min(m_fine, self.frame_uscita(self._ingresso))
+        m_fine = max(m_fine, self._uscita)
+
+        m = np.arange(self._uscita, m_fine, dtype=np.int64)
+        posizioni = m * self.down
+        n = posizioni // self.up
+        fasi = (posizioni % self.up) * self.fasi // self.up
+        indici = n[:, None] + self._offsets[None, :] - self._base
+        uscita = np.einsum('mk,mkc->mc', self._tabella[fasi], buf[indici]).astype(np.float32, copy=False)
+
+        # Conserva solo il contesto necessario al prossimo frame di uscita
+        self._uscita = m_fine
+        primo_necessario = (self._uscita * self.down) // self.up - self.semi + 1
+        taglio = max(0, min(len(buf), primo_necessario - self._base))
+        self._storia = buf[taglio:].copy()
+        self._base += taglio
+        return uscita
+
+
+def ricampiona_in(sorgente: np.ndarray, destinazione: np.ndarray, sr_in: int, sr_out: int,
+                  blocco_frames: int = 16384) -> int:
+    """
+    Ricampiona tutto 'sorgente' (frame x canali) in 'destinazione' (es. un memmap di
+    lunghezza frame_uscita(len(sorgente))) a blocchi. Restituisce i frame scritti.
+    """
+    ricampionatore = Ricampionatore(sr_in, sr_out, sorgente.shape[1])
+    scritti = 0
+    for inizio in range(0, len(sorgente), blocco_frames):
+        blocco = np.asarray(sorgente[inizio:inizio + blocco_frames], dtype=np.float32)
+        fine = inizio + blocco_frames >= len(sorgente)
+        uscita = ricampionatore.elabora(blocco, fine=fine)
+        n = min(len(uscita), len(destinazione) - scritti)
+        destinazione[scritti:scritti + n] = uscita[:n]
+        scritti += n
+    return scritti
@@ -7,8 +7,12 @@ import json
 import os
 from pathlib import Path
 import shutil 
-from core.dmx_models import FixtureModello, CanaleDMX, Scena, Chaser, PassoChaser
+import threading
+from core.dmx_models import FixtureModello, CanaleDMX, Scena, Chaser, PassoChaser, UNITA_SECONDI
 from core.project_models import Progetto, UniversoStato, IstanzaFixtureStato, MidiMapping
+from core.dmx_cues import TracciaCueDMX
+from core.audio_cache import CachePCM
+from core.audio_peaks import IndicePicchi, crea_indice, percorso_indice
 
 # --- DMX / Project Constants ---
 DATA_PATH = Path(__file__).parent.parent / "data"
@@ -17,6 +21,8 @@ PROJECT_FILE = DATA_PATH / "project.json"
 
 # [NUOVO] Costante per la porta interna (deve essere lo stesso di song_editor_widget.py)
 INTERNAL_DMX_PORT = "INTERNAL_DMX_PORT_TRIGGER" 
+# [NUOVO] Guadagno di default (dB) di una nuova traccia audio (deve essere lo stesso di audio_engine.py)
+DEFAULT_TRACK_GAIN_DB = -6.0
 
 class DataManager:
     """
@@ -39,6 +45,14 @@ class DataManager:
         self.audio_tracks = {}
         self.midi_tracks = {}
         self.lyrics = {}
+        self.dmx_cues = {} # { song: [ {time, type, target, value, fade} ] }
+
+        # [NUOVO] Cache su disco dell'audio decodificato (PCM float32 in memmap)
+        self.pcm_cache = CachePCM(os.path.join(self.base_dir, "cache", "pcm"))
+        # [NUOVO] Indici dei picchi (waveform) caricati: {file_audio: IndicePicchi}
+        self._indici_picchi = {}
+        self._picchi_in_corso = set()
+        self._picchi_lock = threading.Lock()
         
     # =============================================================
     # --- DMX / PROJECT / FIXTURE MODELS MANAGEMENT (STATIC) ---
@@ -136,7 +150,10 @@ class DataManager:
                                     'tempo_fade_out': p.tempo_fade_out
                                 }
                                 for p in c.passi
-                            ]
+                            ],
+                            'unita_tempo': c.unita_tempo,
+                            'sync_audio': c.sync_audio,
+                            'battiti_per_battuta': c.battiti_per_battuta
                         }
                         for c in u_stato.chasers
                     ],
@@ -216,7 +233,13 @@ class DataManager:
                             tempo_fade_out=p_data.get('tempo_fade_out', 0.0)
                         ))
                 if passi: 
-                    chasers_list.append(Chaser(nome=c_data.get('nome', "Sequenza Senza Nome"), passi=passi))
+                    chasers_list.append(Chaser(
+                        nome=c_data.get('nome', "Sequenza Senza Nome"), 
+                        passi=passi,
+                        unita_tempo=c_data.get('unita_tempo', UNITA_SECONDI),
+                        sync_audio=c_data.get('sync_audio', False),
+                        battiti_per_battuta=c_data.get('battiti_per_battuta', 4)
+                    ))
 
             # Ricostruzione midi mappings
             midi_mappings_list = [
@@ -292,12 +315,13 @@ class DataManager:
         if os.path.exists(path):
             return False
         # Aggiunta la chiave "video_file"
-        data = {"name": name, "audio_tracks": [], "midi_tracks": [], "video_file": None, "lyrics": [], "lyrics_txt": None}
+        data = {"name": name, "audio_tracks": [], "midi_tracks": [], "video_file": None, "lyrics": [], "lyrics_txt": None, "dmx_cues": []}
         with open(path, "w", encoding="utf-8") as f:
             json.dump(data, f, indent=2)
         self.audio_tracks[name] = []
         self.midi_tracks[name] = []
         self.lyrics[name] = []
+        self.dmx_cues[name] = []
         return True
 
     def load_song(self, name):
@@ -315,6 +339,10 @@ class DataManager:
         self.audio_tracks[name] = data.get("audio_tracks", [])
         self.midi_tracks[name] = data.get("midi_tracks", [])
         self.lyrics[name] = data.get("lyrics", [])
+        self.dmx_cues[name] = data.get("dmx_cues", [])
+
+        # [NUOVO] Decodifica in background le tracce non ancora presenti nella cache PCM
+        self.pcm_cache.richiedi_brano([track.get("file") for track in self.audio_tracks[name]])
         # Il campo video_file viene caricato e rimane nel dizionario data
         
         if "video_file" not in data:
@@ -338,6 +366,7 @@ class DataManager:
                          file_content = json.load(f)
                          current_metadata["video_file"] = file_content.get("video_file", None)
                          current_metadata["lyrics_txt"] = file_content.get("lyrics_txt", None)
+                         current_metadata["dmx_cues"] = file_content.get("dmx_cues", [])
                      except json.JSONDecodeError:
                           pass
 
@@ -349,7 +378,8 @@ class DataManager:
                 "midi_tracks": self.midi_tracks.get(name, []),   
                 "video_file": current_metadata.get("video_file", None),
                 "lyrics": self.lyrics.get(name, []),              
-                "lyrics_txt": current_metadata.get("lyrics_txt", None)
+                "lyrics_txt": current_metadata.get("lyrics_txt", None),
+                "dmx_cues": self.dmx_cues.get(name, current_metadata.get("dmx_cues", []))
             }
         
         # [ORIGINAL CODE - UPDATE CACHE IF 'data' ARGUMENT IS PROVIDED]
@@ -359,6 +389,8 @@ class DataManager:
             self.midi_tracks[name] = data["midi_tracks"]
         if "lyrics" in data:
             self.lyrics[name] = data["lyrics"]
+        if "dmx_cues" in data:
+            self.dmx_cues[name] = data["dmx_cues"]
 
         try:
             with open(path, "w", encoding="utf-8") as f:
@@ -385,6 +417,7 @@ class DataManager:
         self.audio_tracks.pop(name, None)
         self.midi_tracks.pop(name, None)
         self.lyrics.pop(name, None)
+        self.dmx_cues.pop(name, None)
 
     # --- NUOVI METODI VIDEO ---
     def set_video_file(self, song_name: str, file_path: str | None):
@@ -420,9 +453,14 @@ class DataManager:
             "channels": channels,         
             "channels_used": channels_used, 
             "output_start_channel": output_start_channel, 
-            "bpm": bpm 
+            "bpm": bpm,
+            "gain_db": DEFAULT_TRACK_GAIN_DB,
+            "mute": False,
+            "solo": False
         })
         self.save_song(song_name)
+        self.pcm_cache.richiedi_brano([track.get("file") for track in self.audio_tracks[song_name]])
+        self.richiedi_indice_picchi(new_file_path)
 
     def remove_audio_track(self, song_name, index):
         """Rimuove una traccia audio dall'array in cache."""
@@ -453,6 +491,77 @@ class DataManager:
             self.save_song(song_name, song_data)
 
 
+    def update_audio_track_mix(self, song_name, index, gain_db=None, mute=None, solo=None, salva=True):
+        """
+        [NUOVO] Aggiorna guadagno (dB), mute e solo di una traccia audio e salva il brano.
+        Con salva=False aggiorna solo i dati in memoria (il chiamante salverà in seguito, es. a fine trascinamento).
+        """
+        if song_name in self.audio_tracks and 0 <= index < len(self.audio_tracks[song_name]):
+            track = self.audio_tracks[song_name][index]
+            if gain_db is not None:
+                track["gain_db"] = float(gain_db)
+            if mute is not None:
+                track["mute"] = bool(mute)
+            if solo is not None:
+                track["solo"] = bool(solo)
+            if salva:
+                self.save_song(song_name)
+
+
+    # --- [NUOVO] INDICI DEI PICCHI (WAVEFORM) ---
+    def get_waveform_peaks(self, file_path: str) -> IndicePicchi | None:
+        """
+        Restituisce l'indice dei picchi di un file audio (salvato accanto al file come .peaks.npz)
+        se è già stato caricato e verificato. Altrimenti ne avvia in background la verifica
+        (hash del contenuto) e il caricamento o la creazione, e restituisce None: la UI lo
+        richiederà al prossimo aggiornamento. Non legge né calcola nulla sul thread chiamante.
+        """
+        if not file_path:
+            return None
+        indice = self._indici_picchi.get(file_path)
+        if indice is not None:
+            return indice
+        self.richiedi_indice_picchi(file_path)
+        return None
+
+    def richiedi_indice_picchi(self, file_path: str):
+        """
+        Carica (in un thread) l'indice dei picchi del file se corrisponde al contenuto attuale,
+        altrimenti lo crea, dal PCM in cache se disponibile.
+        """
+        with self._picchi_lock:
+            if not file_path or file_path in self._picchi_in_corso:
+                return
+            self._picchi_in_corso.add(file_path)
+
+        def _crea():
+            try:
+                chiave = self.pcm_cache.chiave(file_path)
+                if chiave is None:
+                    return
+                if os.path.exists(percorso_indice(file_path)):
+                    indice = IndicePicchi.carica(percorso_indice(file_path))
+                    if indice is not None and indice.hash == chiave:
+                        self._indici_picchi[file_path] = indice
+                        return
+                self._indici_picchi.pop(file_path, None)
+                in_cache = self.pcm_cache.ottieni(file_path)
+                pcm, samplerate = in_cache if in_cache else (None, 0)
+                indice = crea_indice(file_path, chiave, pcm=pcm, pcm_samplerate=samplerate)
+                if indice is None:
+                    return
+                indice.salva(percorso_indice(file_path))
+                self._indici_picchi[file_path] = indice
+                print(f"Indice waveform creato: {os.path.basename(file_path)}")
+            except Exception as e:
+                print(f"Errore creazione indice waveform di {file_path}: {e}")
+            finally:
+                with self._picchi_lock:
+                    self._picchi_in_corso.discard(file_path)
+
+        threading.Thread(target=_crea, daemon=True).start()
+
+
     # --- GESTIONE TRACCE MIDI ---
     def add_midi_track(self, song_name, channel, port=None, file_path=None):
         """Aggiunge una traccia MIDI con percorso del file, copiando il file localmente."""
@@ -536,6 +645,24 @@ class DataManager:
 
         return lyrics, txt
 
+    # --- GESTIONE CUE DMX ---
+    def get_dmx_cue_track(self, song_name: str) -> TracciaCueDMX:
+        """Restituisce la traccia cue DMX del brano, ordinata per tempo (vuota se assente)."""
+        if song_name not in self.dmx_cues:
+            self.load_song(song_name)
+        return TracciaCueDMX.from_dati(self.dmx_cues.get(song_name, []))
+
+    def save_dmx_cues(self, song_name: str, cue_list: list[dict]):
+        """Salva la traccia cue DMX (lista di {time, type, target, value, fade}) sul file .scn."""
+        song_data = self.load_song(song_name)
+        if song_data is None:
+            return
+
+        cue_list = TracciaCueDMX.from_dati(cue_list).to_dati() # Ordinata e validata
+        song_data["dmx_cues"] = cue_list
+        self.dmx_cues[song_name] = cue_list
+        self.save_song(song_name, song_data)
+
     # --- GESTIONE PLAYLISTS ---
     def get_playlists(self):
         """Restituisce la lista dei nomi delle playlist."""
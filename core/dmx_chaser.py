@@ -0,0 +1,120 @@
+# core/dmx_chaser.py
+
+import math
+import time
+from itertools import accumulate
+from .dmx_models import Chaser, PassoChaser
+
+# Durata minima di un passo (in secondi): evita cicli di durata nulla
+MIN_DURATA_PASSO = 0.01
+
+
+def prossimo_allineamento(now: float, griglia_s: float) -> float:
+    """Primo istante >= now multiplo di 'griglia_s' (es. il prossimo battito o battuta del brano)."""
+    if griglia_s <= 0.0:
+        return now
+    return math.ceil(now / griglia_s - 1e-9) * griglia_s
+
+
+class EventoChaser:
+    """Evento della timeline: inizio del fade-in ('in') o del fade-out ('out') di un passo."""
+    IN = 'in'
+    OUT = 'out'
+
+    def __init__(self, tipo: str, passo: PassoChaser, indice_passo: int, tempo: float, durata: float):
+        self.tipo = tipo
+        self.passo = passo
+        self.indice_passo = indice_passo
+        self.tempo = tempo      # Istante assoluto (time.monotonic()) in cui l'evento deve iniziare
+        self.durata = durata    # Durata del fade (0 = applicazione istantanea)
+
+    def __repr__(self):
+        return f"EventoChaser(tipo='{self.tipo}', passo={self.indice_passo}, tempo={self.tempo:.3f})"
+
+
+class TimelineChaser:
+    """
+    Timeline assoluta di un Chaser su un orologio monotono.
+
+    Gli offset di tutti i passi di un ciclo (fade-in + hold + fade-out) sono
+    precalcolati all'avvio: l'istante di ogni evento è start_time + ciclo *
+    durata_ciclo + offset, quindi la latenza dell'event loop non si accumula
+    da un passo all'altro.
+
+    I tempi dei passi sono moltiplicati per 'secondi_per_unita' (tempi in
+    battiti/battute); gli istanti sono nel dominio dell'orologio usato per
+    start_time (time.monotonic() o il tempo del brano audio).
+    """
+    def __init__(self, chaser: Chaser, start_time: float | None = None, secondi_per_unita: float = 1.0):
+        if not chaser.passi:
+            raise IndexError("Il Chaser non contiene passi.")
+
+        self.chaser = chaser
+        self.start_time = time.monotonic() if start_time is None else start_time
+
+        # Ordine dei passi a partire dall'indice corrente del Chaser (come next_passo)
+        n = len(chaser.passi)
+        self.ordine = [(chaser.indice_corrente + k) % n for k in range(n)]
+
+        self.secondi_per_unita = secondi_per_unita
+        passi = [chaser.passi[i] for i in self.ordine]
+        tempi = [
+            (max(0.0, p.tempo_fade_in) * secondi_per_unita,
+             max(0.0, p.tempo_permanenza) * secondi_per_unita,
+             max(0.0, p.tempo_fade_out) * secondi_per_unita)
+            for p in passi
+        ]
+        durate = [max(MIN_DURATA_PASSO, fade_in + hold + fade_out) for fade_in, hold, fade_out in tempi]
+        self.offset_passi = [0.0] + list(accumulate(durate))[:-1]
+        self.durata_ciclo = sum(durate)
+
+        # Eventi di un ciclo: (offset, posizione nell'ordine, tipo, durata)
+        eventi = []
+        for pos, ((fade_in, _, fade_out), offset, durata) in enumerate(zip(tempi, self.offset_passi, durate)):
+            eventi.append((offset, pos, EventoChaser.IN, fade_in))
+            if fade_out > 0.0:
+                eventi.append((offset + durata - fade_out, pos, EventoChaser.OUT, fade_out))
+        self._eventi_ciclo = sorted(eventi, key=lambda e: (e[0], e[1]))
+
+        self._ciclo = 0
+        self._pos = 0
+        self.ultimo_tempo: float | None = None # Istante dell'ultimo evento consumato
+
+    def _tempo_evento(self, ciclo: int, pos: int) -> float:
+        return self.start_time + ciclo * self.durata_ciclo + self._eventi_ciclo[pos][0]
+
+    def prossimo_tempo(self) -> float:
+        """Istante assoluto (time.monotonic()) del prossimo evento."""
+        return self._tempo_evento(self._ciclo, self._pos)
+
+    def eventi_scaduti(self, now: float | None = None) -> list[EventoChaser]:
+        """
+        Restituisce (e consuma) gli eventi con istante <= now, in ordine.
+        Se il ritardo supera un ciclo intero, i cicli persi vengono saltati.
+        """
+        now = time.monotonic() if now is None else now
+
+        ciclo_corrente = math.floor((now - self.start_time) / self.durata_ciclo)
+        if ciclo_corrente > self._ciclo + 1:
+            # Riallinea al ciclo che contiene 'now' (gli eventi precedenti sono superati)
+            self._ciclo, self._pos = ciclo_corrente, 0
+
+        scaduti = []
+        while self._tempo_evento(self._ciclo, self._pos) <= now:
+            offset, pos, tipo, durata = self._eventi_ciclo[self._pos]
+            indice = self.ordine[pos]
+            self.ultimo_tempo = self._tempo_evento(self._ciclo, self._pos)
+            scaduti.append(EventoChaser(tipo, self.chaser.passi[indice], indice, self.ultimo_tempo, durata))
+            if tipo == EventoChaser.IN:
+                # Mantiene allineato l'indice del Chaser (come dopo next_passo)
+                self.chaser.indice_corrente = (indice + 1) % len(self.chaser.passi)
+
+            self._pos += 1
+            if self._pos >= len(self._eventi_ciclo):
+                self._ciclo, self._pos = self._ciclo + 1, 0
+        return scaduti
+
+    def ms_al_prossimo_evento(self, now: float | None = None) -> int:
+        """Millisecondi (arrotondati per eccesso) mancanti al prossimo evento, per armare un timer."""
+        now = time.monotonic() if now is None else now
+        return max(0, math.ceil((self.prossimo_tempo() - now) * 1000))
@@ -1,22 +1,49 @@
-# core/dmx_comm.py 
+# core/dmx_comm.py
 
 import serial
 import serial.tools.list_ports
+import threading
 import time
 
+# Frequenza di refresh di default dell'uscita DMX (in Hz). Il massimo teorico
+# per un universo completo (513 byte a 250 kbaud) è circa 44 Hz.
+DEFAULT_REFRESH_RATE_HZ = 40.0
+MIN_REFRESH_RATE_HZ = 1.0
+MAX_REFRESH_RATE_HZ = 44.0
+
 class DMXController:
     """
     Gestisce la comunicazione seriale per inviare i pacchetti DMX.
+
+    L'invio avviene in un unico thread di output a frequenza fissa: i produttori
+    (fader, fade, chaser) scrivono il frame nel back buffer e lo pubblicano con
+    swap_buffers(); il thread invia sempre il frame più recente ("latest frame wins").
     """
-    def __init__(self, port_name: str, baudrate: int = 250000):
+    def __init__(self, port_name: str, baudrate: int = 250000, refresh_rate_hz: float = DEFAULT_REFRESH_RATE_HZ):
         self.port_name = port_name
         self.baudrate = baudrate
         self.serial_port = None
         self.is_connected = False
         self.is_enabled = True  # <-- Inizializzato come ATTIVO
-        
-        # Buffer di 513 byte: [Start Code (0x00)] + [Dati 1..512]
-        self.dmx_buffer = bytearray([0] * 513)
+
+        # Buffer di frame preallocati di 513 byte: [Start Code (0x00)] + [Dati 1..512].
+        # Tre buffer ruotano tra produttore e thread di output:
+        # - back: il produttore (UniversoDMX) vi scrive il frame successivo
+        # - pending: l'ultimo frame completo pubblicato, non ancora preso in carico
+        # - front: il frame che il thread di output sta scrivendo sulla seriale
+        # Il produttore non tocca mai il front e il thread non tocca mai il back:
+        # lo swap scambia solo i riferimenti e il lock non è mai tenuto durante l'I/O.
+        self._back_frame = bytearray(513)
+        self._pending_frame = bytearray(513)
+        self._front_frame = bytearray(513)
+        self._frame_ready = False
+        self._swap_lock = threading.Lock()
+
+        # --- OUTPUT THREAD ---
+        self.refresh_rate_hz = DEFAULT_REFRESH_RATE_HZ
+        self.set_refresh_rate(refresh_rate_hz)
+        self._output_thread: threading.Thread | None = None
+        self._stop_event = threading.Event()
 
     def connect(self) -> bool:
         """Tenta di stabilire la connessione seriale, solo se abilitato."""
@@ -26,18 +53,20 @@ class DMXController:
 
         if self.is_connected:
             self.disconnect()
-            
+
         try:
             self.serial_port = serial.Serial(
                 port=self.port_name,
                 baudrate=self.baudrate,
                 bytesize=serial.EIGHTBITS,
                 parity=serial.PARITY_NONE,
-                stopbits=serial.STOPBITS_TWO, 
+                stopbits=serial.STOPBITS_TWO,
                 timeout=0.1
             )
             self.is_connected = self.serial_port.is_open
             print(f"Connessione DMX stabilita su {self.port_name}")
+            if self.is_connected:
+                self._start_output_thread()
             return self.is_connected
         except serial.SerialException as e:
             # Stampiamo l'errore solo se è una porta specificata
@@ -58,43 +87,96 @@ class DMXController:
         self.connect()
 
     def disconnect(self):
-        """Chiude la connessione seriale."""
+        """Ferma il thread di output e chiude la connessione seriale."""
+        self._stop_output_thread()
         if self.serial_port and self.serial_port.is_open:
             self.serial_port.close()
             self.is_connected = False
-            
-    def send_dmx_packet(self, dmx_array: list[int]):
+
+    def set_refresh_rate(self, refresh_rate_hz: float):
+        """Imposta la frequenza di refresh dell'uscita DMX (limitata a 1-44 Hz)."""
+        self.refresh_rate_hz = max(MIN_REFRESH_RATE_HZ, min(MAX_REFRESH_RATE_HZ, float(refresh_rate_hz)))
+
+    @property
+    def back_buffer(self) -> memoryview:
+        """Vista sui 512 byte di dati del back buffer, in cui il produttore scrive il prossimo frame."""
+        return memoryview(self._back_frame)[1:]
+
+    def swap_buffers(self):
         """
-        Invia il pacchetto DMX completo.
-        Verifica se il controller è abilitato e connesso.
+        Pubblica il back buffer come frame più recente ("latest frame wins").
+        Non blocca e non esegue I/O: il thread di output lo invierà al prossimo refresh.
         """
-        if not self.is_enabled:
-            return
-            
-        if not self.is_connected:
+        with self._swap_lock:
+            self._back_frame, self._pending_frame = self._pending_frame, self._back_frame
+            self._frame_ready = True
+
+    def _take_latest_frame(self) -> bytearray:
+        """Porta in front l'ultimo frame pubblicato (se presente) e lo restituisce."""
+        with self._swap_lock:
+            if self._frame_ready:
+                self._front_frame, self._pending_frame = self._pending_frame, self._front_frame
+                self._frame_ready = False
+            return self._front_frame
+
+    # -------------------------------------------------------------
+    # THREAD DI OUTPUT
+    # -------------------------------------------------------------
+
+    def _start_output_thread(self):
+        """Avvia il thread di output se non è già in esecuzione."""
+        if self._output_thread and self._output_thread.is_alive():
             return
+        self._stop_event.clear()
+        self._output_thread = threading.Thread(target=self._output_loop, name="DMXOutput", daemon=True)
+        self._output_thread.start()
+
+    def _stop_output_thread(self):
+        """Segnala l'arresto al thread di output e ne attende la fine."""
+        self._stop_event.set()
+        thread = self._output_thread
+        if thread and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=0.5)
+        self._output_thread = None
+
+    def _output_loop(self):
+        """Invia l'ultimo frame pubblicato a frequenza fissa finché la porta è connessa."""
+        next_deadline = time.perf_counter()
 
-        # 1. Costruisce il buffer
-        for i in range(512):
-            if i < len(dmx_array):
-                self.dmx_buffer[i + 1] = dmx_array[i]
+        while not self._stop_event.is_set():
+            if not self.is_enabled or not self.is_connected:
+                break
+
+            if not self._write_frame(self._take_latest_frame()):
+                break
+
+            # Scadenze assolute: il jitter di un ciclo non si accumula sui successivi
+            next_deadline += 1.0 / self.refresh_rate_hz
+            delay = next_deadline - time.perf_counter()
+            if delay > 0:
+                self._stop_event.wait(delay)
             else:
-                self.dmx_buffer[i + 1] = 0
-        
+                # In ritardo (es. porta lenta): riallinea senza recuperare i frame persi
+                next_deadline = time.perf_counter()
+
+    def _write_frame(self, frame: bytearray) -> bool:
+        """Scrive un frame completo (start code incluso) sulla porta seriale. Restituisce False in caso di errore."""
         try:
-            # 2. Protocollo di invio DMX seriale
+            # Protocollo di invio DMX seriale: Break + Mark After Break + dati
             self.serial_port.break_condition = True
             time.sleep(0.000088)
             self.serial_port.break_condition = False
-            time.sleep(0.000012) 
-            self.serial_port.write(self.dmx_buffer)
-            
+            time.sleep(0.000012)
+            self.serial_port.write(frame)
+            return True
+
         except serial.SerialException as e:
             print(f"Errore durante l'invio del pacchetto DMX: {e}. Riconnessione necessaria.")
             self.disconnect()
+            return False
 
     @staticmethod
     def list_available_ports() -> list[str]:
         """Restituisce una lista delle porte seriali disponibili."""
         ports = serial.tools.list_ports.comports()
-        return [f"{p.device} ({p.description})" for p in ports]
\ No newline at end of file
+        return [f"{p.device} ({p.description})" for p in ports]
@@ -0,0 +1,112 @@
+# core/dmx_cues.py
+# Traccia di cue DMX nativa del brano (.scn): eventi tempo -> scena/chaser/submaster/master,
+# eseguiti contro il clock master audio.
+
+from bisect import bisect_right
+import numpy as np
+
+# Tipi di cue supportati
+CUE_SCENA = 'scene'          # Aggiunge una scena alle Scene Attive (con 'fade' opzionale)
+CUE_SCENA_OFF = 'scene_off'  # Rimuove una scena dalle Scene Attive (con 'fade' opzionale)
+CUE_CHASER = 'chaser'        # Avvia un chaser
+CUE_STOP = 'stop'            # Ferma il chaser attivo
+CUE_SUBMASTER = 'submaster'  # Imposta il submaster (0-255) di una scena attiva
+CUE_CLEAR = 'clear'          # Svuota le Scene Attive (Blackout, con 'fade' opzionale)
+CUE_MASTER = 'master'        # Imposta il Master Dimmer (0-255, con 'fade' opzionale)
+CUE_TIPI = (CUE_SCENA, CUE_SCENA_OFF, CUE_CHASER, CUE_STOP, CUE_SUBMASTER, CUE_CLEAR, CUE_MASTER)
+
+# Un salto all'indietro del clock oltre questa soglia (s) è considerato un seek
+SEEK_TOLERANCE_S = 0.1
+
+
+class CueDMX:
+    """Singolo evento della traccia cue: al tempo 'tempo' (s) esegue 'tipo' su 'target' (nome scena/chaser)."""
+    def __init__(self, tempo: float, tipo: str, target: str = "", valore: int = 255, fade: float = 0.0):
+        self.tempo = float(tempo)
+        self.tipo = tipo
+        self.target = target
+        self.valore = valore
+        self.fade = max(0.0, float(fade))
+
+    @staticmethod
+    def from_dict(data: dict) -> 'CueDMX':
+        return CueDMX(
+            tempo=data.get('time', 0.0),
+            tipo=data.get('type', CUE_SCENA),
+            target=data.get('target', ""),
+            valore=data.get('value', 255),
+            fade=data.get('fade', 0.0)
+        )
+
+    def to_dict(self) -> dict:
+        return {'time': self.tempo, 'type': self.tipo, 'target': self.target, 'value': self.valore, 'fade': self.fade}
+
+    def __repr__(self):
+        return f"CueDMX(tempo={self.tempo:.3f}, tipo='{self.tipo}', target='{self.target}')"
+
+
+class TracciaCueDMX:
+    """
+    Traccia cue ordinata per tempo: 'tempi' è un array ordinato (float64) usato
+    per la ricerca binaria, 'cue' la lista degli eventi nello stesso ordine.
+    I cue con tipo sconosciuto vengono scartati al caricamento.
+    """
+    def __init__(self, cue: list[CueDMX]):
+        self.cue = sorted((c for c in cue if c.tipo in CUE_TIPI), key=lambda c: c.tempo)
+        self.tempi = np.array([c.tempo for c in self.cue], dtype=np.float64)
+
+    @staticmethod
+    def from_dati(dati: list[dict]) -> 'TracciaCueDMX':
+        return TracciaCueDMX([CueDMX.from_dict(d) for d in dati or []])
+
+    def to_dati(self) -> list[dict]:
+        return [c.to_dict() for c in self.cue]
+
+    def __len__(self):
+        return len(self.cue)
+
+
+class CuePlayer:
+    """
+    Esegue una TracciaCueDMX contro un clock esterno (tempo del brano in secondi).
+    Tra un cue e l'altro non c'è lavoro: 'avanza' fa una ricerca binaria dalla
+    posizione corrente e 'prossimo_tempo' dice quando serve il prossimo controllo.
+    """
+    def __init__(self, traccia: TracciaCueDMX):
+        self.traccia = traccia
+        self._indice = 0                        # Primo cue non ancora eseguito
+        self._ultimo_tempo: float | None = None # Ultimo tempo di clock visto
+
+    def seek(self, tempo: float) -> list[CueDMX]:
+        """
+        Riposiziona il player a 'tempo' e restituisce tutti i cue con tempo <= 'tempo',
+        da rieseguire (senza fade) per ricostruire lo stato luci in quel punto del brano.
+        """
+        self._indice = bisect_right(self.traccia.tempi, tempo)
+        self._ultimo_tempo = tempo
+        return self.traccia.cue[:self._indice]
+
+    def avanza(self, tempo: float) -> tuple[list[CueDMX], bool]:
+        """
+        Restituisce i cue scaduti fino a 'tempo' incluso e un flag che indica un seek
+        (salto all'indietro o primo avvio a brano già in corso): in quel caso la lista
+        contiene tutti i cue precedenti e il chiamante deve ricostruire lo stato.
+        """
+        if self._ultimo_tempo is None:
+            riposiziona = tempo > SEEK_TOLERANCE_S
+        else:
+            riposiziona = tempo < self._ultimo_tempo - SEEK_TOLERANCE_S
+        if riposiziona:
+            return self.seek(tempo), True
+
+        fine = bisect_right(self.traccia.tempi, tempo, lo=self._indice)
+        scaduti = self.traccia.cue[self._indice:fine]
+        self._indice = fine
+        self._ultimo_tempo = tempo
+        return scaduti, False
+
+    def prossimo_tempo(self) -> float | None:
+        """Tempo del prossimo cue da eseguire (None a traccia terminata)."""
+        if self._indice < len(self.traccia.tempi):
+            return float(self.traccia.tempi[self._indice])
+        return None
@@ -0,0 +1,145 @@
+# core/dmx_fade.py
+
+import math
+import time
+import numpy as np
+
+# --- CURVE DI EASING ---
+# Ogni curva mappa il progresso lineare (0.0-1.0) nel progresso effettivo del fade.
+EASING_CURVES = {
+    'linear': lambda p: p,
+    'ease_in': lambda p: p * p,
+    'ease_out': lambda p: 1.0 - (1.0 - p) * (1.0 - p),
+    'ease_in_out': lambda p: 0.5 - 0.5 * math.cos(math.pi * p),
+    # Curva "a S" più morbida, tipica dei dimmer teatrali
+    'smoothstep': lambda p: p * p * (3.0 - 2.0 * p),
+}
+DEFAULT_EASING = 'linear'
+
+
+class Fade:
+    """
+    Un fade su un insieme di canali DMX (indici 0-511) di cui è proprietario.
+    I valori di partenza/destinazione dei canali sono conservati dal FadeEngine.
+    """
+    def __init__(self, indici: np.ndarray, duration_s: float, easing: str = DEFAULT_EASING,
+                 start_time: float | None = None, nome: str = "", is_chaser_step: bool = False):
+        self.indici = indici
+        self.nome = nome
+        self.is_chaser_step = is_chaser_step
+        self.duration_s = max(0.0, float(duration_s))
+        self.start_time = time.monotonic() if start_time is None else start_time
+        self.easing = EASING_CURVES.get(easing, EASING_CURVES[DEFAULT_EASING])
+
+    def progress(self, now: float) -> float:
+        """Progresso lineare (0.0-1.0) al tempo 'now' (time.monotonic())."""
+        if self.duration_s <= 0.0:
+            return 1.0
+        return min(1.0, max(0.0, (now - self.start_time) / self.duration_s))
+
+    def __repr__(self):
+        return f"Fade(nome='{self.nome}', canali={len(self.indici)}, durata={self.duration_s:.2f}s)"
+
+
+class FadeEngine:
+    """
+    Scheduler di fade indipendente dalla UI. Più fade possono essere attivi
+    contemporaneamente (passo chaser, submaster, master...): ogni canale ha al
+    massimo un fade proprietario e un nuovo fade sottrae i propri canali a quelli
+    in corso (LTP). Ad ogni tick tutti i canali in transizione sono calcolati in
+    un unico passaggio vettoriale.
+    """
+    def __init__(self, easing: str = DEFAULT_EASING):
+        self.easing = easing if easing in EASING_CURVES else DEFAULT_EASING
+        self.fades: list[Fade] = []
+
+        # Stato per canale: valore iniziale, delta verso il target e indice (slot)
+        # del fade proprietario in self.fades (-1 = nessun fade).
+        self._start = np.zeros(512, dtype=np.float32)
+        self._delta = np.zeros(512, dtype=np.float32)
+        self._slot = np.full(512, -1, dtype=np.intp)
+        self._canali_attivi = np.zeros(0, dtype=np.intp)
+
+    @property
+    def is_active(self) -> bool:
+        return bool(self.fades)
+
+    def set_easing(self, easing: str):
+        """Imposta la curva di default per i fade successivi (ignora nomi sconosciuti)."""
+        if easing in EASING_CURVES:
+            self.easing = easing
+
+    def avvia(self, start_values, target_values, duration_s: float, canali=None, easing: str | None = None,
+              nome: str = "", is_chaser_step: bool = False, start_time: float | None = None) -> Fade:
+        """
+        Avvia un fade sui canali indicati (indici 0-511; None = tutti i canali).
+        Solo i canali che differiscono tra start e target entrano nel fade e
+        vengono tolti ai fade in corso; i fade rimasti senza canali terminano.
+        """
+        start = np.asarray(start_values, dtype=np.float32)
+        target = np.asarray(target_values, dtype=np.float32)
+
+        if canali is None:
+            indici = np.flatnonzero(start != target)
+        else:
+            indici = np.unique(np.asarray(canali, dtype=np.intp))
+            indici = indici[(indici >= 0) & (indici < 512)]
+            # Un canale già al valore di destinazione non sottrae la proprietà ai fade in corso
+            indici = indici[start[indici] != target[indici]]
+
+        fade = Fade(indici, duration_s, easing=easing or self.easing, start_time=start_time,
+                    nome=nome, is_chaser_step=is_chaser_step)
+
+        # Passaggio di proprietà: i canali del nuovo fade vengono sottratti ai precedenti
+        for esistente in self.fades:
+            esistente.indici = np.setdiff1d(esistente.indici, indici, assume_unique=True)
+        self.fades = [f for f in self.fades if len(f.indici)]
+        self.fades.append(fade)
+
+        self._start[indici] = start[indici]
+        self._delta[indici] = target[indici] - start[indici]
+        self._ricalcola_slot()
+        return fade
+
+    def tick(self, out: np.ndarray, now: float | None = None) -> list[Fade]:
+        """
+        Scrive in 'out' (array uint8 di 512 canali) i valori correnti dei soli
+        canali in transizione. Gli altri canali non vengono toccati.
+        Restituisce la lista dei fade completati in questo tick.
+        """
+        if not self.fades:
+            return []
+        now = time.monotonic() if now is None else now
+
+        # Progresso (con easing) di ogni fade, poi espanso per canale tramite lo slot
+        lineari = [f.progress(now) for f in self.fades]
+        progressi = np.array(
+            [1.0 if p >= 1.0 else f.easing(p) for f, p in zip(self.fades, lineari)],
+            dtype=np.float32
+        )
+        canali = self._canali_attivi
+        out[canali] = self._start[canali] + self._delta[canali] * progressi[self._slot[canali]]
+
+        completati = [f for f, p in zip(self.fades, lineari) if p >= 1.0]
+        if completati:
+            self.fades = [f for f, p in zip(self.fades, lineari) if p < 1.0]
+            self._ricalcola_slot()
+        return completati
+
+    def rimuovi(self, fade: Fade):
+        """Interrompe un singolo fade (i suoi canali restano all'ultimo valore calcolato)."""
+        if fade in self.fades:
+            self.fades.remove(fade)
+            self._ricalcola_slot()
+
+    def clear(self):
+        """Interrompe tutti i fade in corso (i canali restano all'ultimo valore calcolato)."""
+        self.fades = []
+        self._ricalcola_slot()
+
+    def _ricalcola_slot(self):
+        """Ricostruisce la mappa canale -> fade proprietario (solo all'avvio/fine di un fade)."""
+        self._slot.fill(-1)
+        for slot, fade in enumerate(self.fades):
+            self._slot[fade.indici] = slot
+        self._canali_attivi = np.flatnonzero(self._slot >= 0)
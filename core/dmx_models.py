@@ -1,5 +1,7 @@
 # core/dmx_models.py
 
+import numpy as np
+
 class CanaleDMX:
     def __init__(self, nome: str, funzione: str, valore_default: int = 0):
         self.nome = nome
@@ -69,6 +71,10 @@ class IstanzaFixture:
 class Scena:
     """
     Rappresenta un'istantanea dei valori DMX per tutte le fixture.
+
+    Oltre al dizionario (usato per la serializzazione) la scena mantiene una forma
+    compilata a 512 canali (valori + maschera di presenza), così applicarla o
+    fonderla è una copia mascherata invece di una ricerca per indirizzo.
     """
     def __init__(self, nome: str, valori_canali: dict[int, int]):
         """
@@ -78,6 +84,54 @@ class Scena:
         self.nome = nome
         self.valori_canali = valori_canali 
 
+    @property
+    def valori_canali(self) -> dict[int, int]:
+        return self._valori_canali
+
+    @valori_canali.setter
+    def valori_canali(self, valori_canali: dict[int, int]):
+        self._valori_canali = valori_canali
+        self._compila()
+
+    def invalida(self):
+        """Da chiamare dopo una modifica in-place di valori_canali: la forma compilata verrà ricostruita."""
+        self._valori = None
+
+    @property
+    def valori(self) -> np.ndarray:
+        """Valori densi dei 512 canali (uint8, 0 dove la scena non definisce il canale)."""
+        if self._valori is None:
+            self._compila()
+        return self._valori
+
+    @property
+    def maschera(self) -> np.ndarray:
+        """Maschera di presenza (bool, 512): True sui canali definiti dalla scena."""
+        if self._valori is None:
+            self._compila()
+        return self._maschera
+
+    @property
+    def indici(self) -> np.ndarray:
+        """Indici ordinati (0-511) dei canali definiti dalla scena."""
+        if self._valori is None:
+            self._compila()
+        return self._indici
+
+    def _compila(self):
+        """Costruisce la forma densa (valori + maschera) dal dizionario, scartando indirizzi fuori universo."""
+        valori = np.zeros(512, dtype=np.uint8)
+        maschera = np.zeros(512, dtype=bool)
+        if self._valori_canali:
+            indirizzi = np.fromiter(self._valori_canali.keys(), dtype=np.intp, count=len(self._valori_canali))
+            dati = np.fromiter(self._valori_canali.values(), dtype=np.int64, count=len(self._valori_canali))
+            validi = (indirizzi >= 1) & (indirizzi <= 512)
+            valori[indirizzi[validi] - 1] = np.clip(dati[validi], 0, 255)
+            maschera[indirizzi[validi] - 1] = True
+        self._maschera = maschera
+        self._indici = np.flatnonzero(maschera)
+        self._valori = valori
+
     def __repr__(self):
         return f"Scena(nome='{self.nome}', canali_salvati={len(self.valori_canali)})"
 
@@ -96,14 +150,35 @@ class PassoChaser:
         self.tempo_fade_in = tempo_fade_in
         self.tempo_fade_out = tempo_fade_out # Nota: Questo è usato all'inizio del prossimo passo
 
+# Unità di misura dei tempi dei passi di un Chaser
+UNITA_SECONDI = 'secondi'
+UNITA_BATTITI = 'battiti'
+UNITA_BATTUTE = 'battute'
+UNITA_TEMPO = (UNITA_SECONDI, UNITA_BATTITI, UNITA_BATTUTE)
+
 class Chaser:
     """
     Rappresenta una sequenza di Scene riprodotte in automatico.
+    I tempi dei passi sono espressi in 'unita_tempo' (secondi, battiti o battute);
+    con 'sync_audio' la riproduzione segue il clock audio del brano.
     """
-    def __init__(self, nome: str, passi: list[PassoChaser]):
+    def __init__(self, nome: str, passi: list[PassoChaser], unita_tempo: str = UNITA_SECONDI,
+                 sync_audio: bool = False, battiti_per_battuta: int = 4):
         self.nome = nome
         self.passi = passi
         self.indice_corrente = 0 
+        self.unita_tempo = unita_tempo if unita_tempo in UNITA_TEMPO else UNITA_SECONDI
+        self.sync_audio = sync_audio
+        self.battiti_per_battuta = max(1, int(battiti_per_battuta))
+
+    def secondi_per_unita(self, bpm: float) -> float:
+        """Durata in secondi di un'unità di tempo dei passi al BPM dato."""
+        if self.unita_tempo == UNITA_SECONDI:
+            return 1.0
+        battito = 60.0 / bpm if bpm > 0 else 0.5
+        if self.unita_tempo == UNITA_BATTUTE:
+            return battito * self.battiti_per_battuta
+        return battito
 
     def next_passo(self) -> PassoChaser:
         """Avanza al passo successivo, ciclando alla fine."""
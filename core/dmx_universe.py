@@ -1,13 +1,101 @@
 # core/dmx_universe.py
 
+import re
+from itertools import chain
+import numpy as np
 from .dmx_models import IstanzaFixture, Scena, CanaleDMX # <-- Import CanaleDMX
 
+# Parole chiave (nome o funzione del canale) dei canali di intensità/colore:
+# sono gli unici scalati dal Master Dimmer quando è limitato a questi canali.
+PAROLE_INTENSITA_COLORE = (
+    'dimmer', 'intensità', 'colore', 'rosso', 'red', 'verde', 'green', 'blu', 'blue',
+    'bianco', 'white', 'ambra', 'amber', 'uv', 'flash'
+)
+NOMI_BREVI_COLORE = ('r', 'g', 'b', 'w', 'a')
+
+def is_canale_intensita_colore(canale: CanaleDMX) -> bool:
+    """
+    True se il canale controlla intensità o colore (in base a nome/funzione).
+    Il confronto è per parole intere ('Red 1', 'Colore/Rosso'), non per sottostringhe:
+    'Preset' o 'Predefinito' non sono canali colore.
+    """
+    nome = canale.nome.lower().strip()
+    parole = set(re.findall(r"[^\W\d_]+", f"{nome} {canale.funzione.lower()}"))
+    return nome in NOMI_BREVI_COLORE or not parole.isdisjoint(PAROLE_INTENSITA_COLORE)
+
+class FusioneSceneAttive:
+    """
+    Cache incrementale della fusione HTP delle scene attive.
+
+    Mantiene l'array scalato (valori * master) di ogni scena e il massimo
+    corrente: quando cambia il master di una sola scena viene ricalcolata solo
+    la sua riga, e il massimo solo sui canali in cui quella scena era in testa.
+    L'intero stack viene ricostruito solo se le scene attive cambiano.
+    """
+    def __init__(self):
+        self._chiavi: list[tuple[np.ndarray, float]] = [] # (scena.valori, fattore) per ogni riga
+        self._scalati = np.zeros((0, 512), dtype=np.uint8)
+        self.fuse = np.zeros(512, dtype=np.uint8)           # Massimo HTP delle righe
+        self.definiti = np.zeros(512, dtype=bool)           # Canali definiti da almeno una scena
+
+    def aggiorna(self, scene_pesate: list[tuple[Scena, float]]):
+        """Allinea la cache alla lista (scena, fattore), ricalcolando solo ciò che è cambiato."""
+        stesse_scene = len(scene_pesate) == len(self._chiavi) and all(
+            scena.valori is chiave[0] for (scena, _), chiave in zip(scene_pesate, self._chiavi)
+        )
+        if not stesse_scene:
+            self._ricostruisci(scene_pesate)
+            return
+
+        for riga, ((scena, fattore), (_, fattore_prec)) in enumerate(zip(scene_pesate, self._chiavi)):
+            if fattore == fattore_prec:
+                continue
+            precedente = self._scalati[riga].copy()
+            self._scalati[riga] = (scena.valori * fattore).astype(np.uint8)
+            self._chiavi[riga] = (scena.valori, fattore)
+
+            if fattore > fattore_prec:
+                np.maximum(self.fuse, self._scalati[riga], out=self.fuse)
+            else:
+                # Il massimo va ricalcolato solo dove questa scena era in testa
+                canali = np.flatnonzero((precedente == self.fuse) & (self._scalati[riga] < precedente))
+                if len(canali):
+                    self.fuse[canali] = self._scalati[:, canali].max(axis=0)
+
+    def _ricostruisci(self, scene_pesate: list[tuple[Scena, float]]):
+        """Ricostruisce tutte le righe (scene aggiunte, rimosse o ricompilate)."""
+        self._chiavi = [(scena.valori, fattore) for scena, fattore in scene_pesate]
+        self._scalati = np.zeros((len(scene_pesate), 512), dtype=np.uint8)
+        self.definiti = np.zeros(512, dtype=bool)
+        for riga, (scena, fattore) in enumerate(scene_pesate):
+            self._scalati[riga] = (scena.valori * fattore).astype(np.uint8)
+            self.definiti |= scena.maschera
+        self.fuse = self._scalati.max(axis=0) if len(scene_pesate) else np.zeros(512, dtype=np.uint8)
+
+
 class UniversoDMX:
     def __init__(self, id_universo: int = 1):
         self.id_universo = id_universo
-        self.array_canali = [0] * 512 
+        # 512 canali grezzi dell'universo (uint8: copiabile nel frame DMX senza conversioni)
+        self.array_canali = np.zeros(512, dtype=np.uint8)
         self.fixture_assegnate: list[IstanzaFixture] = []
 
+        # --- MAPPA CANALI PRECALCOLATA ---
+        # Ricalcolata solo quando le fixture vengono aggiunte/rimosse (ricalcola_mappa_canali).
+        self.maschera_htp = np.zeros(512, dtype=bool)    # True = canale HTP (Dimmer/Intensità)
+        self.maschera_intensita_colore = np.zeros(512, dtype=bool) # True = canale di intensità/colore
+        self.maschera_fixture = np.zeros(512, dtype=bool) # True = canale gestito da almeno una fixture
+        self.valori_default = np.zeros(512, dtype=np.uint8) # Uscita con tutte le fixture ai valori di default
+        self.slice_fixture: list[slice] = []             # Slice di array_canali per ogni fixture
+        self._indici_canali = np.zeros(0, dtype=np.intp) # Indice DMX (0-511) di ogni valore fixture, concatenati
+        self._valori_validi = np.zeros(0, dtype=bool)    # Valori che cadono dentro l'universo (1-512)
+        self._canali_totali = 0
+        self._ha_sovrapposizioni = False
+        self._fixture_mappate = 0
+
+        # Cache della fusione delle scene attive (usata da fondi_scene)
+        self._fusione_scene = FusioneSceneAttive()
+
     def verifica_sovrapposizione(self, nuova_istanza: IstanzaFixture) -> bool:
         """
         Verifica se la nuova istanza si sovrappone a una fixture esistente.
@@ -32,7 +120,54 @@ class UniversoDMX:
             raise ValueError(f"Sovrapposizione indirizzo DMX: I canali {start}-{end} sono già parzialmente occupati.")
             
         self.fixture_assegnate.append(istanza)
+        self.ricalcola_mappa_canali()
         self.aggiorna_canali_universali()
+
+    def rimuovi_fixture(self, indice: int) -> IstanzaFixture:
+        """Rimuove la fixture all'indice dato, aggiorna la mappa canali e restituisce l'istanza rimossa."""
+        istanza = self.fixture_assegnate.pop(indice)
+        self.ricalcola_mappa_canali()
+        self.aggiorna_canali_universali()
+        return istanza
+
+    def ricalcola_mappa_canali(self):
+        """
+        Precalcola la maschera HTP/LTP e gli indirizzi di ogni fixture.
+        Da chiamare dopo ogni modifica di fixture_assegnate.
+        """
+        maschera_htp = np.zeros(512, dtype=bool)
+        maschera_intensita_colore = np.zeros(512, dtype=bool)
+        slice_fixture = []
+        indici = []
+        default = []
+
+        for fixture in self.fixture_assegnate:
+            start_addr, end_addr = fixture.get_indirizzi_universali()
+            slice_fixture.append(slice(start_addr - 1, min(end_addr, 512)))
+
+            for i, canale in enumerate(fixture.modello.descrizione_canali):
+                target_index = start_addr - 1 + i
+                indici.append(target_index)
+                default.append(canale.valore_default)
+                if target_index < 512:
+                    # Controlla per 'dimmer' nel nome o 'intensità' nella funzione
+                    maschera_htp[target_index] = 'dimmer' in canale.nome.lower() or 'intensità' in canale.funzione.lower()
+                    maschera_intensita_colore[target_index] = is_canale_intensita_colore(canale)
+
+        indici = np.array(indici, dtype=np.intp)
+        self._valori_validi = indici < 512
+        self._indici_canali = indici[self._valori_validi]
+        self._canali_totali = len(indici)
+        self._ha_sovrapposizioni = len(np.unique(self._indici_canali)) != len(self._indici_canali)
+        self._fixture_mappate = len(self.fixture_assegnate)
+        self.maschera_htp = maschera_htp
+        self.maschera_intensita_colore = maschera_intensita_colore
+        self.slice_fixture = slice_fixture
+        self.maschera_fixture = np.zeros(512, dtype=bool)
+        self.maschera_fixture[self._indici_canali] = True
+        self.valori_default = self._fondi_valori(
+            np.array(default, dtype=np.uint8)[self._valori_validi] if default else np.zeros(0, dtype=np.uint8)
+        )
         
     def cattura_scena(self, nome_scena: str) -> Scena:
         """
@@ -54,61 +189,83 @@ class UniversoDMX:
         """
         Applica i valori di una Scena all'Universo e alle istanze fixture.
         """
-        for fixture in self.fixture_assegnate:
-            start_addr, end_addr = fixture.get_indirizzi_universali()
-            
-            for i in range(fixture.modello.numero_canali):
-                dmx_addr = start_addr + i
-                
-                if dmx_addr in scena.valori_canali:
-                    nuovo_valore = scena.valori_canali[dmx_addr]
-                    
-                    # Imposta il valore direttamente sull'istanza fixture
-                    fixture.set_valore_canale(i, nuovo_valore)
+        if len(self.fixture_assegnate) != self._fixture_mappate:
+            self.ricalcola_mappa_canali()
+
+        for fixture, canali in zip(self.fixture_assegnate, self.slice_fixture):
+            presenti = scena.maschera[canali]
+            if not presenti.any():
+                continue
+            # Copia mascherata dalla forma compilata della scena
+            correnti = np.array(fixture.valori_correnti[:len(presenti)], dtype=np.uint8)
+            fixture.valori_correnti[:len(presenti)] = np.where(presenti, scena.valori[canali], correnti).tolist()
         
         # Aggiorna l'array universale con i nuovi valori
         self.aggiorna_canali_universali()
 
+    def fondi_scene(self, scene_pesate: list[tuple[Scena, float]]) -> np.ndarray:
+        """
+        Fonde in HTP più scene, ognuna scalata dal proprio fattore (0.0-1.0),
+        sui canali gestiti dalle fixture. I canali che nessuna scena definisce
+        restano al valore di default; senza scene il risultato è il Blackout
+        (valori di default). Non modifica array_canali né le fixture.
+        La fusione è incrementale: se cambia solo il fattore di una scena,
+        viene ricalcolato solo il suo contributo.
+        """
+        fusione = self._fusione_scene
+        fusione.aggiorna(scene_pesate)
+        return np.where(fusione.definiti & self.maschera_fixture, fusione.fuse, self.valori_default)
+
+    def sovrapponi_scena(self, base: np.ndarray, scena: Scena) -> np.ndarray:
+        """
+        Restituisce un nuovo array in cui i canali fixture definiti dalla scena
+        sostituiscono quelli di 'base' (LTP del passo sulla base).
+        """
+        return np.where(scena.maschera & self.maschera_fixture, scena.valori, base).astype(np.uint8)
+
     def aggiorna_canali_universali(self):
         """
         Popola l'array_canali (i 512 byte grezzi) applicando la logica
         di HTP (Highest Takes Precedence) per i canali Dimmer e
         LTP (Latest Takes Precedence) per gli altri canali.
         """
-        
-        # Inizializza l'array DMX finale con tutti a zero.
-        final_array = [0] * 512
-        dmx_channel_types = {} # {dmx_addr: 'HTP'/'LTP'}
-        
-        # Primo passaggio: Popolare i tipi di canale
-        for fixture in self.fixture_assegnate:
-            start_addr, _ = fixture.get_indirizzi_universali()
-            for i, canale in enumerate(fixture.modello.descrizione_canali):
-                dmx_addr = start_addr + i
-                if 1 <= dmx_addr <= 512:
-                    # Controlla per 'dimmer' nel nome o 'intensità' nella funzione
-                    is_htp = 'dimmer' in canale.nome.lower() or 'intensità' in canale.funzione.lower()
-                    dmx_channel_types[dmx_addr] = 'HTP' if is_htp else 'LTP'
-        
-        # Secondo passaggio: Applicare HTP/LTP
-        for fixture in self.fixture_assegnate:
-            start_addr, _ = fixture.get_indirizzi_universali()
-            for i, valore in enumerate(fixture.valori_correnti):
-                dmx_addr = start_addr + i
-                target_index = dmx_addr - 1
-                
-                if 0 <= target_index < 512:
-                    channel_type = dmx_channel_types.get(dmx_addr, 'LTP')
-                    
-                    if channel_type == 'HTP':
-                        # HTP: Accumula il valore più alto trovato
-                        final_array[target_index] = max(final_array[target_index], valore)
-                    else:
-                        # LTP: L'ultimo valore scritto vince (sovrascrive).
-                        final_array[target_index] = valore
-
-        self.array_canali = final_array
+        # Rete di sicurezza se fixture_assegnate è stata modificata direttamente
+        if len(self.fixture_assegnate) != self._fixture_mappate:
+            self.ricalcola_mappa_canali()
+
+        if not self._canali_totali:
+            self.array_canali = np.zeros(512, dtype=np.uint8)
+            return
 
+        valori = np.fromiter(
+            chain.from_iterable(f.valori_correnti for f in self.fixture_assegnate),
+            dtype=np.uint8, count=self._canali_totali
+        )[self._valori_validi]
+        self.array_canali = self._fondi_valori(valori)
+
+    def _fondi_valori(self, valori: np.ndarray) -> np.ndarray:
+        """Scrive i valori concatenati delle fixture in un nuovo array di 512 canali (HTP/LTP)."""
+        final_array = np.zeros(512, dtype=np.uint8)
+
+        if not self._ha_sovrapposizioni:
+            # Senza sovrapposizioni HTP e LTP coincidono: una sola scrittura
+            final_array[self._indici_canali] = valori
+        else:
+            # LTP: l'ultimo valore scritto vince (sovrascrive).
+            final_array[self._indici_canali] = valori
+            # HTP: accumula il valore più alto trovato
+            htp_array = np.zeros(512, dtype=np.uint8)
+            np.maximum.at(htp_array, self._indici_canali, valori)
+            final_array = np.where(self.maschera_htp, htp_array, final_array)
+
+        return final_array
+
+    def render_frame(self, frame: memoryview):
+        """
+        Scrive i 512 canali correnti direttamente nel frame di destinazione
+        (es. il back buffer di DMXController), con una singola copia di memoria.
+        """
+        frame[:512] = self.array_canali
 
     def set_valore_fixture(self, fixture_instance: IstanzaFixture, indice_canale: int, valore: int):
         """Imposta il valore di un canale specifico e aggiorna l'universo."""
@@ -0,0 +1,223 @@
+# core/lyrics_align.py
+# Suggerimento automatico dei timestamp dei lyrics: un'analisi offline (NumPy) del brano
+# calcola l'energia e gli onset nella banda della voce; le righe di testo, nel loro ordine,
+# vengono poi allineate agli onset più probabili rispettando i timestamp già inseriti.
+# 'analizza_audio' è pensata per girare in un processo separato (il risultato è un dict picklable).
+
+import numpy as np
+import soundfile as sf
+
+# Passo dell'analisi (s) e dimensione della finestra FFT (campioni)
+ANALYSIS_HOP_S = 0.01
+ANALYSIS_FFT = 2048
+# Frame di analisi calcolati per ogni blocco letto (limita la memoria su brani lunghi)
+ANALYSIS_CHUNK_FRAMES = 1024
+# Banda della voce cantata (Hz)
+VOCAL_BAND_HZ = (300.0, 3400.0)
+# Compressione logaritmica delle magnitudini per lo spectral flux
+FLUX_COMPRESSION = 100.0
+# Finestre (s): smussamento dell'energia, ricerca del massimo locale, media adattiva degli onset
+ENERGY_SMOOTH_S = 0.1
+ONSET_PEAK_S = 0.05
+ONSET_MEAN_S = 1.0
+# Soglia sopra la media adattiva per considerare un onset (flux normalizzato)
+ONSET_DELTA = 0.1
+# Voce attiva quando l'energia supera questa frazione tra il 10° e il 90° percentile
+VOICE_THRESHOLD = 0.35
+# Bonus per gli onset preceduti da una pausa della voce (inizio di frase) e finestra della pausa (s)
+PAUSE_BONUS = 1.0
+PAUSE_WINDOW_S = 0.3
+# Distanza minima (s) tra due righe suggerite e tempo minimo suggerito (0 = riga senza timestamp)
+MIN_LINE_GAP_S = 1.0
+MIN_TIMESTAMP_S = 0.05
+# Peso della distanza dal tempo atteso (in durate medie di riga) rispetto alla forza dell'onset
+DEVIATION_WEIGHT = 1.0
+
+
+def _media_mobile(valori: np.ndarray, finestra: int) -> np.ndarray:
+    finestra = max(1, int(finestra))
+    if finestra == 1 or len(valori) == 0:
+        return valori.astype(np.float64)
+    kernel = np.ones(finestra) / finestra
+    return np.convolve(valori, kernel, mode='same')
+
+
+def _blocchi_mono(file_path: str, pcm_path: str | None, frames_blocco: int):
+    """Blocchi mono float32 dal PCM in cache (.npy in memmap) oppure dal file audio."""
+    if pcm_path:
+        pcm = np.load(pcm_path, mmap_mode='r')
+        for inizio in range(0, len(pcm), frames_blocco):
+            yield np.asarray(pcm[inizio:inizio + frames_blocco], dtype=np.float32).mean(axis=1)
+        return
+    with sf.SoundFile(file_path, 'r') as f:
+        for blocco in f.blocks(blocksize=frames_blocco, dtype='float32', always_2d=True):
+            yield blocco.mean(axis=1)
+
+
+def analizza_audio(file_path: str, pcm_path: str | None = None, pcm_samplerate: int = 0) -> dict:
+    """
+    Analisi offline di un brano (bloccante: eseguirla in un processo o thread separato).
+
+    Restituisce un dict con:
+    - 'hop_s': passo dei frame di analisi (s)
+    - 'attiva': array bool, voce attiva per frame
+    - 'onset_tempi', 'onset_forza': tempi (s) e forza degli onset candidati
+    - 'durata': durata del brano (s)
+    """
+    if pcm_path:
+        samplerate = pcm_samplerate
+    else:
+        samplerate = sf.info(file_path).samplerate
+    hop = max(1, int(round(samplerate * ANALYSIS_HOP_S)))
+    finestra = np.hanning(ANALYSIS_FFT).astype(np.float32)
+    frequenze = np.fft.rfftfreq(ANALYSIS_FFT, 1.0 / samplerate)
+    banda = (frequenze >= VOCAL_BAND_HZ[0]) & (frequenze <= VOCAL_BAND_HZ[1])
+
+    energie, flussi = [], []
+    precedente = None
+    campioni = 0
+    # Padding iniziale di mezza finestra: il frame i è centrato sul campione i * hop
+    buf = np.zeros(ANALYSIS_FFT // 2, dtype=np.float32)
+    for blocco in _blocchi_mono(file_path, pcm_path, hop * ANALYSIS_CHUNK_FRAMES):
+        campioni += len(blocco)
+        buf = np.concatenate([buf, blocco])
+        n = (len(buf) - ANALYSIS_FFT) // hop + 1
+        if n <= 0:
+            continue
+        frames = np.lib.stride_tricks.sliding_window_view(buf, ANALYSIS_FFT)[::hop][:n]
+        spettro = np.abs(np.fft.rfft(frames * finestra, axis=1))[:, banda]
+        energie.append(10.0 * np.log10(np.mean(spettro ** 2, axis=1) + 1e-10))
+        logmag = np.log1p(FLUX_COMPRESSION * spettro)
+        diff = np.diff(logmag, axis=0, prepend=logmag[:1] if precedente is None else precedente)
+        flussi.append(np.maximum(diff, 0.0).sum(axis=1))
+        precedente = logmag[-1:]
+        buf = buf[n * hop:]
+
+    durata = campioni / samplerate if samplerate else 0.0
+    if not energie:
+        return {"hop_s": hop / samplerate if samplerate else ANALYSIS_HOP_S, "attiva": np.zeros(0, dtype=bool),
+                "onset_tempi": np.zeros(0), "onset_forza": np.zeros(0, dtype=np.float32), "durata": durata}
+    energia = np.concatenate(energie)
+    flusso = np.concatenate(flussi)
+    hop_s = hop / samplerate
+
+    # Attività della voce: energia in banda smussata sopra una soglia relativa al brano
+    liscia = _media_mobile(energia, ENERGY_SMOOTH_S / hop_s)
+    basso, alto = np.percentile(liscia, [10, 90])
+    attiva = liscia > basso + VOICE_THRESHOLD * (alto - basso)
+
+    # Onset: massimi locali dello spectral flux normalizzato sopra la media adattiva
+    forza = flusso / (np.percentile(flusso, 95) + 1e-9)
+    w = max(1, int(ONSET_PEAK_S / hop_s))
+    massimi = np.lib.stride_tricks.sliding_window_view(np.pad(forza, w, mode='edge'), 2 * w + 1).max(axis=1)
+    picchi = np.flatnonzero((forza >= massimi) & (forza > _media_mobile(forza, ONSET_MEAN_S / hop_s) + ONSET_DELTA))
+
+    # Inizio di frase: pausa prima dell'onset e voce attiva subito dopo
+    p = max(1, int(PAUSE_WINDOW_S / hop_s))
+    cumulata = np.concatenate([[0], np.cumsum(attiva)])
+    prima = (cumulata[picchi] - cumulata[np.maximum(0, picchi - p)]) / p
+    dopo = (cumulata[np.minimum(len(attiva), picchi + p)] - cumulata[picchi]) / p
+    forza_onset = np.minimum(forza[picchi], 3.0) + PAUSE_BONUS * (1.0 - prima) * dopo
+
+    return {
+        "hop_s": hop_s,
+        "attiva": attiva,
+        "onset_tempi": picchi * hop_s,
+        "onset_forza": forza_onset.astype(np.float32),
+        "durata": durata,
+    }
+
+
+def _allinea_segmento(tempi: np.ndarray, forza: np.ndarray, attesi: np.ndarray, scala: float) -> np.ndarray | None:
+    """
+    Sceglie per ogni riga (in ordine) un onset distinto, crescente e distante almeno
+    MIN_LINE_GAP_S dal precedente, massimizzando forza - distanza dal tempo atteso
+    (programmazione dinamica con massimo prefisso: O(righe x onset)).
+    """
+    righe, m = len(attesi), len(tempi)
+    if m < righe:
+        return None
+    forza = forza / (forza.max() if forza.max() > 0 else 1.0)
+    indici = np.arange(m)
+    precedente_max = np.searchsorted(tempi, tempi - MIN_LINE_GAP_S, side='right') - 1
+
+    punteggio = forza - DEVIATION_WEIGHT * np.abs(tempi - attesi[0]) / scala
+    scelte = []
+    for k in range(1, righe):
+        # Miglior punteggio (e relativo onset) fino a ogni indice
+        migliore = np.maximum.accumulate(punteggio)
+        argomento = np.maximum.accumulate(np.where(punteggio == migliore, indici, 0))
+        valido = precedente_max >= 0
+        da = np.where(valido, argomento[np.maximum(precedente_max, 0)], -1)
+        base = np.where(valido, migliore[np.maximum(precedente_max, 0)], -np.inf)
+        punteggio = base + forza - DEVIATION_WEIGHT * np.abs(tempi - attesi[k]) / scala
+        scelte.append(da)
+
+    j = int(np.argmax(punteggio))
+    if not np.isfinite(punteggio[j]):
+        return None
+    percorso = [j]
+    for da in reversed(scelte):
+        j = int(da[j])
+        percorso.append(j)
+    return tempi[np.array(percorso[::-1])]
+
+
+def suggerisci_timestamp(analisi: dict, text_lines: list[str], timestamps: list[float]) -> list[float]:
+    """
+    Propone i timestamp delle righe senza tempo (<= 0) nell'ordine del testo.
+    Le righe con un timestamp già inserito fanno da ancore e non vengono modificate;
+    le righe vuote restano a 0. Tra due ancore il tempo atteso di ogni riga è
+    proporzionale alla lunghezza del testo, misurata sul tempo in cui la voce è attiva.
+    """
+    risultato = list(timestamps) + [0.0] * (len(text_lines) - len(timestamps))
+    attiva = analisi["attiva"]
+    hop_s = analisi["hop_s"]
+    if len(attiva) == 0 or not np.any(attiva):
+        return risultato
+
+    # Secondi di voce cumulati per frame e loro inversa
+    voce = np.concatenate([[0.0], np.cumsum(attiva) * hop_s])
+    def _voce(t: float) -> float:
+        return float(voce[min(len(voce) - 1, max(0, int(t / hop_s)))])
+    def _tempo(v: float) -> float:
+        return float(min(len(voce) - 1, np.searchsorted(voce, v, side='left'))) * hop_s
+
+    attivi = np.flatnonzero(attiva)
+    inizio_voce, fine_voce = attivi[0] * hop_s, (attivi[-1] + 1) * hop_s
+    onset_tempi, onset_forza = analisi["onset_tempi"], analisi["onset_forza"]
+    lunghezze = [max(1, len(line.strip())) for line in text_lines]
+
+    # Segmenti: (inizio, lunghezza della riga ancora all'inizio, righe da stimare, fine)
+    segmenti = []
+    inizio, lung_ancora, da_stimare = inizio_voce, 0, []
+    for i, line in enumerate(text_lines):
+        if not line.strip():
+            continue
+        if risultato[i] > 0.0:
+            segmenti.append((inizio, lung_ancora, da_stimare, risultato[i]))
+            inizio, lung_ancora, da_stimare = risultato[i], lunghezze[i], []
+        else:
+            da_stimare.append(i)
+    segmenti.append((inizio, lung_ancora, da_stimare, max(fine_voce, inizio)))
+
+    for inizio, lung_ancora, righe, fine in segmenti:
+        if not righe:
+            continue
+        totale = lung_ancora + sum(lunghezze[i] for i in righe)
+        cumulate = lung_ancora + np.concatenate([[0], np.cumsum([lunghezze[i] for i in righe])[:-1]])
+        v_inizio, v_fine = _voce(inizio), _voce(fine)
+        attesi = np.array([_tempo(v_inizio + (v_fine - v_inizio) * c / totale) for c in cumulate])
+        attesi = np.clip(attesi, inizio, fine)
+
+        # Onset nel segmento, lontani dalle ancore
+        margine_inizio = MIN_LINE_GAP_S if lung_ancora else 0.0
+        margine_fine = MIN_LINE_GAP_S if fine < fine_voce else 0.0
+        dentro = (onset_tempi >= inizio + margine_inizio) & (onset_tempi <= fine - margine_fine)
+        scala = max(MIN_LINE_GAP_S, (fine - inizio) / (len(righe) + (1 if lung_ancora else 0)))
+        scelti = _allinea_segmento(onset_tempi[dentro], onset_forza[dentro], attesi, scala)
+        if scelti is None:
+            scelti = attesi     # Pochi onset: si usano i tempi attesi
+        for i, t in zip(righe, scelti):
+            risultato[i] = round(max(MIN_TIMESTAMP_S, float(t)), 2)
+    return risultato
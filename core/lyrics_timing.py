@@ -0,0 +1,43 @@
+# core/lyrics_timing.py
+# Ricerca della riga di lyrics attiva con ricerca binaria su un array ordinato di tempi,
+# più il tempo del prossimo cambio di riga: i timer della UI lavorano solo quando serve.
+
+from bisect import bisect_right
+import numpy as np
+
+
+class IndiceLyrics:
+    """
+    Tempi (s) delle righe ordinati in un array float64 e, nello stesso ordine,
+    l'indice della riga corrispondente (es. la riga della tabella nell'editor).
+    """
+    def __init__(self, tempi: list[float], righe: list[int] | None = None):
+        if righe is None:
+            righe = list(range(len(tempi)))
+        ordine = sorted(range(len(tempi)), key=lambda i: tempi[i])
+        self.tempi = np.array([tempi[i] for i in ordine], dtype=np.float64)
+        self.righe = [righe[i] for i in ordine]
+
+    def __len__(self):
+        return len(self.righe)
+
+    def posizione(self, tempo: float) -> int:
+        """Posizione nell'array dell'ultima riga con tempo <= 'tempo' (-1 prima della prima riga)."""
+        return bisect_right(self.tempi, tempo) - 1
+
+    def riga_attiva(self, tempo: float) -> int:
+        """Indice della riga attiva a 'tempo' (-1 se nessuna)."""
+        pos = self.posizione(tempo)
+        return self.righe[pos] if pos >= 0 else -1
+
+    def prossimo_cambio(self, tempo: float) -> float | None:
+        """Tempo della prossima riga dopo 'tempo' (None dopo l'ultima): fino ad allora la riga attiva non cambia."""
+        pos = self.posizione(tempo) + 1
+        return float(self.tempi[pos]) if pos < len(self.tempi) else None
+
+    def intervallo(self, tempo: float) -> tuple[float, float]:
+        """Intervallo [inizio, fine) attorno a 'tempo' in cui la riga attiva resta la stessa."""
+        pos = self.posizione(tempo)
+        inizio = float(self.tempi[pos]) if pos >= 0 else float("-inf")
+        fine = float(self.tempi[pos + 1]) if pos + 1 < len(self.tempi) else float("inf")
+        return inizio, fine
@@ -0,0 +1,87 @@
+# engines/audio_clock.py
+# Master clock della riproduzione derivato dai frame effettivamente consegnati allo
+# stream e dall'istante in cui PortAudio li porterà al DAC (outputBufferDacTime).
+
+import time
+
+# Massima crescita (s per callback) della stima dell'offset tra orologio PortAudio e
+# time.monotonic(): il minimo osservato assorbe i ritardi di ingresso nel callback.
+OFFSET_LEAK_S = 1e-6
+
+
+class ClockAudio:
+    """
+    Posizione di riproduzione (secondi) accurata al campione.
+
+    Ad ogni callback viene registrata un'ancora: il frame del brano all'inizio del
+    blocco e l'istante (time.monotonic()) in cui quel frame raggiungerà il DAC.
+    Tra un callback e l'altro la posizione è interpolata con time.monotonic():
+    posizione = frame / samplerate + (now - istante_dac). Il risultato non torna
+    mai indietro e non supera i frame già consegnati allo stream, quindi latenza
+    di uscita e underrun sono inclusi e non c'è deriva su un set di due ore.
+    """
+    def __init__(self):
+        self.sample_rate = 0
+        self.latenza_s = 0.0
+        self.in_corsa = False
+
+        self._ancora = (0, 0.0)     # (frame all'inizio del blocco, istante DAC in time.monotonic())
+        self._fine_frame = 0        # Ultimo frame consegnato allo stream (limite dell'interpolazione)
+        self._inizio_s = 0.0        # Posizione di partenza (avvio/seek/resume)
+        self._ferma_s = 0.0         # Posizione quando il clock è fermo
+        self._ultima_s = 0.0        # Ultima posizione restituita (monotonia)
+        self._offset = None         # time.monotonic() - orologio PortAudio
+
+    def avvia(self, frame: int, sample_rate: int, latenza_s: float = 0.0):
+        """Avvio, seek o resume dal frame indicato: fino al primo callback la posizione resta ferma lì."""
+        self.sample_rate = sample_rate
+        self.latenza_s = max(0.0, latenza_s)
+        self._inizio_s = frame / sample_rate if sample_rate else 0.0
+        self._ancora = (frame, time.monotonic() + self.latenza_s)
+        self._fine_frame = frame
+        self._ultima_s = self._inizio_s
+        self.in_corsa = True
+
+    def ferma(self, posizione_s: float = 0.0):
+        """Pausa/stop: la posizione resta 'posizione_s' finché il clock non viene riavviato."""
+        self.in_corsa = False
+        self._ferma_s = posizione_s
+
+    def aggiorna(self, frame: int, frames: int, time_info=None):
+        """
+        Chiamato dal callback audio prima di consegnare il blocco che inizia a 'frame'.
+        'time_info' è la struttura di PortAudio (outputBufferDacTime, currentTime).
+        """
+        now = time.monotonic()
+        dac = getattr(time_info, 'outputBufferDacTime', 0.0) if time_info is not None else 0.0
+        corrente = getattr(time_info, 'currentTime', 0.0) if time_info is not None else 0.0
+
+        if dac > 0.0 and corrente > 0.0:
+            # Converte l'orologio PortAudio in time.monotonic() con un offset stabile
+            campione = now - corrente
+            if self._offset is None or campione < self._offset + OFFSET_LEAK_S:
+                self._offset = campione
+            else:
+                self._offset += OFFSET_LEAK_S
+            istante_dac = dac + self._offset
+        else:
+            # Host API senza timestamp: stima con la latenza dichiarata dallo stream
+            istante_dac = now + self.latenza_s
+
+        self._ancora = (frame, istante_dac)
+        self._fine_frame = frame + frames
+
+    def posizione(self, now: float | None = None) -> float:
+        """Posizione corrente (s) interpolata con time.monotonic()."""
+        if not self.in_corsa:
+            return self._ferma_s
+        if not self.sample_rate:
+            return self._inizio_s
+
+        now = time.monotonic() if now is None else now
+        frame, istante_dac = self._ancora
+        pos = frame / self.sample_rate + (now - istante_dac)
+        pos = min(pos, self._fine_frame / self.sample_rate)
+        pos = max(pos, self._inizio_s, self._ultima_s)
+        self._ultima_s = pos
+        return pos
@@ -6,6 +6,23 @@ import threading
 import time
 import numpy as np
 import os
+from engines.audio_stream import StreamerBrano, DEFAULT_CALLBACK_FRAMES
+from engines.audio_clock import ClockAudio
+from engines.audio_output import UscitaAudio
+
+# Frame per callback dello stream di output (64-128 per il monitoraggio a bassa latenza)
+DEFAULT_BLOCK_SIZE = 256
+# Guadagno di default (dB) di ogni traccia nel mix (attenuazione per evitare clipping)
+DEFAULT_TRACK_GAIN_DB = -6.0
+DEFAULT_TRACK_GAIN = 10.0 ** (DEFAULT_TRACK_GAIN_DB / 20.0)
+# Livello minimo (dB) restituito dai meter quando la traccia è in silenzio
+METER_FLOOR_DB = -90.0
+# Scostamento massimo (s) tollerato tra un device secondario e il master clock
+DRIFT_TOLERANCE_S = 0.003
+# Frame massimi corretti per callback su un device secondario (correzione graduale)
+MAX_DRIFT_CORRECTION_FRAMES = 64
+# Frazione massima di un blocco che la correzione può riempire di silenzio (mai un blocco intero)
+MAX_DRIFT_CORRECTION_FRACTION = 0.25
 
 class AudioEngine:
     """
@@ -20,13 +37,28 @@ class AudioEngine:
         self.tracks = {}
         
         # --- PLAYBACK & SYNC ---
-        self.stream = None
+        # [MODIFICATO] Uno stream di output persistente per device: restano aperti per tutta la sessione
+        self.uscite: dict[int, UscitaAudio] = {}
+        self._in_riproduzione = False   # Il callback legge dalla sorgente (altrimenti silenzio)
+        self._terminato = False         # Il brano corrente è arrivato alla fine
         self.playing_song = None
-        self.start_time = 0.0
         self.pause_time = 0.0
         self.current_pos_frames = 0
+        # [NUOVO] Master clock accurato al campione (frame consegnati + outputBufferDacTime)
+        self.clock = ClockAudio()
         self.sample_rate = 0
         self.max_duration_frames = 0
+
+        # [NUOVO] Lettura in streaming: file aperti una volta, decodifica in un thread dedicato
+        self.streamer: StreamerBrano | None = None
+        # [NUOVO] Cache dell'audio decodificato (core.audio_cache.CachePCM), impostata dal main
+        self.pcm_cache = None
+        # [NUOVO] Brano successivo preparato in background (pre-warm della playlist)
+        self._preparato: dict | None = None
+        # [NUOVO] Frame per callback (0 = scelto dal driver) e stato dello stream riportato da PortAudio
+        self.block_size = DEFAULT_BLOCK_SIZE
+        self.status_count = 0
+        self.last_status = None
         
         self.refresh_outputs()
 
@@ -87,17 +119,83 @@ class AudioEngine:
     # GESTIONE TRACCE E AGGIORNAMENTO
     # -------------------------------------------------------------
     
-    def add_track(self, song_name, file_path, output_index, channels_used=None, output_start_channel=1):
+    def add_track(self, song_name, file_path, output_index, channels_used=None, output_start_channel=1,
+                  gain_db=DEFAULT_TRACK_GAIN_DB, mute=False, solo=False):
         """Aggiunge una traccia all'engine (richiamato da DataManager)."""
+        self.tracks.setdefault(song_name, []).append(
+            self._crea_track(file_path, output_index, channels_used, output_start_channel, gain_db, mute, solo)
+        )
+        self._aggiorna_guadagni(self.tracks[song_name])
+
+    def _crea_track(self, file_path, output_index, channels_used=None, output_start_channel=1,
+                    gain_db=DEFAULT_TRACK_GAIN_DB, mute=False, solo=False) -> dict:
+        """Costruisce il dizionario di routing di una traccia."""
         channels = self.get_output_channels(output_index)
-        
-        self.tracks.setdefault(song_name, []).append({
+        return {
             "file": file_path,
             "output": output_index,
             "channels": channels,
             "channels_used": channels_used if channels_used is not None else channels,
-            "output_start_channel": output_start_channel # Canale di partenza sull'output device
-        })
+            "output_start_channel": output_start_channel, # Canale di partenza sull'output device
+            "gain_db": DEFAULT_TRACK_GAIN_DB if gain_db is None else float(gain_db),
+            "mute": bool(mute),
+            "solo": bool(solo),
+            "gain": DEFAULT_TRACK_GAIN # Guadagno lineare effettivo letto dal callback (vedi _aggiorna_guadagni)
+        }
+
+    def _crea_tracks_brano(self, audio_tracks: list[dict]) -> list[dict]:
+        """Dizionari di routing delle tracce audio di un brano come salvate nel DataManager."""
+        tracks = [
+            self._crea_track(t['file'], t['output'], t.get('channels_used'), t.get('output_start_channel'),
+                             t.get('gain_db'), t.get('mute', False), t.get('solo', False))
+            for t in audio_tracks
+        ]
+        self._aggiorna_guadagni(tracks)
+        return tracks
+
+    @staticmethod
+    def _aggiorna_guadagni(tracks: list[dict]):
+        """
+        [NUOVO] Calcola il guadagno lineare effettivo di ogni traccia da gain_db, mute e solo.
+        Se almeno una traccia è in solo, le altre vengono silenziate. Il callback legge solo
+        "gain": la sostituzione di un valore nel dizionario è atomica, quindi non servono lock.
+        """
+        solo_attivo = any(t.get("solo") for t in tracks)
+        for t in tracks:
+            udibile = not t.get("mute") and (t.get("solo") or not solo_attivo)
+            t["gain"] = float(10.0 ** (t.get("gain_db", DEFAULT_TRACK_GAIN_DB) / 20.0)) if udibile else 0.0
+
+    def set_track_mix(self, song_name, index, gain_db=None, mute=None, solo=None):
+        """[NUOVO] Modifica guadagno (dB), mute e solo di una traccia; in riproduzione ha effetto dal blocco successivo."""
+        tracks = self.tracks.get(song_name, [])
+        if not 0 <= index < len(tracks):
+            return
+        track = tracks[index]
+        if gain_db is not None:
+            track["gain_db"] = float(gain_db)
+        if mute is not None:
+            track["mute"] = bool(mute)
+        if solo is not None:
+            track["solo"] = bool(solo)
+        self._aggiorna_guadagni(tracks)
+
+    def get_track_levels(self) -> list[tuple[float, float]]:
+        """
+        [NUOVO] Livelli (picco, RMS) in dBFS dell'ultimo blocco di ogni traccia del brano
+        corrente, nell'ordine delle tracce. Lettura senza lock: ogni traccia pubblica una
+        tupla nuova a ogni callback e qui se ne legge solo il riferimento.
+        """
+        streamer = self.streamer
+        if streamer is None or not self._in_riproduzione:
+            return []
+        livelli = []
+        for lettore in streamer.lettori:
+            picco, rms = lettore.livelli
+            livelli.append((
+                float(20.0 * np.log10(picco)) if picco > 0.0 else METER_FLOOR_DB,
+                float(20.0 * np.log10(rms)) if rms > 0.0 else METER_FLOOR_DB
+            ))
+        return livelli
 
     def remove_track(self, song_name, index):
         """Rimuove una traccia dall'engine."""
@@ -127,105 +225,243 @@ class AudioEngine:
     # PLAYBACK E CALLBACK (MASTER CLOCK)
     # -------------------------------------------------------------
     
-    def _audio_callback(self, outdata, frames, time_info, status):
-        """Callback chiamato da sounddevice per riempire il buffer audio (Multitraccia Mixing)."""
+    def set_pcm_cache(self, pcm_cache):
+        """[NUOVO] Imposta la cache PCM condivisa con il DataManager."""
+        self.pcm_cache = pcm_cache
+
+    def set_block_size(self, frames: int):
+        """[NUOVO] Imposta i frame per callback dello stream (applicato al prossimo avvio)."""
+        self.block_size = max(0, int(frames))
+
+    def _audio_callback(self, outdata, frames, time_info, status, uscita: UscitaAudio):
+        """
+        Callback chiamato da sounddevice per riempire il buffer audio di un device (Multitraccia Mixing).
+        [MODIFICATO] Non apre file e non alloca memoria: i campioni vengono copiati dai
+        ring buffer nel buffer preallocato di ogni traccia e sommati in place
+        direttamente nella porzione di 'outdata' assegnata alla traccia.
+        [MODIFICATO] Mixa solo le tracce instradate su questo device; i device secondari
+        vengono mantenuti allineati al master clock saltando o ritardando pochi frame.
+        """
         if status:
-            print(f"Status AudioEngine: {status}") 
-
-        song_tracks = self.tracks.get(self.playing_song, [])
-        if not song_tracks:
-            outdata.fill(0)
-            return
-
-        mix_buffer = np.zeros_like(outdata, dtype=np.float32)
-        is_end_of_file = False
+            # Nessuna stampa dal thread audio: lo stato viene solo registrato
+            self.status_count += 1
+            self.last_status = status
+
+        outdata.fill(0)
+        streamer = self.streamer
+        if not self._in_riproduzione or streamer is None or not uscita.lettori:
+            return # Idle o pausa: lo stream persistente emette silenzio
+
+        # [NUOVO] Ancora del clock: primo frame del blocco e istante in cui raggiunge il DAC
+        uscita.clock.aggiorna(uscita.pos_frames, frames, time_info)
+
+        inizio_blocco = 0       # Frame di silenzio a inizio blocco
+        ritardo = 0             # Di cui: ritardo per la deriva (non fanno avanzare la posizione)
+        if uscita.silenzio_iniziale:
+            # Resume di un device che era in anticipo sul master: il silenzio copre i frame già letti
+            inizio_blocco = min(uscita.silenzio_iniziale, frames)
+            uscita.silenzio_iniziale -= inizio_blocco
+        elif not uscita.master:
+            # Correzione della deriva rispetto al master clock (device con oscillatori diversi)
+            errore_frames = int((uscita.clock.posizione() - self.clock.posizione()) * self.sample_rate)
+            tolleranza = int(DRIFT_TOLERANCE_S * self.sample_rate)
+            if errore_frames < -tolleranza:
+                # In ritardo: salta alcuni frame
+                salto = min(-errore_frames, MAX_DRIFT_CORRECTION_FRAMES)
+                for lettore in uscita.lettori:
+                    lettore.salta(salto)
+                uscita.pos_frames += salto
+            elif errore_frames > tolleranza:
+                # In anticipo: inizia il blocco con qualche frame di silenzio (una frazione del blocco)
+                ritardo = min(errore_frames, MAX_DRIFT_CORRECTION_FRAMES, int(frames * MAX_DRIFT_CORRECTION_FRACTION))
+                inizio_blocco = ritardo
         
         # Determina il numero di canali nello stream di output
         output_channels = outdata.shape[1] 
 
-        for track_data in song_tracks:
-            file_path = track_data["file"]
+        for lettore in uscita.lettori:
+            track_data = lettore.track_data
             
             # Parametri di mappaggio della traccia
-            channels_to_use_by_user = track_data.get("channels_used", 1)
-            output_start_channel = track_data.get("output_start_channel", 1) # Indice base 1
-            
-            # Calcola l'indice di partenza (base 0) e quanti canali copiare sul mix buffer
-            start_idx_mix = output_start_channel - 1
-            
-            # Se la mappatura sfora l'output stream, salta
-            if start_idx_mix >= output_channels:
-                 continue
-            
-            # Limita i canali da usare se sfora la fine del mix buffer
-            channels_to_copy_to_mix = min(channels_to_use_by_user, output_channels - start_idx_mix)
+            channels_to_use_by_user = track_data.get("channels_used") or 1
+            start_idx_mix = (track_data.get("output_start_channel") or 1) - 1 # Indice base 0
+            gain = track_data.get("gain", DEFAULT_TRACK_GAIN)
+
+            # Quanti canali del file copiare (limitati dai canali del file e dalla fine dell'output)
+            file_channels_to_copy = min(lettore.canali, channels_to_use_by_user, output_channels - start_idx_mix)
+
+            # Il buffer va consumato anche se la traccia non è mappata, per restare allineati.
+            # Blocchi più grandi del buffer preallocato vengono elaborati a porzioni.
+            buffer = lettore.buffer_callback
+            offset = inizio_blocco
+            picco = 0.0
+            somma_quadrati = 0.0
+            while offset < frames:
+                n = min(frames - offset, len(buffer))
+                data = buffer[:n]
+                letti = lettore.leggi_in(data)
+                if file_channels_to_copy > 0 and letti > 0:
+                    sorgente = data[:letti, :file_channels_to_copy]
+                    sorgente *= gain
+                    outdata[offset:offset + letti, start_idx_mix:start_idx_mix + file_channels_to_copy] += sorgente
+                    # [NUOVO] Meter post-fader: max/min e prodotto scalare su una vista, senza array temporanei
+                    picco = max(picco, float(sorgente.max()), -float(sorgente.min()))
+                    if sorgente.flags.c_contiguous:
+                        piatto = sorgente.reshape(-1)
+                        somma_quadrati += float(np.dot(piatto, piatto))
+                    else:
+                        for c in range(file_channels_to_copy):
+                            colonna = sorgente[:, c]
+                            somma_quadrati += float(np.dot(colonna, colonna))
+                offset += n
+            campioni = (frames - inizio_blocco) * max(1, file_channels_to_copy)
+            # Blocco interamente di silenzio (resume di un device in anticipo): livelli nulli
+            lettore.livelli = (picco, (somma_quadrati / campioni) ** 0.5) if campioni else (0.0, 0.0)
+
+        uscita.pos_frames += frames - ritardo
+        if not uscita.master:
+            return
 
+        self.current_pos_frames = uscita.pos_frames
+        
+        # L'AudioEngine si ferma solo se tutte le tracce sono terminate E abbiamo superato la durata massima.
+        # [MODIFICATO] Dal thread audio si cambia solo lo stato: file e thread vengono chiusi dal prossimo stop/avvio.
+        if streamer.terminato and self.current_pos_frames >= self.max_duration_frames:
+            self._in_riproduzione = False
+            self._terminato = True
+            self.clock.ferma(self.max_duration_frames / self.sample_rate if self.sample_rate else 0.0)
 
-            try:
-                # Apertura e seek del file (ATTENZIONE: in produzione, aprire i file una sola volta)
-                with sf.SoundFile(file_path, 'r') as f:
-                    f.seek(self.current_pos_frames)
-                    data = f.read(frames, dtype='float32', always_2d=True)
-                
-                # Gestione fine file e padding
-                if data.shape[0] < frames:
-                    is_end_of_file = True
-                    pad_frames = frames - data.shape[0]
-                    data = np.pad(data, ((0, pad_frames), (0, 0)), 'constant')
-                
-                temp_buffer = np.zeros_like(outdata, dtype=np.float32)
-                
-                # Canali disponibili nel file sorgente
-                channels_from_file = data.shape[1]
-
-                # Quanti canali del file copiare (minimo tra i canali disponibili nel file e quelli che verranno mappati sul mix buffer)
-                file_channels_to_copy = min(channels_from_file, channels_to_copy_to_mix)
-
-                # Copia e mixaggio
-                # Copia i primi `file_channels_to_copy` canali del file nel `temp_buffer`
-                # a partire dall'indice `start_idx_mix`.
-                temp_buffer[:, start_idx_mix:start_idx_mix + file_channels_to_copy] = data[:, :file_channels_to_copy]
-
-                # Mixaggio (attenuato a 0.5 per evitare clipping)
-                mix_buffer += temp_buffer * 0.5 
+    def get_underrun_counts(self) -> dict:
+        """[NUOVO] Underrun del brano corrente per file: {file: (callback in underrun, frame sostituiti da silenzio)}."""
+        streamer = self.streamer
+        return streamer.underruns() if streamer else {}
 
-            except Exception as e:
-                print(f"Errore lettura traccia {file_path}: {e}")
-                pass
-        
-        outdata[:] = mix_buffer
-        self.current_pos_frames += frames
-        
-        # L'AudioEngine si ferma solo se l'end of file è vero E abbiamo superato la durata massima.
-        if is_end_of_file and self.current_pos_frames >= self.max_duration_frames:
-            self.stop_playback(self.playing_song)
+    def get_total_underruns(self) -> int:
+        """[NUOVO] Numero totale di underrun (somma su tutte le tracce) del brano corrente."""
+        return sum(count for count, _ in self.get_underrun_counts().values())
 
+    def _chiudi_streamer(self):
+        """Ferma il thread di decodifica e chiude i file del brano corrente."""
+        streamer, self.streamer = self.streamer, None
+        if streamer:
+            streamer.ferma()
+
+
+    # -------------------------------------------------------------
+    # PRE-WARM DEL BRANO SUCCESSIVO
+    # -------------------------------------------------------------
+
+    def prepara_brano(self, song_name, audio_tracks: list[dict]):
+        """
+        [NUOVO] Apre in background i file del brano indicato e ne decodifica i primi
+        secondi (read-ahead), così che il suo avvio dall'inizio non debba attendere I/O.
+        'audio_tracks' sono le tracce audio del brano come salvate nel DataManager.
+        """
+        self._scarta_preparato()
+        if not audio_tracks:
+            return
+
+        tracks = self._crea_tracks_brano(audio_tracks)
+        preparato = {"song": song_name, "files": [t["file"] for t in tracks],
+                     "streamer": None, "info": None, "pronto": threading.Event(),
+                     "scartato": False, "lock": threading.Lock()}
+        self._preparato = preparato
+
+        def _prepara():
+            try:
+                info = sf.info(tracks[0]['file'])
+                streamer = StreamerBrano(tracks, info.samplerate,
+                                         callback_frames=self.block_size or DEFAULT_CALLBACK_FRAMES,
+                                         pcm_cache=self.pcm_cache)
+                streamer.riempi()
+                preparato["info"], preparato["streamer"] = info, streamer
+            except Exception as e:
+                print(f"Errore nella preparazione del brano '{song_name}': {e}")
+            finally:
+                with preparato["lock"]:
+                    preparato["pronto"].set()
+                    scartato = preparato["scartato"]
+            if scartato and preparato["streamer"]:
+                preparato["streamer"].ferma() # Scartato mentre veniva preparato
+
+        threading.Thread(target=_prepara, daemon=True).start()
+
+    def _scarta_preparato(self):
+        preparato, self._preparato = self._preparato, None
+        if not preparato:
+            return
+        with preparato["lock"]:
+            preparato["scartato"] = True
+            pronto = preparato["pronto"].is_set()
+        if pronto and preparato["streamer"]:
+            preparato["streamer"].ferma()
+
+    def _prendi_preparato(self, song_name, song_tracks: list[dict]):
+        """Restituisce (streamer, info) del brano preparato se corrisponde alle tracce attuali, altrimenti None."""
+        preparato = self._preparato
+        if not preparato or preparato["song"] != song_name:
+            return None
+        self._preparato = None
+        with preparato["lock"]:
+            if not preparato["pronto"].is_set():
+                # Ancora in preparazione: nessuna attesa sul thread della UI, avvio a freddo
+                # (il thread di preparazione chiuderà il suo streamer, ormai scartato)
+                preparato["scartato"] = True
+                return None
+        streamer = preparato["streamer"]
+        if streamer is None:
+            return None
+        if preparato["files"] != [t["file"] for t in song_tracks] or len(streamer.lettori) != len(song_tracks):
+            streamer.ferma()
+            return None
+        # Il routing segue i dizionari correnti dell'engine (eventuali modifiche di output/canali)
+        for lettore, track_data in zip(streamer.lettori, song_tracks):
+            lettore.track_data = track_data
+        return streamer, preparato["info"]
 
     def start_playback(self, song_name, start_time_s=0.0):
-        """Avvia o riprende la riproduzione. Gestisce Salto (seek) o Pausa (resume)."""
-        if self.stream and self.stream.active:
+        """
+        Avvia o riprende la riproduzione. Gestisce Salto (seek) o Pausa (resume).
+        [MODIFICATO] Lo stream di output resta aperto: avvio, seek e cambio brano
+        sostituiscono solo la sorgente letta dal callback.
+        """
+        if self._in_riproduzione:
             return
-        
-        self.playing_song = song_name
+
         song_tracks = self.tracks.get(song_name, [])
         if not song_tracks:
             return
 
+        # [NUOVO] Resume da pausa: la sorgente è ancora pronta, i buffer sono intatti
+        if (self.streamer is not None and self.playing_song == song_name
+                and start_time_s == 0.0 and self.pause_time > 0.0):
+            self.pause_time = 0.0
+            self._avvia_clock_uscite(self.current_pos_frames)
+            self._in_riproduzione = True
+            return
+
+        self.playing_song = song_name
+        self._terminato = False
+
+        # [NUOVO] Brano già preparato in background: file aperti e buffer pieni (solo avvio dall'inizio)
+        preparato = None
+        if start_time_s == 0.0 and self.pause_time == 0.0:
+            preparato = self._prendi_preparato(song_name, song_tracks)
+
         # Determinazione dei parametri del file principale (traccia 0)
         try:
-            info = sf.info(song_tracks[0]['file'])
-            self.sample_rate = info.samplerate
-            self.max_duration_frames = info.frames
+            info = preparato[1] if preparato else sf.info(song_tracks[0]['file'])
+            sample_rate = info.samplerate
+            max_duration_frames = info.frames
             output_index = song_tracks[0]['output']
-            stream_channels = self.get_output_channels(output_index)
         except Exception as e:
             print(f"Errore nel caricamento dei parametri del file principale: {e}")
             return
         
         # **NUOVA LOGICA DI SICUREZZA PER IL MASTER CLOCK**
-        if self.max_duration_frames <= 0:
-             FALLBACK_DURATION_FRAMES = self.sample_rate * 3600 if self.sample_rate > 0 else 44100 * 3600 
-             self.max_duration_frames = FALLBACK_DURATION_FRAMES
+        if max_duration_frames <= 0:
+             FALLBACK_DURATION_FRAMES = sample_rate * 3600 if sample_rate > 0 else 44100 * 3600 
+             max_duration_frames = FALLBACK_DURATION_FRAMES
              print("AVVISO: Durata Master Audio non valida. Uso durata fittizia per sync MIDI/Lyrics.")
         # -----------------------------------------------------------------
 
@@ -234,57 +470,118 @@ class AudioEngine:
         start_ts = start_time_s
         if start_ts == 0.0 and self.pause_time > 0.0:
             start_ts = self.pause_time
-
-        self.current_pos_frames = int(start_ts * self.sample_rate)
-        self.start_time = time.time() - start_ts
         self.pause_time = 0.0
 
-        if self.current_pos_frames >= self.max_duration_frames:
-             self.current_pos_frames = 0
-             self.start_time = time.time()
+        start_frame = int(start_ts * sample_rate)
+        if start_frame >= max_duration_frames:
+             start_frame = 0
              start_ts = 0.0
 
-        # Avvia lo stream
-        try:
-            self.stream = sd.OutputStream(
-                samplerate=self.sample_rate,
-                device=output_index,
-                channels=stream_channels,
-                callback=self._audio_callback,
-                dtype='float32'
-            )
-            self.stream.start()
-            
-        except sd.PortAudioError as e:
-            print(f"ERRORE CRITICO AVVIO AUDIO (sounddevice): {e}")
-            print(f"IMPOSSIBILE APRIRE IL DEVICE: {output_index}. Controlla i driver audio.")
-            self.stop_playback(song_name) 
-            return
-        except Exception as e:
-            print(f"ERRORE GENERICO DURANTE L'AVVIO: {e}")
-            self.stop_playback(song_name) 
+        # [NUOVO] Apre i file una sola volta e riempie i buffer di read-ahead prima di passarli al callback
+        if preparato and start_frame == 0:
+            nuovo_streamer = preparato[0]
+        else:
+            if preparato:
+                preparato[0].ferma()
+            nuovo_streamer = StreamerBrano(song_tracks, sample_rate, start_frame=start_frame,
+                                           callback_frames=self.block_size or DEFAULT_CALLBACK_FRAMES,
+                                           pcm_cache=self.pcm_cache)
+        nuovo_streamer.avvia()
+
+        # [NUOVO] Uno stream per ogni device usato dal brano: viene (ri)aperto solo se
+        # cambiano canali, frequenza di campionamento o dimensione del blocco
+        dispositivi = {output_index: []}
+        for lettore in nuovo_streamer.lettori:
+            dispositivi.setdefault(lettore.track_data.get("output", output_index), []).append(lettore)
+        if not self._assicura_uscite(dispositivi, sample_rate):
+            nuovo_streamer.ferma()
+            self.stop_playback(song_name)
             return
 
+        # Cambio sorgente: i callback leggono il nuovo brano dal prossimo blocco
+        self._in_riproduzione = False
+        vecchio_streamer = self.streamer
+        self.sample_rate = sample_rate
+        self.max_duration_frames = max_duration_frames
+        self.current_pos_frames = start_frame
+        for device, uscita in self.uscite.items():
+            uscita.master = device == output_index
+            if uscita.master:
+                uscita.clock = self.clock
+            elif uscita.clock is self.clock:
+                uscita.clock = ClockAudio() # Un device secondario ha sempre un clock proprio
+            uscita.lettori = dispositivi.get(device, [])
+            uscita.silenzio_iniziale = 0
+        self.streamer = nuovo_streamer
+        self._avvia_clock_uscite(start_frame)
+        self._in_riproduzione = True
+        if vecchio_streamer is not None and vecchio_streamer is not nuovo_streamer:
+            vecchio_streamer.ferma()
+
+    def _assicura_uscite(self, dispositivi: dict, sample_rate: int) -> bool:
+        """
+        [NUOVO] Garantisce che ogni device richiesto abbia il suo stream persistente aperto.
+        Gli stream degli altri device restano aperti (in silenzio). Un device secondario
+        che non si apre viene escluso dal brano; il fallimento del master annulla l'avvio.
+        """
+        master = next(iter(dispositivi))
+        for device in list(dispositivi):
+            uscita = self.uscite.setdefault(device, UscitaAudio(device))
+            if not uscita.apri(self.get_output_channels(device), sample_rate, self.block_size, self._audio_callback):
+                if device == master:
+                    return False
+                print(f"AVVISO: Device {device} non disponibile: le tracce instradate su di esso sono escluse.")
+                dispositivi.pop(device)
+        return True
+
+    def _avvia_clock_uscite(self, frame: int):
+        """Riparte da 'frame' su tutti i device (avvio, seek o resume)."""
+        for uscita in self.uscite.values():
+            uscita.pos_frames = frame
+            if uscita.lettori or uscita.master:
+                uscita.clock.avvia(frame, self.sample_rate, uscita.latenza())
 
     def pause_playback(self, song_name):
-        """Mette in pausa la riproduzione e memorizza la posizione."""
-        if self.stream and self.stream.active:
-            self.pause_time = time.time() - self.start_time
-            self.stream.stop()
-            self.stream.close()
-            self.stream = None
+        """
+        Mette in pausa la riproduzione e memorizza la posizione.
+        [MODIFICATO] Lo stream resta aperto (silenzio) e la sorgente resta pronta per il resume.
+        """
+        if self._in_riproduzione:
+            self._in_riproduzione = False
+            # La posizione è quella effettivamente letta dal callback
+            self.pause_time = self.current_pos_frames / self.sample_rate if self.sample_rate else 0.0
+            for uscita in self.uscite.values():
+                uscita.clock.ferma(self.pause_time)
+                # Al resume tutti i device ripartono dalla posizione del master: chi è in ritardo
+                # salta i frame mancanti, chi è in anticipo riparte con altrettanti frame di silenzio
+                differenza = self.current_pos_frames - uscita.pos_frames
+                if differenza > 0:
+                    for lettore in uscita.lettori:
+                        lettore.salta(differenza)
+                elif uscita.lettori:
+                    uscita.silenzio_iniziale = -differenza
             
     def stop_playback(self, song_name):
-        """Ferma la riproduzione e resetta la posizione a zero."""
-        if self.stream:
-            self.stream.stop()
-            self.stream.close()
-            self.stream = None
+        """Ferma la riproduzione e resetta la posizione a zero (lo stream resta aperto)."""
+        self._in_riproduzione = False
+        self._terminato = False
+        self._chiudi_streamer()
+        for uscita in self.uscite.values():
+            uscita.lettori = []
+            uscita.silenzio_iniziale = 0
             
         self.playing_song = None
         self.current_pos_frames = 0
-        self.start_time = 0.0
         self.pause_time = 0.0
+        self.clock.ferma(0.0)
+
+    def shutdown(self):
+        """[NUOVO] Ferma la riproduzione e chiude lo stream persistente (chiusura dell'applicazione)."""
+        self.stop_playback(self.playing_song)
+        self._scarta_preparato()
+        for uscita in self.uscite.values():
+            uscita.chiudi()
+        self.uscite.clear()
         
 
     # -------------------------------------------------------------
@@ -292,16 +589,25 @@ class AudioEngine:
     # -------------------------------------------------------------
 
     def is_stopped(self) -> bool:
-        """Controlla se lo stream è stato fermato o non è mai stato avviato."""
-        return self.stream is None or not self.stream.active
+        """Controlla se la riproduzione è ferma (stop, pausa, fine brano o mai avviata)."""
+        return not self._in_riproduzione
+
+    def is_finished(self) -> bool:
+        """[NUOVO] True se il brano corrente è arrivato alla fine (e non è stato ancora fermato o riavviato)."""
+        return self._terminato and self.playing_song is not None
 
     def get_current_time(self) -> float:
-        """Restituisce il tempo di riproduzione corrente in secondi."""
-        if self.stream and self.stream.active:
-            # Tempo corrente basato sull'orologio di sistema per alta risoluzione
-            return time.time() - self.start_time
+        """
+        Restituisce il tempo di riproduzione corrente in secondi.
+        [MODIFICATO] Derivato dai frame consegnati allo stream e dalla latenza di uscita
+        (ClockAudio), interpolato con time.monotonic() tra un callback e l'altro.
+        """
+        if self._in_riproduzione:
+            return self.clock.posizione()
         elif self.pause_time > 0.0:
             return self.pause_time
+        elif self.is_finished():
+            return self.get_duration()
         return 0.0
 
     def get_duration(self) -> float:
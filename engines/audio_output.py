@@ -0,0 +1,80 @@
+# engines/audio_output.py
+# Stream di output persistente su un singolo device audio. L'AudioEngine ne apre uno
+# per ogni device usato dalle tracce del brano e li allinea al master clock.
+
+import functools
+import sounddevice as sd
+from engines.audio_clock import ClockAudio
+
+
+class UscitaAudio:
+    """
+    Un device di output con il suo stream persistente, le tracce instradate su di
+    esso ('lettori'), il contatore dei frame consegnati e il proprio ClockAudio.
+    L'uscita 'master' (device della traccia 0) usa il clock principale dell'engine;
+    le altre confrontano il proprio clock con quello per correggere la deriva.
+    """
+    def __init__(self, device: int):
+        self.device = device
+        self.stream = None
+        self.params = None              # (canali, samplerate, blocksize) dello stream aperto
+        self.clock = ClockAudio()
+        self.lettori = []               # LettoreTraccia instradati su questo device
+        self.pos_frames = 0             # Frame del brano consegnati da questo stream
+        self.silenzio_iniziale = 0      # Frame di silenzio da emettere al resume (device che era in anticipo)
+        self.master = False
+
+    @property
+    def aperta(self) -> bool:
+        return self.stream is not None
+
+    def apri(self, channels: int, sample_rate: int, block_size: int, callback) -> bool:
+        """
+        Apre lo stream se non è già aperto con gli stessi parametri.
+        'callback' riceve (outdata, frames, time_info, status, uscita).
+        """
+        params = (channels, sample_rate, block_size)
+        if self.stream is not None and self.params == params:
+            return True
+
+        self.chiudi()
+        try:
+            self.stream = sd.OutputStream(
+                samplerate=sample_rate,
+                device=self.device,
+                channels=channels,
+                blocksize=block_size,
+                callback=functools.partial(callback, uscita=self),
+                dtype='float32'
+            )
+            self.stream.start()
+            self.params = params
+            return True
+
+        except sd.PortAudioError as e:
+            print(f"ERRORE CRITICO AVVIO AUDIO (sounddevice): {e}")
+            print(f"IMPOSSIBILE APRIRE IL DEVICE: {self.device}. Controlla i driver audio.")
+        except Exception as e:
+            print(f"ERRORE GENERICO DURANTE L'AVVIO: {e}")
+        self.chiudi()
+        return False
+
+    def latenza(self) -> float:
+        """Latenza di uscita dichiarata dallo stream (s)."""
+        try:
+            latenza = self.stream.latency if self.stream is not None else 0.0
+            return float(latenza[1] if isinstance(latenza, (tuple, list)) else latenza)
+        except Exception:
+            return 0.0
+
+    def chiudi(self):
+        """Chiude lo stream (cambio di parametri o chiusura dell'applicazione)."""
+        stream, self.stream = self.stream, None
+        self.params = None
+        if stream is None:
+            return
+        try:
+            stream.stop()
+            stream.close()
+        except Exception as e:
+            print(f"Errore chiusura stream audio (device {self.device}): {e}")
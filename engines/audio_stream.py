@@ -0,0 +1,288 @@
+# engines/audio_stream.py
+# Lettura in streaming delle tracce audio: i file vengono aperti una sola volta e
+# un thread di decodifica per brano riempie dei ring buffer in anticipo rispetto
+# alla testina di riproduzione. Il callback audio si limita a copiare dai buffer.
+
+import soundfile as sf
+import threading
+import numpy as np
+from core.audio_resample import Ricampionatore
+
+# Secondi di audio decodificati in anticipo per ogni traccia
+READ_AHEAD_S = 2.0
+# Frame decodificati per ogni lettura del thread
+DECODE_BLOCK_FRAMES = 4096
+# Pausa del thread di decodifica quando tutti i buffer sono pieni (s)
+DECODE_IDLE_S = 0.01
+# Dimensione di default del buffer di mixaggio per traccia (frame per callback)
+DEFAULT_CALLBACK_FRAMES = 1024
+
+
+class RingBufferAudio:
+    """
+    Ring buffer audio a singolo produttore / singolo consumatore (float32, frame x canali).
+
+    Non usa lock: il produttore (thread di decodifica) aggiorna solo 'scritti' e il
+    consumatore (callback audio) aggiorna solo 'letti'. Entrambi sono contatori
+    monotoni di frame; ogni lato li incrementa solo dopo aver copiato i dati.
+    """
+    def __init__(self, capacita_frames: int, canali: int):
+        self.capacita = max(1, int(capacita_frames))
+        self.canali = max(1, int(canali))
+        self.dati = np.zeros((self.capacita, self.canali), dtype=np.float32)
+        self.scritti = 0
+        self.letti = 0
+
+    def disponibili(self) -> int:
+        """Frame pronti per la lettura."""
+        return self.scritti - self.letti
+
+    def spazio_libero(self) -> int:
+        """Frame che il produttore può ancora scrivere."""
+        return self.capacita - (self.scritti - self.letti)
+
+    def scrivi(self, blocco: np.ndarray) -> int:
+        """Accoda 'blocco' (frame x canali) fino allo spazio disponibile. Restituisce i frame scritti."""
+        n = min(len(blocco), self.spazio_libero())
+        if n <= 0:
+            return 0
+        inizio = self.scritti % self.capacita
+        primo = min(n, self.capacita - inizio)
+        self.dati[inizio:inizio + primo] = blocco[:primo]
+        if n > primo:
+            self.dati[:n - primo] = blocco[primo:n]
+        self.scritti += n
+        return n
+
+    def leggi_in(self, out: np.ndarray) -> int:
+        """
+        Copia in 'out' (frame x canali, stessi canali del buffer) fino a len(out) frame.
+        Restituisce i frame copiati: gli eventuali frame restanti di 'out' non vengono toccati.
+        """
+        n = min(len(out), self.disponibili())
+        if n <= 0:
+            return 0
+        inizio = self.letti % self.capacita
+        primo = min(n, self.capacita - inizio)
+        out[:primo] = self.dati[inizio:inizio + primo]
+        if n > primo:
+            out[primo:n] = self.dati[:n - primo]
+        self.letti += n
+        return n
+
+    def scarta(self, frames: int) -> int:
+        """Scarta (lato consumatore) fino a 'frames' frame. Restituisce i frame scartati."""
+        n = min(int(frames), self.disponibili())
+        if n <= 0:
+            return 0
+        self.letti += n
+        return n
+
+
+class LettoreTraccia:
+    """
+    Una traccia in streaming: handle del file aperto una sola volta, ring buffer di
+    read-ahead e contatori di underrun. 'track_data' è il dizionario di routing
+    dell'AudioEngine (output_start_channel, channels_used, gain...), letto dal callback.
+
+    [NUOVO] Se la frequenza del file è diversa da 'samplerate_uscita' (quella dello
+    stream), il thread di decodifica ricampiona i blocchi prima di scriverli nel buffer.
+    Posizioni e seek sono sempre espressi in frame alla frequenza dello stream.
+    """
+    def __init__(self, track_data: dict, read_ahead_frames: int, callback_frames: int = DEFAULT_CALLBACK_FRAMES,
+                 pcm: np.ndarray | None = None, pcm_samplerate: int = 0, samplerate_uscita: int = 0):
+        self.track_data = track_data
+        self.file_path = track_data["file"]
+
+        # [NUOVO] Sorgente: PCM decodificato in cache (memmap) oppure il file aperto una sola volta
+        self.pcm = pcm
+        self._pos_pcm = 0
+        if pcm is not None:
+            self.file = None
+            self.canali = pcm.shape[1]
+            self.samplerate = pcm_samplerate
+        else:
+            self.file = sf.SoundFile(self.file_path, 'r')
+            self.canali = self.file.channels
+            self.samplerate = self.file.samplerate
+        self.ricampionatore = None
+        if samplerate_uscita and self.samplerate and self.samplerate != samplerate_uscita:
+            self.ricampionatore = Ricampionatore(self.samplerate, samplerate_uscita, self.canali)
+        self.ring = RingBufferAudio(read_ahead_frames, self.canali)
+        self._blocco = np.zeros((DECODE_BLOCK_FRAMES, self.canali), dtype=np.float32)
+        # Buffer preallocato in cui il callback copia i campioni prima del mixaggio
+        self.buffer_callback = np.zeros((max(1, int(callback_frames)), self.canali), dtype=np.float32)
+
+        self.fine_file = False          # Il decoder ha raggiunto la fine del file
+        self.underruns = 0              # Callback in cui il buffer non aveva abbastanza frame
+        self.frame_mancanti = 0         # Totale dei frame sostituiti con silenzio
+        self._da_saltare = 0            # Frame persi in underrun, da scartare per restare allineati al clock
+        # [NUOVO] (picco, RMS) lineari dell'ultimo blocco mixato: tupla sostituita a ogni callback e letta dalla UI
+        self.livelli = (0.0, 0.0)
+
+    @property
+    def terminata(self) -> bool:
+        """True quando il file è stato decodificato tutto e il buffer è vuoto."""
+        return self.fine_file and self.ring.disponibili() == 0
+
+    def posiziona(self, frame: int):
+        """Seek del file (solo dal thread di decodifica o prima del suo avvio)."""
+        if self.ricampionatore is not None:
+            # Il ricampionatore riparte dal frame di ingresso corrispondente (contesto iniziale nullo)
+            self.ricampionatore.reset()
+            frame = self.ricampionatore.frame_ingresso(frame)
+        if self.pcm is not None:
+            self._pos_pcm = max(0, min(int(frame), len(self.pcm)))
+            self.fine_file = self._pos_pcm >= len(self.pcm)
+            return
+        try:
+            self.file.seek(max(0, min(int(frame), self.file.frames)))
+            self.fine_file = False
+        except Exception as e:
+            print(f"Errore seek traccia {self.file_path}: {e}")
+            self.fine_file = True
+
+    def decodifica(self) -> bool:
+        """Decodifica un blocco se c'è spazio nel buffer. Restituisce True se ha letto dati."""
+        if self.fine_file:
+            return False
+        n = min(DECODE_BLOCK_FRAMES, self.ring.spazio_libero())
+        if self.ricampionatore is not None:
+            # Frame di ingresso la cui uscita entra nel buffer, con margine per la coda del filtro a fine file
+            r = self.ricampionatore
+            margine = r.frame_uscita(r.semi + 1) + 1
+            n = min(DECODE_BLOCK_FRAMES, (self.ring.spazio_libero() - margine) * r.down // r.up)
+        if n <= 0:
+            return False
+        if self.pcm is not None:
+            # Dalla cache: una slice del memmap (le pagine vengono caricate qui, non nel callback)
+            letti = self.pcm[self._pos_pcm:self._pos_pcm + n]
+            self._pos_pcm += len(letti)
+            if self._pos_pcm >= len(self.pcm):
+                self.fine_file = True
+            if len(letti):
+                self.ring.scrivi(letti)
+            return len(letti) > 0
+        try:
+            letti = self.file.read(n, dtype='float32', always_2d=True, out=self._blocco[:n])
+        except Exception as e:
+            print(f"Errore lettura traccia {self.file_path}: {e}")
+            self.fine_file = True
+            return False
+        if len(letti) < n:
+            self.fine_file = True
+        if self.ricampionatore is not None:
+            uscita = self.ricampionatore.elabora(letti, fine=self.fine_file)
+            if len(uscita):
+                self.ring.scrivi(uscita)
+            return len(letti) > 0 or len(uscita) > 0
+        if len(letti):
+            self.ring.scrivi(letti)
+        return len(letti) > 0
+
+    def leggi_in(self, out: np.ndarray) -> int:
+        """
+        Chiamato dal callback: copia i frame disponibili in 'out' e conta gli underrun.
+        I frame sostituiti da silenzio vengono poi scartati, così la traccia resta
+        allineata ai frame consegnati allo stream (il master clock).
+        """
+        if self._da_saltare:
+            self._da_saltare -= self.ring.scarta(self._da_saltare)
+            if self._da_saltare:
+                if not self.fine_file:
+                    self.underruns += 1
+                    self._da_saltare += len(out)
+                    self.frame_mancanti += len(out)
+                return 0
+        letti = self.ring.leggi_in(out)
+        if letti < len(out) and not self.fine_file:
+            self.underruns += 1
+            self.frame_mancanti += len(out) - letti
+            self._da_saltare += len(out) - letti
+        return letti
+
+    def salta(self, frames: int):
+        """Chiamato dal callback: salta 'frames' frame (correzione della deriva tra device)."""
+        self._da_saltare += max(0, int(frames))
+
+    def chiudi(self):
+        self.pcm = None
+        if self.file is None:
+            return
+        try:
+            self.file.close()
+        except Exception:
+            pass
+
+
+class StreamerBrano:
+    """
+    Thread di decodifica di un brano: mantiene pieni i ring buffer di tutte le sue
+    tracce. Il buffer iniziale viene riempito in modo sincrono da 'avvia', così il
+    primo callback trova già i dati pronti.
+
+    Se è disponibile una CachePCM, le tracce già decodificate vengono lette dal
+    memmap; le altre vengono decodificate dal file e accodate per la cache.
+    """
+    def __init__(self, tracks: list[dict], samplerate: int, start_frame: int = 0,
+                 read_ahead_s: float = READ_AHEAD_S, callback_frames: int = DEFAULT_CALLBACK_FRAMES,
+                 pcm_cache=None):
+        read_ahead_frames = max(DECODE_BLOCK_FRAMES, int(read_ahead_s * samplerate))
+        self.lettori: list[LettoreTraccia] = []
+        for track_data in tracks:
+            pcm, pcm_samplerate = None, 0
+            if pcm_cache is not None:
+                # [MODIFICATO] Solo PCM alla frequenza dello stream (eventualmente già ricampionato)
+                in_cache = pcm_cache.ottieni(track_data["file"], samplerate)
+                if in_cache is not None:
+                    pcm, pcm_samplerate = in_cache
+                else:
+                    pcm_cache.richiedi(track_data["file"], samplerate)
+            try:
+                self.lettori.append(LettoreTraccia(track_data, read_ahead_frames, callback_frames,
+                                                   pcm=pcm, pcm_samplerate=pcm_samplerate,
+                                                   samplerate_uscita=samplerate))
+            except Exception as e:
+                print(f"Errore apertura traccia {track_data.get('file')}: {e}")
+
+        for lettore in self.lettori:
+            lettore.posiziona(start_frame)
+
+        self._stop = threading.Event()
+        self._thread = None
+
+    def riempi(self):
+        """Riempie in modo sincrono i buffer di read-ahead (usato anche per il pre-warm del brano successivo)."""
+        while any(lettore.decodifica() for lettore in self.lettori):
+            pass
+
+    def avvia(self):
+        """Riempie i buffer e avvia il thread di decodifica."""
+        self.riempi()
+        self._thread = threading.Thread(target=self._loop_decodifica, daemon=True)
+        self._thread.start()
+
+    def _loop_decodifica(self):
+        while not self._stop.is_set():
+            lavoro = False
+            for lettore in self.lettori:
+                lavoro = lettore.decodifica() or lavoro
+            if not lavoro:
+                self._stop.wait(DECODE_IDLE_S)
+
+    def ferma(self):
+        """Ferma il thread e chiude i file."""
+        self._stop.set()
+        if self._thread and self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=0.5)
+        self._thread = None
+        for lettore in self.lettori:
+            lettore.chiudi()
+
+    @property
+    def terminato(self) -> bool:
+        return all(lettore.terminata for lettore in self.lettori)
+
+    def underruns(self) -> dict:
+        """Contatori di underrun per file: {file: (underrun, frame_mancanti)}."""
+        return {l.file_path: (l.underruns, l.frame_mancanti) for l in self.lettori}
@@ -20,6 +20,10 @@ class MidiEngine(QObject):
 
     # [NUOVO] Limite di frequenza per i messaggi CC interni (20ms = 50 Hz)
     INTERNAL_CC_RATE_MS = 20
+    # [NUOVO] Attesa massima tra due controlli del master clock durante il playback dei file (s)
+    CLOCK_WAIT_MAX_S = 0.005
+    # [NUOVO] Messaggi più vecchi di questa soglia rispetto al clock all'avvio vengono saltati (avvio a metà brano)
+    CLOCK_SKIP_TOLERANCE_S = 0.05
 
     def __init__(self, parent=None): 
         super().__init__(parent)
@@ -45,6 +49,11 @@ class MidiEngine(QObject):
         # --- MIDI PLAYBACK FILE STATE ---
         self.playback_threads = {} # { song_name: [list of running threads] }
         self.playback_running = False
+        # [NUOVO] Sorgente di tempo del brano (AudioEngine.get_current_time): se impostata,
+        # i file MIDI vengono schedulati sul master clock audio invece che sull'orologio di sistema
+        self.time_source = None
+        # [NUOVO] File MIDI già analizzati in anticipo (pre-warm del brano successivo): { path: MidiFile }
+        self._midi_file_preparati = {}
         
         # --- PLAYBACK STATE ---
         self.playing = False
@@ -131,6 +140,38 @@ class MidiEngine(QObject):
     # THREAD DI PLAYBACK FILE MIDI
     # -------------------------------------------------------------
 
+    def set_time_source(self, time_source):
+        """[NUOVO] Imposta la funzione che restituisce il tempo del brano in secondi (master clock)."""
+        self.time_source = time_source
+
+    def _messaggi_file(self, midi_file):
+        """
+        Generatore dei messaggi (non meta) di un file MIDI all'istante previsto.
+        Con un master clock impostato ogni messaggio viene atteso sul tempo assoluto
+        del brano (nessuna deriva rispetto all'audio); altrimenti usa mido.play().
+        """
+        time_source = self.time_source
+        if time_source is None:
+            yield from midi_file.play(meta_messages=False)
+            return
+
+        inizio = time_source()
+        tempo_msg = 0.0
+        for msg in midi_file:
+            tempo_msg += msg.time
+            if msg.is_meta:
+                continue
+            if tempo_msg < inizio - self.CLOCK_SKIP_TOLERANCE_S:
+                continue # Avvio a metà brano: i messaggi già superati non vengono inviati in blocco
+            while self.playback_running:
+                ritardo = tempo_msg - time_source()
+                if ritardo <= 0.0:
+                    break
+                time.sleep(min(ritardo, self.CLOCK_WAIT_MAX_S))
+            if not self.playback_running:
+                return
+            yield msg
+
     def _midi_file_playback_thread(self, song_name: str, track_data: dict, master_bpm: float):
         """
         Thread dedicato a riprodurre un singolo file MIDI associato a una traccia.
@@ -145,7 +186,7 @@ class MidiEngine(QObject):
              return
 
         try:
-            midi_file = mido.MidiFile(file_path)
+            midi_file = self._midi_file_preparati.pop(file_path, None) or mido.MidiFile(file_path)
             
             is_internal_dmx = (port_name == INTERNAL_DMX_PORT)
             
@@ -155,7 +196,7 @@ class MidiEngine(QObject):
                 
                 start_time = time.time()
                 # [FIX CRITICO] Rimosso 'tempo=mido.bpm2tempo(master_bpm)'
-                for msg in midi_file.play(meta_messages=False):
+                for msg in self._messaggi_file(midi_file):
                     if not self.playback_running: break
                         
                     # [NUOVO FIX] Filtro anti-flooding per messaggi CC destinati a DMX
@@ -180,7 +221,7 @@ class MidiEngine(QObject):
                     first_message = True 
                     
                     # [FIX CRITICO] Rimosso 'tempo=mido.bpm2tempo(master_bpm)'
-                    for msg in midi_file.play(meta_messages=False):
+                    for msg in self._messaggi_file(midi_file):
                         
                         if not self.playback_running: break
                             
@@ -203,6 +244,20 @@ class MidiEngine(QObject):
             error_msg = f"[{file_name}] ERRORE CRITICO: {type(e).__name__}: {e}"
             self.midi_message_sent.emit(0.0, f"[ERRORE] {error_msg}")
             
+    def prepara_file(self, file_paths: list[str]):
+        """
+        [NUOVO] Analizza in anticipo i file MIDI indicati (da chiamare in un thread in background):
+        all'avvio del brano il thread di playback li trova già pronti.
+        """
+        self._midi_file_preparati = {}
+        for file_path in file_paths:
+            if not file_path or not os.path.exists(file_path):
+                continue
+            try:
+                self._midi_file_preparati[file_path] = mido.MidiFile(file_path)
+            except Exception as e:
+                print(f"Errore analisi file MIDI {file_path}: {e}")
+
     # -------------------------------------------------------------
     # PLAYBACK CONTROL
     # -------------------------------------------------------------
@@ -248,6 +303,10 @@ class MidiEngine(QObject):
             except Exception as e:
                 print(f"Errore invio All Notes Off su {port_name}: {e}")
     
+    def get_current_bpm(self) -> float:
+        """Restituisce il BPM del brano corrente (impostato all'avvio della riproduzione)."""
+        return self._current_song_bpm
+
     def start_playback(self, song_name, bpm: float | None = None):
         """Avvia la riproduzione MIDI (Clock e File) e il Clock MIDI (se abilitato), usando il BPM specificato."""
         if self.playing and not self.paused:
@@ -0,0 +1,121 @@
+# engines/transport_clock.py
+# Unico punto di lettura dello stato di trasporto dell'AudioEngine per l'interfaccia:
+# emette la posizione a cadenza configurabile solo durante la riproduzione e segnali
+# discreti per i cambi di stato, così i widget si aggiornano solo quando serve.
+
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+# Stati di trasporto pubblicati
+STATO_STOP = 'stop'
+STATO_PLAY = 'play'
+STATO_PAUSA = 'pause'
+STATO_FINE = 'finished'     # Fine brano raggiunta (lo stream resta aperto in silenzio)
+
+# Cadenza di default delle posizioni durante la riproduzione (ms)
+DEFAULT_TICK_MS = 50
+# Cadenza del controllo quando non c'è riproduzione (rileva avvii fatti da altri widget)
+IDLE_POLL_MS = 250
+# Scarto (s) tra posizione attesa e letta oltre il quale la variazione è considerata un seek
+SEEK_TOLERANCE_S = 0.25
+
+
+class TransportClock(QObject):
+    """
+    Publisher del trasporto audio. I widget si iscrivono ai segnali invece di
+    interrogare l'AudioEngine con un proprio QTimer:
+
+    - position_changed(posizione_s, durata_s): a ogni tick, solo in riproduzione
+    - state_changed(stato, brano): play / pause / stop / finished
+    - song_changed(brano): cambio del brano corrente ("" se nessuno)
+    - seeked(posizione_s): salto di posizione (seek o riavvio a brano in corso)
+
+    Dopo un comando al motore (play, pausa, seek...) il chiamante può invocare
+    'aggiorna()' per pubblicare subito il nuovo stato senza attendere il tick.
+    """
+    position_changed = pyqtSignal(float, float)
+    state_changed = pyqtSignal(str, str)
+    song_changed = pyqtSignal(str)
+    seeked = pyqtSignal(float)
+
+    def __init__(self, audio_engine, settings_manager=None, parent=None):
+        super().__init__(parent)
+        self.audio_engine = audio_engine
+        self.settings = settings_manager
+
+        self.stato = STATO_STOP
+        self.brano = ""
+        self.posizione = 0.0
+        self.durata = 0.0
+        self._in_aggiornamento = False
+
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.aggiorna)
+        self._timer.start(IDLE_POLL_MS)
+
+    @property
+    def tick_ms(self) -> int:
+        """Cadenza delle posizioni in riproduzione (impostazione 'transport_tick_ms')."""
+        if self.settings is None:
+            return DEFAULT_TICK_MS
+        return max(10, int(self.settings.data.get("transport_tick_ms", DEFAULT_TICK_MS)))
+
+    def _leggi_stato(self) -> str:
+        engine = self.audio_engine
+        if engine.playing_song is None:
+            return STATO_STOP
+        if not engine.is_stopped():
+            return STATO_PLAY
+        if engine.is_finished():
+            return STATO_FINE
+        if engine.pause_time > 0.0:
+            return STATO_PAUSA
+        return STATO_STOP
+
+    def aggiorna(self):
+        """Legge lo stato dell'engine e pubblica solo ciò che è cambiato."""
+        if self._in_aggiornamento:
+            # Chiamata da un widget in risposta a un segnale (es. autoplay): ripubblica dopo l'emissione corrente
+            QTimer.singleShot(0, self.aggiorna)
+            return
+        self._in_aggiornamento = True
+        try:
+            self._pubblica()
+        finally:
+            self._in_aggiornamento = False
+
+    def _pubblica(self):
+        engine = self.audio_engine
+        brano = engine.playing_song or ""
+        stato = self._leggi_stato()
+        posizione = engine.get_current_time() if stato != STATO_STOP else 0.0
+        durata = engine.get_duration() if brano else 0.0
+
+        cambio_brano = brano != self.brano
+        cambio_stato = stato != self.stato
+        if self.stato == STATO_PLAY and stato == STATO_PLAY and not cambio_brano:
+            # Posizione attesa: l'ultima letta più il tempo del tick (tolleranza ampia per i ritardi della UI)
+            atteso = self.posizione + self._timer.interval() / 1000.0
+            salto = posizione < self.posizione - SEEK_TOLERANCE_S or posizione > atteso + SEEK_TOLERANCE_S
+        else:
+            salto = stato in (STATO_PLAY, STATO_PAUSA) and abs(posizione - self.posizione) > SEEK_TOLERANCE_S
+
+        posizione_cambiata = posizione != self.posizione or durata != self.durata
+        self.brano, self.stato = brano, stato
+        self.posizione, self.durata = posizione, durata
+
+        if cambio_brano:
+            self.song_changed.emit(brano)
+        if cambio_stato or cambio_brano:
+            self.state_changed.emit(stato, brano)
+        if salto and not cambio_brano:
+            self.seeked.emit(posizione)
+        if posizione_cambiata or cambio_stato or cambio_brano:
+            self.position_changed.emit(posizione, durata)
+
+        intervallo = self.tick_ms if stato == STATO_PLAY else IDLE_POLL_MS
+        if self._timer.interval() != intervallo:
+            self._timer.setInterval(intervallo)
+
+    def ferma(self):
+        """Ferma il publisher (chiusura dell'applicazione)."""
+        self._timer.stop()
@@ -42,17 +42,28 @@ class VideoEngine(QObject):
     def __init__(self, parent=None):
         super().__init__(parent)
         self.videos: list[VideoTrack] = []
+        # [NUOVO] Video del brano successivo già caricato (pre-warm della playlist)
+        self.prepared: VideoTrack | None = None
 
     # ---------------------------------------------------
     # CARICAMENTO VIDEO
     # ---------------------------------------------------
 
     def add_video(self, video_path: str) -> VideoTrack:
-        """Crea e ritorna un VideoTrack."""
-        track = VideoTrack(video_path)
+        """Crea e ritorna un VideoTrack (riusa quello preparato in anticipo, se corrisponde)."""
+        if self.prepared is not None and self.prepared.path == video_path:
+            track, self.prepared = self.prepared, None
+        else:
+            track = VideoTrack(video_path)
         self.videos.append(track)
         return track
 
+    def prepare_video(self, video_path: str | None):
+        """[NUOVO] Crea in anticipo il VideoTrack (il QMediaPlayer carica la sorgente in modo asincrono)."""
+        if self.prepared is not None and self.prepared.path == video_path:
+            return
+        self.prepared = VideoTrack(video_path) if video_path else None
+
     def clear_videos(self):
         """Rimuove tutti i VideoTrack dalla lista."""
         # Prima di cancellare, resettiamo l'output per evitare crash.
@@ -1,6 +1,7 @@
 # main_unified.py (Entry point del software unificato)
 
 import sys
+import multiprocessing
 from PyQt6.QtWidgets import QApplication, QMainWindow, QTabWidget, QStatusBar, QMessageBox, QLabel, QWidget, QVBoxLayout
 from PyQt6.QtGui import QAction, QIcon
 from PyQt6.QtCore import Qt, QSize
@@ -10,6 +11,7 @@ from core.data_manager import DataManager
 from engines.audio_engine import AudioEngine
 from engines.midi_engine import MidiEngine
 from engines.video_engine import VideoEngine # Engine Video
+from engines.transport_clock import TransportClock
 from ui.components.settings_manager import SettingsManager
 
 # --- 2. Import dei Componenti UI Refactorizzati (Widget) ---
@@ -38,6 +40,12 @@ class UnifiedMainWindow(QMainWindow):
         self.video_engine = VideoEngine() # NUOVO: Engine Video
         self.scenografia_data_manager = DataManager() 
         self.settings_manager = SettingsManager()
+        self.audio_engine.set_block_size(self.settings_manager.data.get("audio_block_size", 256))
+        self.scenografia_data_manager.pcm_cache.set_limite_mb(self.settings_manager.data.get("audio_cache_max_mb", 4096))
+        self.audio_engine.set_pcm_cache(self.scenografia_data_manager.pcm_cache)
+        self.midi_engine.set_time_source(self.audio_engine.get_current_time)
+        # Unico publisher dello stato di trasporto per tutti i widget (niente polling per widget)
+        self.transport_clock = TransportClock(self.audio_engine, self.settings_manager, parent=self)
 
         # --- Stage View and Lyrics Widgets (Instantiated by MainWindow for embedding) ---
         self.stage_view_widget = StageViewWidget() 
@@ -47,14 +55,16 @@ class UnifiedMainWindow(QMainWindow):
             audio_engine=self.audio_engine, 
             midi_engine=self.midi_engine,
             settings_manager=self.settings_manager,
-            parent=self
+            parent=self,
+            transport_clock=self.transport_clock
         )
         
         # INJECTION POINT: Instanziazione del Video Player effettivo
         self.video_player_widget = VideoPlayerWidget(
             video_engine=self.video_engine,
             audio_engine=self.audio_engine,
-            settings_manager=self.settings_manager
+            settings_manager=self.settings_manager,
+            transport_clock=self.transport_clock
         )
         
         # --- 4. Setup Main UI (Tabs) ---
@@ -74,7 +84,8 @@ class UnifiedMainWindow(QMainWindow):
             settings_manager=self.settings_manager,
             lyrics_player_widget=self.lyrics_player_widget, # INJECTED
             video_player_widget=self.video_player_widget, # INJECTED
-            parent=self
+            parent=self,
+            transport_clock=self.transport_clock
         )
         tab_widget.addTab(self.scenografia_widget, "Media")
         
@@ -90,9 +101,12 @@ class UnifiedMainWindow(QMainWindow):
             midi_engine=self.midi_engine,
             settings_manager=self.settings_manager,
             stage_view=self.stage_view_widget, # INJECTED
-            parent=self
+            parent=self,
+            data_manager=self.scenografia_data_manager # INJECTED (tracce cue DMX)
         )
         tab_widget.addTab(self.dmx_widget, "Fixtures")
+        # Il dialogo impostazioni del tab Media applica il refresh DMX allo stesso controller
+        self.scenografia_widget.dmx_controller = self.dmx_widget.dmx_comm
         
         # --- 9. Stage Tab (FIFTH) ---
         tab_widget.addTab(self.stage_view_widget, "Stage") 
@@ -298,9 +312,14 @@ class UnifiedMainWindow(QMainWindow):
         self.dmx_widget.cleanup()
         self.scenografia_widget.cleanup()
         self.midi_monitor_tab_widget.cleanup()
+        self.transport_clock.ferma()
+        self.audio_engine.shutdown()
+        self.scenografia_data_manager.pcm_cache.salva_indice()
         super().closeEvent(event)
 
 if __name__ == '__main__':
+    # Necessario per i processi di analisi (multiprocessing 'spawn') negli eseguibili impacchettati
+    multiprocessing.freeze_support()
     # Assicura che la libreria Python corretta sia usata e che le dipendenze siano installate
     app = QApplication(sys.argv)
     window = UnifiedMainWindow()
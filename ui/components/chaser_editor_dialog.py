@@ -3,11 +3,19 @@
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, 
     QListWidget, QPushButton, QDoubleSpinBox, QTableWidget, 
-    QTableWidgetItem, QHeaderView, QAbstractItemView, QMessageBox
+    QTableWidgetItem, QHeaderView, QAbstractItemView, QMessageBox,
+    QComboBox, QCheckBox, QSpinBox
 )
 from PyQt6.QtCore import pyqtSignal, Qt
 
-from core.dmx_models import Scena, PassoChaser, Chaser 
+from core.dmx_models import Scena, PassoChaser, Chaser, UNITA_SECONDI, UNITA_BATTITI, UNITA_BATTUTE 
+
+# Etichetta e suffisso delle colonne tempi per ogni unità
+UNITA_LABELS = {
+    UNITA_SECONDI: ("Secondi", " s"),
+    UNITA_BATTITI: ("Battiti (BPM brano)", " beat"),
+    UNITA_BATTUTE: ("Battute (BPM brano)", " bar"),
+}
 
 class ChaserEditorDialog(QDialog):
     """Dialogo per creare o modificare un Chaser DMX."""
@@ -39,6 +47,26 @@ class ChaserEditorDialog(QDialog):
         self.name_input.setPlaceholderText("Es: RGB Flash")
         name_layout.addWidget(self.name_input)
         main_layout.addLayout(name_layout)
+
+        # 1b. Unità dei tempi e sincronizzazione con l'audio [NUOVO]
+        timing_layout = QHBoxLayout()
+        timing_layout.addWidget(QLabel("Tempi in:"))
+        self.unit_combo = QComboBox()
+        for unita, (label, _) in UNITA_LABELS.items():
+            self.unit_combo.addItem(label, unita)
+        self.unit_combo.currentIndexChanged.connect(self._update_time_unit)
+        timing_layout.addWidget(self.unit_combo)
+
+        timing_layout.addWidget(QLabel("Battiti per Battuta:"))
+        self.beats_per_bar_spin = QSpinBox()
+        self.beats_per_bar_spin.setRange(1, 16)
+        self.beats_per_bar_spin.setValue(4)
+        timing_layout.addWidget(self.beats_per_bar_spin)
+
+        self.sync_audio_check = QCheckBox("Sincronizza con l'Audio del brano")
+        timing_layout.addWidget(self.sync_audio_check)
+        timing_layout.addStretch(1)
+        main_layout.addLayout(timing_layout)
         
         # 2. Struttura Editor (Scene disponibili vs Passi)
         editor_layout = QHBoxLayout()
@@ -54,7 +82,7 @@ class ChaserEditorDialog(QDialog):
 
         # 2b. Passi Chaser (Destination)
         dest_group = QVBoxLayout()
-        dest_group.addWidget(QLabel("Passi Sequenza (Scena / Tempi in Sec):"))
+        dest_group.addWidget(QLabel("Passi Sequenza (Scena / Tempi):"))
         self.steps_table = QTableWidget()
         self.steps_table.setColumnCount(5) # N. Passo, Scena, Durata, Fade In, Fade Out
         self.steps_table.setHorizontalHeaderLabels(["#", "Scena", "Hold (s)", "Fade In (s)", "Fade Out (s)"])
@@ -102,6 +130,9 @@ class ChaserEditorDialog(QDialog):
     def _load_chaser(self, chaser: Chaser):
         """Carica i dati di un chaser esistente nella UI."""
         self.name_input.setText(chaser.nome)
+        self.unit_combo.setCurrentIndex(max(0, self.unit_combo.findData(chaser.unita_tempo)))
+        self.beats_per_bar_spin.setValue(chaser.battiti_per_battuta)
+        self.sync_audio_check.setChecked(chaser.sync_audio)
         self.steps_table.setRowCount(0)
         for passo in chaser.passi:
             self._add_step(
@@ -118,13 +149,28 @@ class ChaserEditorDialog(QDialog):
             scene_name = selected_item.text()
             self._add_step(scene_name)
 
-    def _create_time_spinbox(self, initial_value: float, suffix: str = " s") -> QDoubleSpinBox:
+    def _current_unit_suffix(self) -> str:
+        """Suffisso dei tempi per l'unità selezionata."""
+        return UNITA_LABELS.get(self.unit_combo.currentData(), UNITA_LABELS[UNITA_SECONDI])[1]
+
+    def _update_time_unit(self):
+        """Aggiorna intestazioni e suffissi delle colonne tempi all'unità selezionata. [NUOVO]"""
+        suffix = self._current_unit_suffix()
+        unit = suffix.strip()
+        self.steps_table.setHorizontalHeaderLabels(["#", "Scena", f"Hold ({unit})", f"Fade In ({unit})", f"Fade Out ({unit})"])
+        for row in range(self.steps_table.rowCount()):
+            for col in (2, 3, 4):
+                widget = self.steps_table.cellWidget(row, col)
+                if widget:
+                    widget.setSuffix(suffix)
+
+    def _create_time_spinbox(self, initial_value: float, suffix: str | None = None) -> QDoubleSpinBox:
         """Crea e configura una QDoubleSpinBox per i tempi."""
         spinbox = QDoubleSpinBox()
         spinbox.setRange(0.0, 60.0)
         spinbox.setSingleStep(0.1)
-        spinbox.setDecimals(1)
-        spinbox.setSuffix(suffix)
+        spinbox.setDecimals(2)
+        spinbox.setSuffix(suffix if suffix is not None else self._current_unit_suffix())
         spinbox.setValue(initial_value)
         return spinbox
 
@@ -197,7 +243,7 @@ class ChaserEditorDialog(QDialog):
                 fade_out_time = fade_out_widget.value() if fade_out_widget else 0.0
 
                 if hold_time <= 0.0 and fade_in_time <= 0.0 and fade_out_time <= 0.0:
-                    QMessageBox.warning(self, "Errore Passo", f"Il Passo {row+1} deve avere almeno un tempo (Hold, Fade In o Fade Out) > 0.0s.")
+                    QMessageBox.warning(self, "Errore Passo", f"Il Passo {row+1} deve avere almeno un tempo (Hold, Fade In o Fade Out) > 0.")
                     return
                 
                 scena = self.scene_map.get(scene_name)
@@ -216,7 +262,13 @@ class ChaserEditorDialog(QDialog):
             QMessageBox.critical(self, "Errore Interno", f"Si è verificato un errore durante l'estrazione dei dati: {e}")
             return
             
-        nuovo_chaser = Chaser(nome=nome_chaser, passi=passi_definiti)
+        nuovo_chaser = Chaser(
+            nome=nome_chaser, 
+            passi=passi_definiti,
+            unita_tempo=self.unit_combo.currentData(),
+            sync_audio=self.sync_audio_check.isChecked(),
+            battiti_per_battuta=self.beats_per_bar_spin.value()
+        )
         
         self.chaser_saved.emit(nuovo_chaser) 
         
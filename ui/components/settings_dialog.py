@@ -10,16 +10,19 @@ import sounddevice as sd
 import numpy as np
 import mido
 
+from core.dmx_comm import DEFAULT_REFRESH_RATE_HZ, MIN_REFRESH_RATE_HZ, MAX_REFRESH_RATE_HZ
+
 
 class SettingsDialog(QDialog):
     """
-    Finestra di dialogo per configurare le impostazioni persistenti di Audio, MIDI e Display.
+    Finestra di dialogo per configurare le impostazioni persistenti di Audio, MIDI, DMX e Display.
     """
-    def __init__(self, audio_engine, midi_engine, settings_manager):
+    def __init__(self, audio_engine, midi_engine, settings_manager, dmx_controller=None):
         super().__init__()
         self.audio_engine = audio_engine
         self.midi_engine = midi_engine
         self.settings = settings_manager
+        self.dmx_controller = dmx_controller # [NUOVO] DMXController a cui applicare il refresh rate
         
         self.available_screens = QApplication.screens()
 
@@ -35,6 +38,12 @@ class SettingsDialog(QDialog):
         layout.addWidget(QLabel("--- IMPOSTAZIONI AUDIO / MIDI ---"))
         self._setup_audio_midi_controls(layout)
 
+        # ----------------------------
+        # DMX OUTPUT
+        # ----------------------------
+        layout.addSpacing(20)
+        layout.addWidget(QLabel("--- IMPOSTAZIONI DMX ---"))
+        self._setup_dmx_controls(layout)
 
         # ----------------------------
         # DISPLAY / VIDEO SETTINGS
@@ -78,6 +87,21 @@ class SettingsDialog(QDialog):
             self.combo_audio_driver.addItem(f"{i} - {h['name']}")
         layout.addWidget(self.combo_audio_driver)
 
+        # Dimensione del buffer audio (frame per callback): valori bassi = latenza minore
+        layout.addWidget(QLabel("Buffer Audio (frame per blocco):"))
+        self.combo_audio_block_size = QComboBox()
+        self.combo_audio_block_size.addItem("Automatico (Driver)", 0)
+        for frames in (64, 128, 256, 512, 1024, 2048):
+            self.combo_audio_block_size.addItem(f"{frames}", frames)
+        layout.addWidget(self.combo_audio_block_size)
+
+        # Cadenza di aggiornamento di slider/tempo/lyrics durante la riproduzione
+        layout.addWidget(QLabel("Aggiornamento Trasporto (ms):"))
+        self.combo_transport_tick = QComboBox()
+        for ms in (20, 33, 50, 100, 200):
+            self.combo_transport_tick.addItem(f"{ms}", ms)
+        layout.addWidget(self.combo_transport_tick)
+
         # Test Audio
         btn_test_audio = QPushButton("Test Audio Output")
         btn_test_audio.clicked.connect(self.test_audio)
@@ -114,6 +138,18 @@ class SettingsDialog(QDialog):
         layout.addLayout(clock_port_layout)
 
 
+    def _setup_dmx_controls(self, layout):
+        # Frequenza di invio dei frame DMX (il limite di 44 Hz è quello di un universo completo)
+        refresh_layout = QHBoxLayout()
+        refresh_layout.addWidget(QLabel("Refresh Uscita DMX:"))
+        self.spin_dmx_refresh = QDoubleSpinBox()
+        self.spin_dmx_refresh.setRange(MIN_REFRESH_RATE_HZ, MAX_REFRESH_RATE_HZ)
+        self.spin_dmx_refresh.setSingleStep(1.0)
+        self.spin_dmx_refresh.setDecimals(1)
+        refresh_layout.addWidget(self.spin_dmx_refresh)
+        refresh_layout.addWidget(QLabel("Hz"))
+        layout.addLayout(refresh_layout)
+
     def _setup_display_controls(self, layout):
         
         def create_screen_combo(setting_label):
@@ -243,6 +279,17 @@ class SettingsDialog(QDialog):
                     self.combo_audio_driver.setCurrentIndex(i)
                     break
 
+        idx_block = self.combo_audio_block_size.findData(self.settings.data.get("audio_block_size", 256))
+        if idx_block >= 0:
+            self.combo_audio_block_size.setCurrentIndex(idx_block)
+
+        idx_tick = self.combo_transport_tick.findData(self.settings.data.get("transport_tick_ms", 50))
+        if idx_tick >= 0:
+            self.combo_transport_tick.setCurrentIndex(idx_tick)
+
+        # --- DMX ---
+        self.spin_dmx_refresh.setValue(float(self.settings.data.get("dmx_refresh_rate_hz", DEFAULT_REFRESH_RATE_HZ)))
+
         # --- MIDI (Tracks/Default) ---
         saved_port = self.settings.data.get("midi_port", None)
         if saved_port:
@@ -351,6 +398,18 @@ class SettingsDialog(QDialog):
             self.audio_engine.set_driver(driver_index)
             self.settings.set_audio_driver(driver_index)
 
+        block_size = self.combo_audio_block_size.currentData()
+        self.audio_engine.set_block_size(block_size)
+        self.settings.set_audio_block_size(block_size)
+        # Letta dal TransportClock a ogni tick: nessun riavvio necessario
+        self.settings.set_transport_tick_ms(self.combo_transport_tick.currentData())
+
+        # [NUOVO] DMX REFRESH RATE: applicato subito al thread di output, senza riconnettere
+        dmx_refresh_hz = self.spin_dmx_refresh.value()
+        self.settings.set_dmx_refresh_rate_hz(dmx_refresh_hz)
+        if self.dmx_controller is not None:
+            self.dmx_controller.set_refresh_rate(dmx_refresh_hz)
+
 
         # 2. MIDI PORT (Tracks/Default)
         if self.combo_midi.count() > 0:
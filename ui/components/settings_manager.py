@@ -10,6 +10,14 @@ class SettingsManager:
         self.path = "settings.json"
         self.data = {
             "audio_driver": None,
+            # Frame per callback dello stream audio (0 = scelto dal driver)
+            "audio_block_size": 256,
+            # Dimensione massima della cache dell'audio decodificato (MB)
+            "audio_cache_max_mb": 4096,
+            # Cadenza (ms) con cui il TransportClock pubblica la posizione durante la riproduzione
+            "transport_tick_ms": 50,
+            # Frequenza (Hz) con cui il thread di output DMX invia i frame (1-44 Hz)
+            "dmx_refresh_rate_hz": 40.0,
             "midi_port": None,
             "main_window_screen": None,     
             "video_playback_screen": None,  
@@ -21,7 +29,11 @@ class SettingsManager:
             "lyrics_scrolling_mode": True,  
             # Manteniamo solo le impostazioni MIDI globali non per brano
             "midi_clock_enabled": False, 
-            "midi_clock_port": None
+            "midi_clock_port": None,
+            # Curva di easing dei fade DMX (vedi core/dmx_fade.EASING_CURVES)
+            "dmx_fade_easing": "linear",
+            # Se True il Master Dimmer scala solo i canali intensità/colore (non pan/tilt/gobo...)
+            "master_dimmer_solo_intensita": False
         }
         self.load()
 
@@ -36,6 +48,10 @@ class SettingsManager:
                     print("Errore: file settings.json corrotto. Uso impostazioni di default.")
         
         # Logica di fallback per tutte le chiavi mancanti (omessa per brevità, ma presente nel codice originale)
+        if "audio_block_size" not in self.data: self.data["audio_block_size"] = 256
+        if "audio_cache_max_mb" not in self.data: self.data["audio_cache_max_mb"] = 4096
+        if "transport_tick_ms" not in self.data: self.data["transport_tick_ms"] = 50
+        if "dmx_refresh_rate_hz" not in self.data: self.data["dmx_refresh_rate_hz"] = 40.0
         if "main_window_screen" not in self.data: self.data["main_window_screen"] = None
         if "video_playback_screen" not in self.data: self.data["video_playback_screen"] = None
         if "lyrics_prompter_screen" not in self.data: self.data["lyrics_prompter_screen"] = None
@@ -46,6 +62,8 @@ class SettingsManager:
         if "lyrics_scrolling_mode" not in self.data: self.data["lyrics_scrolling_mode"] = True
         if "midi_clock_enabled" not in self.data: self.data["midi_clock_enabled"] = False
         if "midi_clock_port" not in self.data: self.data["midi_clock_port"] = None
+        if "dmx_fade_easing" not in self.data: self.data["dmx_fade_easing"] = "linear"
+        if "master_dimmer_solo_intensita" not in self.data: self.data["master_dimmer_solo_intensita"] = False
 
 
     def save(self):
@@ -58,6 +76,21 @@ class SettingsManager:
         self.data["audio_driver"] = driver
         self.save()
 
+    def set_audio_block_size(self, frames: int):
+        """Imposta i frame per callback dello stream audio e salva."""
+        self.data["audio_block_size"] = frames
+        self.save()
+
+    def set_transport_tick_ms(self, ms: int):
+        """Imposta la cadenza degli aggiornamenti di posizione del trasporto e salva."""
+        self.data["transport_tick_ms"] = ms
+        self.save()
+
+    def set_dmx_refresh_rate_hz(self, hz: float):
+        """Imposta la frequenza di refresh dell'uscita DMX e salva."""
+        self.data["dmx_refresh_rate_hz"] = hz
+        self.save()
+
     def set_midi_port(self, port):
         """Imposta il nome della porta MIDI e salva."""
         self.data["midi_port"] = port
@@ -0,0 +1,164 @@
+# ui/mixins/cue_track_mixin.py
+
+import math
+import time
+from core.dmx_models import ActiveScene
+from core.dmx_cues import (
+    CuePlayer, CueDMX,
+    CUE_SCENA, CUE_SCENA_OFF, CUE_CHASER, CUE_STOP, CUE_SUBMASTER, CUE_CLEAR, CUE_MASTER
+)
+
+# Intervallo massimo (ms) tra due controlli del trasporto audio: rileva avvio, pausa,
+# seek e cambio brano. Quando un cue è più vicino, il timer è armato esattamente sul cue.
+CUE_IDLE_POLL_MS = 100
+
+
+class CueTrackMixin:
+    """Esegue la traccia cue DMX del brano in riproduzione, agganciata al clock master audio."""
+
+    cue_player: CuePlayer | None = None
+    _cue_song: str | None = None
+
+    def _cue_tick(self):
+        """Chiamata dal cue_timer (single shot): esegue i cue scaduti e riarma il timer sul prossimo."""
+        song = getattr(self.audio_engine, 'playing_song', None)
+        if song != self._cue_song:
+            self._carica_cue_brano(song)
+
+        if self.cue_player is None or self.audio_engine.is_stopped():
+            self.cue_timer.start(CUE_IDLE_POLL_MS)
+            return
+
+        now = self.audio_engine.get_current_time()
+        cue_scaduti, riposiziona = self.cue_player.avanza(now)
+
+        if riposiziona:
+            # Seek (o avvio a brano in corso): ricostruisce lo stato luci in quel punto
+            self._ripristina_stato_cue(cue_scaduti)
+        elif cue_scaduti:
+            # I fade partono all'istante del cue, riportato su time.monotonic()
+            now_monotonic = time.monotonic()
+            for cue in cue_scaduti:
+                self._esegui_cue(cue, inizio=now_monotonic - (now - cue.tempo))
+
+        ritardo_ms = CUE_IDLE_POLL_MS
+        prossimo = self.cue_player.prossimo_tempo()
+        if prossimo is not None:
+            ritardo_ms = min(ritardo_ms, max(0, math.ceil((prossimo - now) * 1000)))
+        self.cue_timer.start(ritardo_ms)
+
+    def _carica_cue_brano(self, song_name: str | None):
+        """Carica (una volta per brano) la traccia cue dal DataManager."""
+        self._cue_song = song_name
+        self.cue_player = None
+        if not song_name or getattr(self, 'data_manager', None) is None:
+            return
+
+        traccia = self.data_manager.get_dmx_cue_track(song_name)
+        if len(traccia):
+            self.cue_player = CuePlayer(traccia)
+            print(f"Traccia cue DMX caricata per '{song_name}': {len(traccia)} cue.")
+
+    def _esegui_cue(self, cue: CueDMX, inizio: float | None = None, applica: bool = True):
+        """
+        Esegue un singolo cue. Con applica=False modifica solo lo stato (Scene Attive/submaster/master)
+        senza ricalcolare l'output: usato per ricostruire lo stato dopo un seek.
+        Ogni fade possiede solo i canali toccati dal cue (la scena, o quelli del Master Dimmer).
+        """
+        canali = None
+        if cue.tipo == CUE_SCENA:
+            scena = next((s for s in self.scene_list if s.nome == cue.target), None)
+            if scena is None:
+                print(f"Cue DMX: Scena '{cue.target}' non trovata.")
+                return
+            if applica and self.chaser_attivo:
+                self._ferma_chaser(show_message=False)
+            if not any(a.scena.nome == scena.nome for a in self.active_scenes):
+                self.active_scenes.append(ActiveScene(scena, master_value=255))
+            canali = scena.indici
+
+        elif cue.tipo == CUE_SCENA_OFF:
+            scena = next((a.scena for a in self.active_scenes if a.scena.nome == cue.target), None)
+            if scena is None:
+                return
+            self.active_scenes[:] = [a for a in self.active_scenes if a.scena.nome != cue.target]
+            canali = scena.indici
+
+        elif cue.tipo == CUE_CLEAR:
+            self.active_scenes.clear()
+
+        elif cue.tipo == CUE_SUBMASTER:
+            index = next((i for i, a in enumerate(self.active_scenes) if a.scena.nome == cue.target), -1)
+            if index < 0:
+                return
+            # Stesso percorso del fader della scena; l'output è applicato qui sotto (con l'eventuale fade)
+            self.set_active_scene_master(index, cue.valore, aggiorna_output=False)
+            canali = self.active_scenes[index].scena.indici
+
+        elif cue.tipo == CUE_MASTER:
+            self.set_master_dimmer_value(cue.valore, aggiorna_output=False)
+            canali = self._canali_master_dimmer()
+
+        elif cue.tipo == CUE_CHASER:
+            if applica:
+                self._avvia_chaser_cue(cue.target)
+            return
+
+        elif cue.tipo == CUE_STOP:
+            if applica and self.chaser_attivo:
+                self._ferma_chaser(show_message=False)
+            return
+
+        if applica:
+            self._applica_scene_attive_cue(cue.fade, inizio, cue.target or cue.tipo, canali)
+
+    def _avvia_chaser_cue(self, chaser_name: str):
+        """Avvia il chaser indicato (se non è già quello attivo)."""
+        if self.chaser_attivo and self.chaser_attivo.nome == chaser_name:
+            return
+        index = next((i for i, c in enumerate(self.chaser_list) if c.nome == chaser_name), -1)
+        if index < 0:
+            print(f"Cue DMX: Chaser '{chaser_name}' non trovato.")
+            return
+        self.start_chaser_by_index(index)
+
+    def _applica_scene_attive_cue(self, fade: float, inizio: float | None, nome: str, canali=None):
+        """
+        Porta l'output alla fusione delle Scene Attive, istantaneamente o con un fade
+        sui soli 'canali' indicati (None = tutti i canali che cambiano).
+        """
+        self._update_active_scenes_ui()
+
+        if fade <= 0.0:
+            self._merge_and_send_dmx(salva=False)
+            return
+
+        start_values = self.universo_attivo.array_canali.copy()
+        target_values = self._get_combined_scene_array()
+        self.fade_engine.avvia(start_values, target_values, fade, canali=canali, nome=nome, start_time=inizio)
+        if not self.fade_timer.isActive():
+            self.fade_timer.setInterval(int(self._FADE_TICK_MS))
+            self.fade_timer.start()
+
+    def _ripristina_stato_cue(self, cue_list: list[CueDMX]):
+        """Ricostruisce (senza fade) lo stato luci risultante da tutti i cue in 'cue_list'."""
+        if self.chaser_attivo:
+            self._ferma_chaser(show_message=False)
+        self.fade_engine.clear()
+        self.active_scenes.clear()
+
+        chaser_name = None
+        for cue in cue_list:
+            if cue.tipo == CUE_CHASER:
+                chaser_name = cue.target
+            elif cue.tipo == CUE_STOP:
+                chaser_name = None
+            else:
+                if cue.tipo == CUE_SCENA:
+                    chaser_name = None # Come in riproduzione: una scena ferma il chaser
+                self._esegui_cue(cue, applica=False)
+
+        self._update_active_scenes_ui()
+        self._merge_and_send_dmx(salva=False)
+        if chaser_name:
+            self._avvia_chaser_cue(chaser_name)
@@ -27,6 +27,14 @@ class DMXCommunicationMixin:
         QMessageBox.information(self, "Porte Seriale Trovate", 
                                 f"Porta configurata: {self.dmx_comm.port_name}\n\nNota: Per collegarsi, l'hardware DMX deve usare la porta '{self.dmx_comm.port_name}'\n\nPorte disponibili:\n{port_list_str}")
 
+    def _publish_dmx_frame(self):
+        """
+        Renderizza l'universo attivo nel back buffer del DMXController e lo pubblica.
+        L'invio seriale è gestito dal thread di output del controller.
+        """
+        self.universo_attivo.render_frame(self.dmx_comm.back_buffer)
+        self.dmx_comm.swap_buffers()
+
     def _update_dmx_status_ui(self):
         """Aggiorna l'etichetta dello stato DMX nell'interfaccia utente."""
         # 'self.status_label' and 'self.refresh_ports_btn' must exist, ensured in _crea_pannello_controllo
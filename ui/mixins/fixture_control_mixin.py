@@ -3,10 +3,10 @@
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
     QMessageBox, QSpinBox, QSizePolicy, QSlider, 
-    QSpacerItem, QPushButton, QGroupBox 
+    QSpacerItem, QPushButton, QGroupBox, QCheckBox 
 )
 from PyQt6.QtCore import Qt, QTimer
-import threading 
+import numpy as np
 # Import Core Models
 from core.dmx_models import IstanzaFixture, FixtureModello
 from core.project_models import IstanzaFixtureStato 
@@ -61,96 +61,70 @@ class FixtureControlMixin:
         (Blackout), mantenendo i fader al loro stato di cattura. [MODIFICATO]
         """
         
-        # 1. SALVA LO STATO CORRENTE DEL PROGRAMMER (FADER)
-        # Questo è lo stato visuale dei fader e il livello che vogliamo salvare per il Capture.
-        saved_programmer_values = {}
-        for instance in self.universo_attivo.fixture_assegnate:
-            saved_programmer_values[instance.indirizzo_inizio] = instance.valori_correnti[:]
-        
-        
-        # 2. CALCOLA IL RISULTATO FUSO DEL SOLO SCENE LAYER (SLR)
-        merged_scene_values = {} # {dmx_addr: value}
-        
-        for active_scene in active_scenes:
-            scene_data = active_scene.scena.valori_canali
-            master_factor = active_scene.master_value / 255.0
-            
-            for dmx_addr, raw_value in scene_data.items():
-                value_with_master = int(raw_value * master_factor)
-                
-                # Applica HTP tra le scene attive
-                if dmx_addr not in merged_scene_values:
-                    merged_scene_values[dmx_addr] = value_with_master
-                else:
-                    merged_scene_values[dmx_addr] = max(merged_scene_values[dmx_addr], value_with_master)
-        
-        
-        # 3. DETERMINA IL VALORE DMX VINCENTE E SOVRASCRIVI TEMPORANEAMENTE fixture.valori_correnti
-        
-        for instance in self.universo_attivo.fixture_assegnate:
-            start_addr, end_addr = instance.get_indirizzi_universali()
-            programmer_state = saved_programmer_values[instance.indirizzo_inizio]
-            
-            for i in range(instance.modello.numero_canali):
-                dmx_addr = start_addr + i
-                
-                if active_scenes:
-                    # PLAYBACK MODE: Output = Scene Layer Result (SLR).
-                    # I fader manuali (Programmer State) sono IGNORATI per l'uscita DMX.
-                    scene_value = merged_scene_values.get(dmx_addr, instance.modello.descrizione_canali[i].valore_default)
-                    
-                    # Il layer temporaneo riceve solo il valore della scena
-                    instance.valori_correnti[i] = scene_value 
-                
-                else:
-                    # IDLE / BLACKOUT MODE: Se non ci sono scene attive, l'output DMX deve essere 0 (Blackout).
-                    
-                    # Ottieni il valore di default del canale (Blackout state)
-                    default_value = instance.modello.descrizione_canali[i].valore_default
-                    
-                    # Il layer temporaneo riceve il valore di Blackout
-                    instance.valori_correnti[i] = default_value
-
-        # 4. Applica l'HTP/LTP DMX finale sull'array universale
-        self.universo_attivo.aggiorna_canali_universali()
-
-        # 5. RIPRISTINA LO STATO VERO DEL PROGRAMMER (FADER)
-        # Questo assicura che i fader mantengano il loro stato di Cattura/Modifica visivamente.
-        for instance in self.universo_attivo.fixture_assegnate:
-            instance.valori_correnti = programmer_state[:]
-
+        # 1. FONDE LE SCENE ATTIVE (SLR) DALLA LORO FORMA COMPILATA
+        # PLAYBACK MODE: Output = Scene Layer Result (SLR), HTP tra le scene scalate dal proprio master.
+        # I fader manuali (Programmer State) sono IGNORATI per l'uscita DMX e restano invariati.
+        # IDLE / BLACKOUT MODE: senza scene attive l'output è il valore di default dei canali.
+        self.universo_attivo.array_canali = self.universo_attivo.fondi_scene(
+            [(s.scena, s.master_value / 255.0) for s in active_scenes]
+        )
 
-        # 6. Applica il Master Dimmer globale (MDA)
+        # 2. Applica il Master Dimmer globale (MDA)
         self.universo_attivo.array_canali = self._apply_master_dimmer_to_array_only(self.universo_attivo.array_canali)
         
-        # 7. L'aggiornamento UI e DMX è gestito dalla chiamata a _merge_and_send_dmx (nel mixin chiamante).
+        # 3. L'aggiornamento UI e DMX è gestito dalla chiamata a _merge_and_send_dmx (nel mixin chiamante).
 
 
-    def _apply_master_dimmer_to_array_only(self, dmx_array: list[int]) -> list[int]:
+    def _get_master_dimmer_lut(self) -> np.ndarray:
         """
-        Applica il Master Dimmer (MDA) come moltiplicatore percentuale
-        a TUTTI i canali DMX attivi, simulando l'effetto su tutti i canali
-        che contribuiscono all'intensità (Dimmer, Colore, Strobe). [CORRETTO]
+        Restituisce la LUT a 256 valori del Master Dimmer (valore DMX -> valore dimmato),
+        ricalcolata solo quando cambia master_dimmer_value. [NUOVO]
+        """
+        if getattr(self, '_master_dimmer_lut_value', None) != self.master_dimmer_value:
+            dimmer_factor = self.master_dimmer_value / 255.0
+            self._master_dimmer_lut = (np.arange(256) * dimmer_factor).astype(np.uint8)
+            self._master_dimmer_lut_value = self.master_dimmer_value
+        return self._master_dimmer_lut
+
+    def _apply_master_dimmer_to_array_only(self, dmx_array: np.ndarray) -> np.ndarray:
+        """
+        Applica il Master Dimmer (MDA) come moltiplicatore percentuale con una
+        singola lookup sulla LUT precalcolata: su tutti i canali, oppure (impostazione
+        'master_dimmer_solo_intensita') solo sui canali di intensità/colore
+        dell'universo, lasciando invariati pan/tilt/gobo. [MODIFICATO]
+        Restituisce un nuovo array: l'array di ingresso non viene modificato.
         """
         if not hasattr(self, 'master_dimmer_value') or self.master_dimmer_value == 255:
              return dmx_array
              
-        master_dimmer_value = self.master_dimmer_value
-        dimmer_factor = master_dimmer_value / 255.0
-        
-        new_dmx_array = dmx_array[:]
-        
-        # Non è necessario usare la mappa, in quanto l'MD agisce su tutti i valori
-        # DMX della fixture in modo non selettivo.
+        lut = self._get_master_dimmer_lut()
         
-        for i in range(512):
-            original_value = dmx_array[i] # Valore non dimmato (raw HTP/LTP)
-            
-            # Applica la scala percentuale a tutti i valori
-            new_value = max(0, min(255, int(original_value * dimmer_factor)))
-            new_dmx_array[i] = new_value
+        if self.settings_manager.data.get('master_dimmer_solo_intensita', False):
+            return np.where(self.universo_attivo.maschera_intensita_colore, lut[dmx_array], dmx_array)
+        return lut[dmx_array]
 
-        return new_dmx_array
+    def _canali_master_dimmer(self) -> np.ndarray | None:
+        """Canali scalati dal Master Dimmer: quelli di intensità/colore o tutti (None). [NUOVO]"""
+        if self.settings_manager.data.get('master_dimmer_solo_intensita', False):
+            return np.flatnonzero(self.universo_attivo.maschera_intensita_colore)
+        return None
+
+    def set_master_dimmer_value(self, value: int, aggiorna_output: bool = True):
+        """
+        Imposta il Master Dimmer (0-255) senza interrompere il chaser e allinea fader ed etichetta. [NUOVO]
+        Usato dai cue Master: con aggiorna_output=False cambia solo lo stato
+        (il chiamante applica l'output, es. con un fade del FadeEngine).
+        """
+        self.master_dimmer_value = max(0, min(255, int(value)))
+        if hasattr(self, 'master_slider'):
+            # Il segnale del fader fermerebbe il chaser (controllo manuale)
+            self.master_slider.blockSignals(True)
+            self.master_slider.setValue(self.master_dimmer_value)
+            self.master_slider.blockSignals(False)
+        if hasattr(self, 'master_label'):
+            self.master_label.setText(f"Dimmer Master: {self.master_dimmer_value}")
+        if aggiorna_output:
+            self._apply_master_dimmer(self.master_dimmer_value)
 
     def _apply_master_dimmer(self, value: int):
         """Applica il valore del Master Dimmer (0-255) e gestisce l'aggiornamento DMX/UI."""
@@ -169,6 +143,12 @@ class FixtureControlMixin:
              self.aggiorna_simulazione_luce(instance)
         self._aggiorna_valori_fader()
         
+    def _toggle_master_dimmer_solo_intensita(self, checked: bool):
+        """Salva l'impostazione di limitazione del Master Dimmer e riapplica l'output. [NUOVO]"""
+        self.settings_manager.data['master_dimmer_solo_intensita'] = checked
+        self.settings_manager.save()
+        self._apply_master_dimmer(self.master_dimmer_value)
+
     def _send_debounced_dimmer_update(self, value: int):
         """Metodo di supporto per debouncing il Master Dimmer DMX send."""
         # Se il timer non è stato inizializzato, lo fa ora (nel caso estremo)
@@ -178,7 +158,7 @@ class FixtureControlMixin:
         # Memorizza l'ultimo valore e riavvia il timer
         self._master_dimmer_value_to_send = value
         if not self._master_dimmer_debounce_timer.isActive():
-            # Il timer chiama _apply_master_dimmer, che ora usa un thread per l'I/O
+            # Il timer chiama _apply_master_dimmer, che pubblica il frame al thread di output DMX
             self._master_dimmer_debounce_timer.start()
 
 
@@ -251,6 +231,12 @@ class FixtureControlMixin:
         master_fader_layout.addWidget(self.master_label)
         master_fader_layout.addWidget(self.master_slider)
         master_layout.addLayout(master_fader_layout)
+
+        # [NUOVO] Limita il Master Dimmer ai soli canali di intensità/colore
+        self.master_solo_intensita_check = QCheckBox("Solo canali Intensità/Colore")
+        self.master_solo_intensita_check.setChecked(self.settings_manager.data.get('master_dimmer_solo_intensita', False))
+        self.master_solo_intensita_check.toggled.connect(self._toggle_master_dimmer_solo_intensita)
+        master_layout.addWidget(self.master_solo_intensita_check)
         
         self.fader_layout.addWidget(master_group)
         # --- FINE Master Dimmer Control ---
@@ -382,9 +368,8 @@ class FixtureControlMixin:
             # 2. Applica il Master Dimmer
             self.universo_attivo.array_canali = self._apply_master_dimmer_to_array_only(self.universo_attivo.array_canali)
             
-            # 3. [MODIFICATO] Invia DMX in un thread separato
-            dmx_data_copy = self.universo_attivo.array_canali[:]
-            threading.Thread(target=self.dmx_comm.send_dmx_packet, args=(dmx_data_copy,)).start()
+            # 3. Pubblica il frame DMX (inviato dal thread di output)
+            self._publish_dmx_frame()
             
             # 4. Aggiorna UI e Stage View
             self._aggiorna_valori_fader()
@@ -494,9 +479,8 @@ class FixtureControlMixin:
         
         self.aggiorna_simulazione_luce(fixture_instance)
         
-        # 3. [MODIFICATO] Invia DMX in un thread separato
-        dmx_data_copy = self.universo_attivo.array_canali[:]
-        threading.Thread(target=self.dmx_comm.send_dmx_packet, args=(dmx_data_copy,)).start()
+        # 3. Pubblica il frame DMX (inviato dal thread di output)
+        self._publish_dmx_frame()
 
     def aggiorna_simulazione_luce(self, instance: IstanzaFixture):
         """
@@ -505,8 +489,6 @@ class FixtureControlMixin:
         
         CORREZIONE: Applica il valore del canale Dimmer della fixture come fattore di attenuazione finale.
         """
-        import numpy as np
-        
         valori = instance.valori_correnti
         
         # Accumulatori in virgola mobile (0.0 - 255.0 * N_CANALI)
@@ -658,9 +640,8 @@ class FixtureControlMixin:
             self.universo_attivo.aggiorna_canali_universali()
             self.universo_attivo.array_canali = self._apply_master_dimmer_to_array_only(self.universo_attivo.array_canali)
             
-            # [MODIFICATO] Invia DMX in un thread separato
-            dmx_data_copy = self.universo_attivo.array_canali[:]
-            threading.Thread(target=self.dmx_comm.send_dmx_packet, args=(dmx_data_copy,)).start()
+            # Pubblica il frame DMX (inviato dal thread di output)
+            self._publish_dmx_frame()
             
         except ValueError as e:
             QMessageBox.critical(self, "Errore di Assegnazione", str(e))
@@ -681,10 +662,8 @@ class FixtureControlMixin:
              QMessageBox.critical(self, "Errore", "Indice non valido.")
              return
         
-        fixture_to_remove = self.universo_attivo.fixture_assegnate.pop(index_to_remove)
-        
-        # Rigenera l'array universale (non dimmato)
-        self.universo_attivo.aggiorna_canali_universali()
+        # Rimuove la fixture e rigenera mappa canali e array universale (non dimmato)
+        fixture_to_remove = self.universo_attivo.rimuovi_fixture(index_to_remove)
         
         u_stato = next((u for u in self.progetto.universi_stato if u.id_universo == self.universo_attivo.id_universo))
         addr_to_remove = fixture_to_remove.indirizzo_inizio
@@ -702,8 +681,7 @@ class FixtureControlMixin:
         # Applica il Master Dimmer prima di inviare
         self.universo_attivo.array_canali = self._apply_master_dimmer_to_array_only(self.universo_attivo.array_canali)
         
-        # [MODIFICATO] Invia DMX in un thread separato
-        dmx_data_copy = self.universo_attivo.array_canali[:]
-        threading.Thread(target=self.dmx_comm.send_dmx_packet, args=(dmx_data_copy,)).start()
+        # Pubblica il frame DMX (inviato dal thread di output)
+        self._publish_dmx_frame()
         
         QMessageBox.information(self, "Rimozione", f"Fixture '{fixture_to_remove.modello.nome}' (DMX {addr_to_remove}) rimossa con successo.")
\ No newline at end of file
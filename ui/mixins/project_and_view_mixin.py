@@ -93,6 +93,7 @@ class ProjectAndViewMixin:
                     istanza = IstanzaFixture(modello, stato_fixture.indirizzo_inizio)
                     nuovo_universo.fixture_assegnate.append(istanza)
                     
+            nuovo_universo.ricalcola_mappa_canali()
             nuovo_universo.aggiorna_canali_universali()
             self.universi[nuovo_universo.id_universo] = nuovo_universo
             
@@ -328,7 +329,8 @@ class ProjectAndViewMixin:
              QMessageBox.critical(self, "Errore", "Dipendenze Engine/Settings non trovate.")
              return
              
-        dlg = SettingsDialog(self.audio_engine, self.midi_engine, self.settings_manager)
+        dlg = SettingsDialog(self.audio_engine, self.midi_engine, self.settings_manager,
+                             dmx_controller=getattr(self, 'dmx_comm', None))
         dlg.exec()
 
     def _show_info_dialog(self):
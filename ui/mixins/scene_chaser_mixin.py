@@ -2,23 +2,35 @@
 
 from PyQt6.QtWidgets import QMessageBox 
 from PyQt6.QtCore import QTimer, Qt
-from core.dmx_models import Scena, PassoChaser, Chaser
+from core.dmx_models import Scena, PassoChaser, Chaser, UNITA_SECONDI
 from core.project_models import UniversoStato
 import time 
-import threading 
+import numpy as np
 from core.dmx_models import ActiveScene 
+from core.dmx_chaser import TimelineChaser, EventoChaser, prossimo_allineamento
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QSlider, QGroupBox, QPushButton 
 from ui.components.chaser_editor_dialog import ChaserEditorDialog # Import necessario
 
 # Frequenza del timer di fade (in Hz)
 FADE_RATE_HZ = 100 
+# Frequenza massima di aggiornamento di fader e Stage View durante un fade (in Hz).
+# Il calcolo DMX segue FADE_RATE_HZ; la UI è aggiornata più di rado per non bloccare il thread GUI.
+FADE_UI_RATE_HZ = 25
+# Intervallo massimo (ms) tra due controlli della timeline di un chaser agganciato all'audio:
+# il clock del brano può fermarsi, ripartire o saltare (seek)
+CHASER_SYNC_POLL_MS = 20
+# Un salto all'indietro del clock audio oltre questa soglia (s) riallinea la timeline
+CHASER_SYNC_SEEK_TOLERANCE_S = 0.1
 
 class SceneChaserMixin:
     """Gestisce la creazione, salvataggio e riproduzione di Scene e Chaser."""
     
-    # Variabili di stato per il Fading
-    _FADE_DATA = {} 
+    # Variabili di stato per il Fading (il FadeEngine è creato dal widget: self.fade_engine)
     _FADE_TICK_MS = 1000 / FADE_RATE_HZ
+    _FADE_UI_INTERVAL_S = 1.0 / FADE_UI_RATE_HZ
+    _last_fade_ui_update = 0.0
+    # Canali del passo chaser applicato per ultimo: il passo successivo deve riportarli alla base
+    _canali_passo_precedente = np.zeros(0, dtype=np.intp)
     
     # [NUOVO] Lista di ActiveScene
     active_scenes: list[ActiveScene] = []
@@ -46,12 +58,11 @@ class SceneChaserMixin:
         
         for data in active_scenes_data:
             scena_nome = data.get('scena_nome')
-            # Manteniamo il valore salvato, ma non è più modificabile dalla UI
-            master_value = data.get('master_value', 255) 
+            # [MODIFICATO] Il submaster salvato viene ripristinato (fader per scena nel pannello Scene Attive)
+            master_value = max(0, min(255, int(data.get('master_value', 255))))
             scena = scene_map.get(scena_nome)
             if scena:
-                # Forza Master a 255 in ActiveScene, mantenendo la vecchia struttura dati
-                rebuilt_scenes.append(ActiveScene(scena, master_value=255)) 
+                rebuilt_scenes.append(ActiveScene(scena, master_value=master_value)) 
                 
         return rebuilt_scenes
 
@@ -61,7 +72,7 @@ class SceneChaserMixin:
         """Aggiunge una scena alla lista attiva in base all'indice (0-based) dalla lista salvata. [MODIFICATO]"""
         if 0 <= index < len(self.scene_list):
             scena_da_applicare = self.scene_list[index]
-            # Master value è FISSATO a 255 per le scene attive
+            # La scena entra a piena intensità (submaster 255)
             self._add_scene_to_active(scena_da_applicare, master_value=255) 
             self.setWindowTitle(f"DMX Controller - Scena MIDI: {scena_da_applicare.nome}")
         else:
@@ -86,12 +97,12 @@ class SceneChaserMixin:
                  self._ferma_chaser(show_message=False)
             
             self.chaser_attivo = chaser_to_start
-            self._FADE_DATA.clear()
+            self.fade_engine.clear()
             
             # Imposta l'indice di partenza (per il ciclo)
             self.chaser_attivo.indice_corrente = len(self.chaser_attivo.passi) - 1 
             
-            self._esegui_passo_chaser() 
+            self._avvia_timeline_chaser() 
             
             self.setWindowTitle(f"DMX Controller - CHASER ATTIVO MIDI: {chaser_to_start.nome}")
             self._update_chaser_list_ui()
@@ -111,13 +122,13 @@ class SceneChaserMixin:
         found = False
         for active_scene in self.active_scenes:
             if active_scene.scena.nome == scene.nome:
-                # Il master è fisso a 255 per le scene attive
+                # Riattivare una scena già attiva la riporta a piena intensità
                 active_scene.master_value = 255 
                 found = True
                 break
         
         if not found:
-             # Usa master_value FISSATO a 255 per le scene attive
+             # Le nuove scene attive partono a piena intensità (regolabile dal fader della scena)
              self.active_scenes.append(ActiveScene(scene, master_value=255)) 
              
         self._update_active_scenes_ui()
@@ -130,7 +141,22 @@ class SceneChaserMixin:
             self._update_active_scenes_ui()
             self._merge_and_send_dmx()
             
-    def _merge_and_send_dmx(self):
+    def set_active_scene_master(self, index: int, master_value: int, aggiorna_output: bool = True):
+        """
+        Imposta il submaster (0-255) di una scena attiva e aggiorna l'output. [NUOVO]
+        Usato dal fader della scena e dai cue Submaster. La fusione ricalcola solo il
+        contributo della scena modificata; lo stato del progetto non viene salvato ad
+        ogni movimento del fader (vedi _save_active_scenes al rilascio).
+        Con aggiorna_output=False cambia solo lo stato (il chiamante applica l'output, es. con un fade).
+        """
+        if not 0 <= index < len(self.active_scenes):
+            print(f"Errore: Indice scena attiva {index} fuori limite.")
+            return
+        self.active_scenes[index].master_value = max(0, min(255, int(master_value)))
+        if aggiorna_output:
+            self._merge_and_send_dmx(salva=False)
+
+    def _merge_and_send_dmx(self, salva: bool = True):
         """Metodo per chiamare la fusione HTP, inviare DMX e aggiornare la UI. [MODIFICATO]"""
         if not hasattr(self, '_merge_active_scenes'):
              print("ERRORE: _merge_active_scenes non disponibile. Impossibile fondere le scene.")
@@ -142,18 +168,17 @@ class SceneChaserMixin:
         # 2. Aggiorna UI (Fader e Stage View)
         self._aggiorna_ui_fader_e_stage() 
 
-        # 3. Invia DMX in un thread separato
-        dmx_data_copy = self.universo_attivo.array_canali[:]
-        threading.Thread(target=self.dmx_comm.send_dmx_packet, args=(dmx_data_copy,)).start()
+        # 3. Pubblica il frame DMX (inviato dal thread di output)
+        self._publish_dmx_frame()
              
-        self._save_active_scenes()
+        if salva:
+            self._save_active_scenes()
 
 
     def _save_active_scenes(self):
         """Serializza le scene attive nello stato del progetto. [NUOVO]"""
         u_stato = next((u for u in self.progetto.universi_stato if u.id_universo == self.universo_attivo.id_universo), None)
         if u_stato:
-             # Manteniamo il master_value per la persistenza, anche se è fisso a 255
              u_stato.active_scenes_data = [{'scena_nome': s.scena.nome, 'master_value': s.master_value} for s in self.active_scenes]
              self._salva_stato_progetto()
 
@@ -211,12 +236,22 @@ class SceneChaserMixin:
             label_text = f"SCENA: {active_scene.scena.nome}" 
             label = QLabel(label_text)
             
+            # [NUOVO] Submaster della scena (0-255): l'output segue il fader, il progetto è salvato al rilascio
+            slider_master = QSlider(Qt.Orientation.Horizontal)
+            slider_master.setRange(0, 255)
+            slider_master.setValue(active_scene.master_value)
+            slider_master.setFixedWidth(100)
+            slider_master.setToolTip("Submaster della scena")
+            slider_master.valueChanged.connect(lambda value, index=idx: self.set_active_scene_master(index, value))
+            slider_master.sliderReleased.connect(self._save_active_scenes)
+            
             btn_remove = QPushButton("X")
             btn_remove.setFixedSize(20, 20)
             # Connessione: il lambda è necessario per passare l'indice corretto
             btn_remove.clicked.connect(lambda _, index=idx: self._remove_active_scene(index))
             
             h_layout.addWidget(label, 1)
+            h_layout.addWidget(slider_master)
             h_layout.addWidget(btn_remove)
 
             self.active_scenes_layout.addWidget(scene_widget)
@@ -274,8 +309,7 @@ class SceneChaserMixin:
         self._aggiorna_ui_fader_e_stage() 
         
         # 7. Invia DMX
-        dmx_data_copy = self.universo_attivo.array_canali[:]
-        threading.Thread(target=self.dmx_comm.send_dmx_packet, args=(dmx_data_copy,)).start()
+        self._publish_dmx_frame()
         
         self.setWindowTitle(f"DMX Controller - Scena Caricata per Modifica: {scena.nome}")
         
@@ -483,12 +517,12 @@ class SceneChaserMixin:
             self._ferma_chaser(show_message=False)
             
         self.chaser_attivo = chaser_to_start
-        self._FADE_DATA.clear()
+        self.fade_engine.clear()
         
         # Imposta l'indice di partenza (per il ciclo)
         self.chaser_attivo.indice_corrente = len(self.chaser_attivo.passi) - 1 
         
-        self._esegui_passo_chaser() 
+        self._avvia_timeline_chaser() 
         
         self.setWindowTitle(f"DMX Controller - CHASER ATTIVO: {chaser_to_start.nome}")
         self._update_chaser_list_ui() # Aggiorna la UI per mostrare il Chaser attivo
@@ -520,9 +554,9 @@ class SceneChaserMixin:
                  return
                  
             self.chaser_attivo = chaser_to_toggle
-            self._FADE_DATA.clear()
+            self.fade_engine.clear()
             self.chaser_attivo.indice_corrente = len(self.chaser_attivo.passi) - 1 
-            self._esegui_passo_chaser() 
+            self._avvia_timeline_chaser() 
             self.setWindowTitle(f"DMX Controller - CHASER ATTIVO: {chaser_to_toggle.nome}")
             self._update_chaser_list_ui()
             self._update_active_scenes_ui() # Aggiorna la lista delle scene attive
@@ -534,7 +568,8 @@ class SceneChaserMixin:
         if self.fade_timer.isActive():
             self.fade_timer.stop()
         
-        self._FADE_DATA.clear()
+        self.fade_engine.clear()
+        self.chaser_timeline = None
         
         # Quando il chaser si ferma, l'output deve tornare al Layer Scene Attive (Programmer).
         # Poiché il chaser non ha toccato self.active_scenes, chiamiamo solo la fusione.
@@ -549,87 +584,142 @@ class SceneChaserMixin:
         if show_message:
             QTimer.singleShot(10, lambda: QMessageBox.information(self, "Stop Chaser", "Sequenza interrotta."))
 
+    def _avvia_timeline_chaser(self):
+        """
+        Precalcola la timeline assoluta del chaser attivo (a partire da ora) ed esegue
+        il primo passo. Con tempi in battiti/battute la durata dell'unità deriva dal BPM
+        del brano; con sync_audio la timeline parte dal prossimo battito/battuta del
+        clock audio. [NUOVO]
+        """
+        chaser = self.chaser_attivo
+        secondi_per_unita = chaser.secondi_per_unita(self._bpm_corrente())
+        start_time = self._orologio_chaser()
+        if chaser.sync_audio and chaser.unita_tempo != UNITA_SECONDI:
+            start_time = prossimo_allineamento(start_time, secondi_per_unita)
+
+        try:
+            self.chaser_timeline = TimelineChaser(chaser, start_time=start_time, secondi_per_unita=secondi_per_unita)
+        except IndexError:
+            self._ferma_chaser()
+            return
+        self._canali_passo_precedente = np.zeros(0, dtype=np.intp)
+        self._esegui_passo_chaser()
+
+    def _orologio_chaser(self) -> float:
+        """Orologio della timeline: il tempo del brano audio (sync_audio) o time.monotonic()."""
+        if self.chaser_attivo and self.chaser_attivo.sync_audio and getattr(self, 'audio_engine', None):
+            return self.audio_engine.get_current_time()
+        return time.monotonic()
+
+    def _bpm_corrente(self) -> float:
+        """BPM del brano corrente (quello usato per il MIDI Clock), 120 se non disponibile."""
+        if getattr(self, 'midi_engine', None) and hasattr(self.midi_engine, 'get_current_bpm'):
+            return self.midi_engine.get_current_bpm() or 120.0
+        return 120.0
+
     def _esegui_passo_chaser(self):
-        """Esegue il passo successivo (Fade In + Hold) del chaser e aggiorna il timer."""
-        if not self.chaser_attivo:
+        """
+        Esegue gli eventi scaduti della timeline (Fade In / Fade Out dei passi) e
+        riarma il chaser_timer sull'istante assoluto del prossimo evento: la latenza
+        dell'event loop non si accumula tra un passo e l'altro. [MODIFICATO]
+        """
+        if not self.chaser_attivo or self.chaser_timeline is None:
             self._ferma_chaser(show_message=False)
             return
 
-        try:
-            passo = self.chaser_attivo.next_passo()
-            
-            # 1. Prepara per il Fade In
-            if passo.tempo_fade_in > 0.0:
-                self._start_fade(passo.scena, passo.tempo_fade_in, is_chaser_step=True)
-                
-                self.chaser_timer.stop()
-                
-                # Calcola il ritardo totale prima di eseguire il prossimo passo
-                total_delay_ms = int((passo.tempo_fade_in + passo.tempo_permanenza) * 1000)
-                
-                if total_delay_ms > 0:
-                    QTimer.singleShot(total_delay_ms, self._esegui_passo_chaser)
-                else:
-                    QTimer.singleShot(10, self._esegui_passo_chaser)
-                
-                
-                self.setWindowTitle(f"DMX Controller - CHASER ATTIVO: {self.chaser_attivo.nome} | Passo: {passo.scena.nome} (Fade In {passo.tempo_fade_in:.1f}s)")
-                
-                return 
+        timeline = self.chaser_timeline
+        now = self._orologio_chaser()
+
+        # Clock audio tornato indietro (seek/stop del brano): riallinea la timeline
+        if timeline.ultimo_tempo is not None and now < timeline.ultimo_tempo - CHASER_SYNC_SEEK_TOLERANCE_S:
+            self._avvia_timeline_chaser()
+            return
 
+        # Gli istanti della timeline vengono riportati su time.monotonic() per il FadeEngine
+        now_monotonic = time.monotonic()
+        for evento in timeline.eventi_scaduti(now):
+            inizio = now_monotonic - (now - evento.tempo)
+            if evento.tipo == EventoChaser.OUT:
+                self._esegui_fade_out_passo(evento, inizio)
             else:
-                # --- Applicazione Istantanea (Senza Fade) ---
-                
-                # 2. Applica la scena del passo Chaser (CSL) sulla base (SLR/PS/Blackout)
-                dmx_array = self._apply_chaser_step_to_array(passo.scena)
+                self._esegui_fade_in_passo(evento, inizio)
+
+        # Riarma il timer (single shot) sul prossimo evento della timeline
+        ritardo_ms = timeline.ms_al_prossimo_evento(now)
+        if self.chaser_attivo.sync_audio:
+            ritardo_ms = min(ritardo_ms, CHASER_SYNC_POLL_MS)
+        self.chaser_timer.start(ritardo_ms)
+
+    def _esegui_fade_in_passo(self, evento: EventoChaser, inizio: float):
+        """Applica un passo del chaser (Fade In + Hold), ancorato all'istante 'inizio' (time.monotonic())."""
+        passo = evento.passo
+
+        # 1. Prepara per il Fade In
+        if evento.durata > 0.0:
+            self._start_fade(passo.scena, evento.durata, is_chaser_step=True, start_time=inizio)
+            self.setWindowTitle(f"DMX Controller - CHASER ATTIVO: {self.chaser_attivo.nome} | Passo: {passo.scena.nome} (Fade In {evento.durata:.1f}s)")
+            return
 
-                # 3. Applica il Master Dimmer (MDA)
-                dmx_array = self._apply_master_dimmer_to_array_only(dmx_array)
-                
-                self.universo_attivo.array_canali = dmx_array
-                
-                # 4. [MODIFICATO - THREADING] Invia DMX in un thread separato
-                dmx_data_copy = self.universo_attivo.array_canali[:]
-                threading.Thread(target=self.dmx_comm.send_dmx_packet, args=(dmx_data_copy,)).start()
+        # --- Applicazione Istantanea (Senza Fade) ---
+        
+        # 2. Applica la scena del passo Chaser (CSL) sulla base (SLR/PS/Blackout)
+        dmx_array = self._apply_chaser_step_to_array(passo.scena)
+        self._canali_passo_precedente = passo.scena.indici
 
-                self._aggiorna_ui_fader_e_stage() 
+        # 3. Applica il Master Dimmer (MDA)
+        dmx_array = self._apply_master_dimmer_to_array_only(dmx_array)
+        
+        self.universo_attivo.array_canali = dmx_array
+        
+        # 4. Pubblica il frame DMX (inviato dal thread di output)
+        self._publish_dmx_frame()
 
-                # 5. Imposta Hold Time
-                tempo_totale_ms = int(passo.tempo_permanenza * 1000)
-                if tempo_totale_ms > 0:
-                     self.chaser_timer.setInterval(tempo_totale_ms) 
-                     self.chaser_timer.start()
-                else:
-                    self.chaser_timer.stop()
-                    QTimer.singleShot(10, self._esegui_passo_chaser)
+        self._aggiorna_ui_fader_e_stage() 
 
+        hold_s = passo.tempo_permanenza * self.chaser_timeline.secondi_per_unita
+        self.setWindowTitle(f"DMX Controller - CHASER ATTIVO: {self.chaser_attivo.nome} | Passo: {passo.scena.nome} (Hold {hold_s:.1f}s)")
 
-                self.setWindowTitle(f"DMX Controller - CHASER ATTIVO: {self.chaser_attivo.nome} | Passo: {passo.scena.nome} (Hold {passo.tempo_permanenza:.1f}s)")
-                
-        except IndexError:
-            self._ferma_chaser()
+    def _esegui_fade_out_passo(self, evento: EventoChaser, inizio: float):
+        """Riporta i canali del passo alla base (Scene Attive/Blackout) nel tempo di Fade Out. [NUOVO]"""
+        passo = evento.passo
+        self._start_fade(passo.scena, evento.durata, start_time=inizio, fade_out=True)
+        self.setWindowTitle(f"DMX Controller - CHASER ATTIVO: {self.chaser_attivo.nome} | Passo: {passo.scena.nome} (Fade Out {evento.durata:.1f}s)")
     
-    def _start_fade(self, target_scena: Scena, fade_time: float, is_chaser_step: bool = False):
-        """Avvia l'interpolazione graduale dei valori DMX. [MODIFICATO per Chaser Layering]"""
+    def _start_fade(self, target_scena: Scena, fade_time: float, is_chaser_step: bool = False,
+                    start_time: float | None = None, fade_out: bool = False):
+        """
+        Avvia l'interpolazione graduale dei valori DMX. [MODIFICATO per Chaser Layering]
+        Con fade_out=True i canali della scena tornano alla base (Scene Attive/Blackout).
+        'start_time' (time.monotonic()) ancora il fade a un istante della timeline del chaser.
+        """
         
         # 0. Ottiene l'array di partenza (l'output DMX corrente, che include MDA)
-        start_values = self.universo_attivo.array_canali[:] 
+        start_values = self.universo_attivo.array_canali.copy() 
+
+        # Canali del fade: quelli della scena e quelli del passo precedente, che tornano alla base
+        canali = np.union1d(self._canali_passo_precedente, target_scena.indici)
+        self._canali_passo_precedente = target_scena.indici
             
         if fade_time <= 0.0:
             # Fallback istantaneo
-            self.universo_attivo.array_canali = self._apply_chaser_step_to_array(target_scena)
+            if fade_out:
+                self.universo_attivo.array_canali = self._get_combined_scene_array(apply_mda=False)
+            else:
+                self.universo_attivo.array_canali = self._apply_chaser_step_to_array(target_scena)
             
             if hasattr(self, '_apply_master_dimmer_to_array_only'):
                  self.universo_attivo.array_canali = self._apply_master_dimmer_to_array_only(self.universo_attivo.array_canali)
 
-            dmx_data_copy = self.universo_attivo.array_canali[:]
-            threading.Thread(target=self.dmx_comm.send_dmx_packet, args=(dmx_data_copy,)).start()
+            self._publish_dmx_frame()
 
             self._aggiorna_ui_fader_e_stage()
             return
         
         # 1. Calcola i valori di destinazione (output SLR + Step Chaser, SENZA MDA)
-        target_values_raw = self._apply_chaser_step_to_array(target_scena)
+        if fade_out:
+            target_values_raw = self._get_combined_scene_array(apply_mda=False)
+        else:
+            target_values_raw = self._apply_chaser_step_to_array(target_scena)
         
         # 2. Applica il Master Dimmer ai valori di destinazione
         if hasattr(self, '_apply_master_dimmer_to_array_only'):
@@ -637,58 +727,51 @@ class SceneChaserMixin:
         else:
              target_values = target_values_raw
         
-
-        self._FADE_DATA = {
-            'start_values': start_values,
-            'target_values': target_values, # <--- Ora dimmati e miscelati con la base
-            'duration_ms': fade_time * 1000,
-            'start_time': time.time(),
-            'target_scene_name': target_scena.nome,
-            'is_chaser_step': is_chaser_step
-        }
+        # 3. Avvia il fade nel FadeEngine (tra due array dimmati) sui soli canali del passo
+        #    corrente e di quello precedente: eventuali altri fade in corso mantengono i propri canali
+        self.fade_engine.avvia(
+            start_values, 
+            target_values, # <--- Ora dimmati e miscelati con la base
+            fade_time,
+            canali=canali,
+            nome=target_scena.nome,
+            is_chaser_step=is_chaser_step,
+            start_time=start_time
+        )
+        self._last_fade_ui_update = 0.0
         
-        self.fade_timer.setInterval(int(self._FADE_TICK_MS))
-        self.fade_timer.start()
+        if not self.fade_timer.isActive():
+            self.fade_timer.setInterval(int(self._FADE_TICK_MS))
+            self.fade_timer.start()
 
 
     def _fade_tick(self):
-        """Funzione chiamata dal fade_timer per interpolare i valori DMX. [MODIFICATO]"""
-        if not self._FADE_DATA:
+        """Funzione chiamata dal fade_timer: fonde tutti i fade attivi nell'output tramite il FadeEngine. [MODIFICATO]"""
+        if not self.fade_engine.is_active:
             self.fade_timer.stop()
             return
         
-        data = self._FADE_DATA
-        elapsed_time = (time.time() - data['start_time']) * 1000 
+        now = time.monotonic()
         
-        progress = min(1.0, elapsed_time / data['duration_ms']) 
-        
-        new_dmx_array = self.universo_attivo.array_canali[:] 
-        
-        # 1. Interpolazione (tra due array dimmati)
-        for i in range(512):
-            start = data['start_values'][i]
-            target = data['target_values'][i]
-            
-            diff = target - start
-            new_value = start + int(diff * progress)
-            new_dmx_array[i] = new_value
+        # 1. Interpolazione vettoriale dei canali in transizione, scritta direttamente nell'output
+        completati = self.fade_engine.tick(self.universo_attivo.array_canali, now)
+        finished = not self.fade_engine.is_active
 
         # 2. Aggiornamento DMX
-        self.universo_attivo.array_canali = new_dmx_array
-        self._aggiorna_ui_fader_e_stage() 
+        self._publish_dmx_frame()
         
-        # 3. [MODIFICATO - THREADING] Invia DMX in un thread separato
-        dmx_data_copy = self.universo_attivo.array_canali[:]
-        threading.Thread(target=self.dmx_comm.send_dmx_packet, args=(dmx_data_copy,)).start()
+        # 3. Aggiornamento UI limitato a FADE_UI_RATE_HZ (sempre eseguito a fine fade)
+        if completati or now - self._last_fade_ui_update >= self._FADE_UI_INTERVAL_S:
+            self._last_fade_ui_update = now
+            self._aggiorna_ui_fader_e_stage() 
         
         # 4. Controllo Fine Fade
-        if progress >= 1.0:
+        passo_completato = next((f for f in completati if f.is_chaser_step), None)
+        if passo_completato and self.chaser_attivo:
+            self.setWindowTitle(f"DMX Controller - CHASER ATTIVO: {self.chaser_attivo.nome} | Passo: {passo_completato.nome or 'Scena Sconosciuta'} (Hold)")
+
+        if finished:
             self.fade_timer.stop()
-            self._FADE_DATA.clear()
-            
-            scene_name = data.get('target_scene_name', 'Scena Sconosciuta') 
-            if self.chaser_attivo:
-                self.setWindowTitle(f"DMX Controller - CHASER ATTIVO: {self.chaser_attivo.nome} | Passo: {scene_name} (Hold)")
 
     
     def _push_dmx_to_instances(self):
@@ -700,9 +783,9 @@ class SceneChaserMixin:
             start_addr, _ = fixture.get_indirizzi_universali()
             start_idx = start_addr - 1
             
-            for i in range(fixture.modello.numero_canali):
-                # Aggiorna l'array interno dell'istanza dalla posizione corretta nell'array DMX
-                fixture.valori_correnti[i] = self.universo_attivo.array_canali[start_idx + i]
+            # Aggiorna l'array interno dell'istanza dalla posizione corretta nell'array DMX
+            # (tolist() mantiene int Python, serializzabili nelle Scene)
+            fixture.valori_correnti[:] = self.universo_attivo.array_canali[start_idx:start_idx + fixture.modello.numero_canali].tolist()
 
     def _aggiorna_ui_fader_e_stage(self):
         """
@@ -745,70 +828,26 @@ class SceneChaserMixin:
 
     # --- CHASER HELPER METHODS ---
 
-    def _get_combined_scene_array(self, apply_mda: bool = True) -> list[int]:
+    def _get_combined_scene_array(self, apply_mda: bool = True) -> np.ndarray:
         """
         Calcola l'output DMX risultante dalla fusione delle Active Scenes (SLR)
         e lo stato Programmer (PS), o Blackout se non ci sono scene.
         """
         
-        # 1. SALVA LO STATO CORRENTE DEL PROGRAMMER (FADER)
-        saved_programmer_values = {}
-        for instance in self.universo_attivo.fixture_assegnate:
-            saved_programmer_values[instance.indirizzo_inizio] = instance.valori_correnti[:]
-        
-        
-        # 2. CALCOLA IL RISULTATO FUSO DEL SOLO SCENE LAYER (SLR)
-        merged_scene_values = {} # {dmx_addr: value}
-        
-        for active_scene in self.active_scenes:
-            scene_data = active_scene.scena.valori_canali
-            master_factor = active_scene.master_value / 255.0
-            
-            for dmx_addr, raw_value in scene_data.items():
-                value_with_master = int(raw_value * master_factor)
-                
-                # Applica HTP tra le scene attive
-                if dmx_addr not in merged_scene_values:
-                    merged_scene_values[dmx_addr] = value_with_master
-                else:
-                    merged_scene_values[dmx_addr] = max(merged_scene_values[dmx_addr], value_with_master)
-        
-        
-        # 3. DETERMINA IL VALORE DMX VINCENTE E SOVRASCRIVI TEMPORANEAMENTE fixture.valori_correnti
-        
-        for instance in self.universo_attivo.fixture_assegnate:
-            start_addr, end_addr = instance.get_indirizzi_universali()
-            programmer_state = saved_programmer_values[instance.indirizzo_inizio]
-            
-            for i in range(instance.modello.numero_canali):
-                dmx_addr = start_addr + i
-                
-                if self.active_scenes:
-                    # PLAYBACK MODE: Output = Scene Layer Result (SLR).
-                    scene_value = merged_scene_values.get(dmx_addr, instance.modello.descrizione_canali[i].valore_default)
-                    instance.valori_correnti[i] = scene_value 
-                
-                else:
-                    # IDLE / BLACKOUT MODE: Se non ci sono scene attive, l'output DMX deve essere 0 (Blackout).
-                    default_value = instance.modello.descrizione_canali[i].valore_default
-                    instance.valori_correnti[i] = default_value
-
-        # 4. Applica l'HTP/LTP DMX finale sull'array universale
-        self.universo_attivo.aggiorna_canali_universali()
-        final_array = self.universo_attivo.array_canali[:]
+        # 1. Fusione HTP delle scene attive (o Blackout) dalla forma compilata delle scene.
+        #    Lo stato del Programmer (fader) non viene toccato.
+        final_array = self.universo_attivo.fondi_scene(
+            [(s.scena, s.master_value / 255.0) for s in self.active_scenes]
+        )
 
-        # 5. RIPRISTINA LO STATO VERO DEL PROGRAMMER (FADER)
-        for instance in self.universo_attivo.fixture_assegnate:
-            instance.valori_correnti = programmer_state[:]
-             
-        # 6. Applica il Master Dimmer globale (MDA) se richiesto.
+        # 2. Applica il Master Dimmer globale (MDA) se richiesto.
         if apply_mda:
             return self._apply_master_dimmer_to_array_only(final_array)
         else:
             return final_array
 
     
-    def _apply_chaser_step_to_array(self, step_scena: Scena) -> list[int]:
+    def _apply_chaser_step_to_array(self, step_scena: Scena) -> np.ndarray:
         """
         Fonde il passo Chaser (CSL) sui valori di base ottenuti dalle Scene Attive (SLR).
         Il risultato è HTP/LTP(SLR, CSL). [CORRETTO per Layering]
@@ -816,38 +855,9 @@ class SceneChaserMixin:
         # 1. Ottiene la base SLR (Scene Layer Result) - SENZA MDA
         base_slr_array = self._get_combined_scene_array(apply_mda=False)
 
-        # 2. Salviamo lo stato del Programmer per il ripristino
-        saved_programmer_values = {}
-        for instance in self.universo_attivo.fixture_assegnate:
-             saved_programmer_values[instance.indirizzo_inizio] = instance.valori_correnti[:]
-             
-             start_addr = instance.indirizzo_inizio
-             for i in range(instance.modello.numero_canali):
-                  dmx_addr = start_addr + i
-                  
-                  # Valore base (SLR)
-                  val_base = base_slr_array[dmx_addr - 1]
-                  
-                  # Valore passo Chaser
-                  val_step = step_scena.valori_canali.get(dmx_addr, -1)
-
-                  if val_step != -1:
-                      # Se il Chaser definisce un valore, HTP (Dimmer) o LTP (Colore),
-                      # il valore Step vince su quel canale.
-                      instance.valori_correnti[i] = val_step
-                  else:
-                      # Altrimenti, il canale non è definito nel Chaser, usiamo il valore SLR/base.
-                      instance.valori_correnti[i] = val_base
-
-        # 3. Esegue la fusione HTP/LTP su questo array temporaneo di istance.valori_correnti
-        self.universo_attivo.aggiorna_canali_universali()
-        final_output = self.universo_attivo.array_canali[:]
-
-        # 4. Ripristino Programmer State
-        for instance in self.universo_attivo.fixture_assegnate:
-             instance.valori_correnti = saved_programmer_values[instance.indirizzo_inizio]
-             
-        return final_output
+        # 2. Se il Chaser definisce un valore, HTP (Dimmer) o LTP (Colore), il valore Step
+        #    vince su quel canale; altrimenti resta il valore SLR/base (copia mascherata).
+        return self.universo_attivo.sovrapponi_scena(base_slr_array, step_scena)
 
 
     def _open_chaser_editor_dialog(self):
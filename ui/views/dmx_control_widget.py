@@ -13,7 +13,8 @@ from PyQt6.QtGui import QAction
 from core.dmx_models import FixtureModello, IstanzaFixture, Scena, PassoChaser, Chaser 
 from core.dmx_universe import UniversoDMX
 from core.data_manager import DataManager, INTERNAL_DMX_PORT 
-from core.dmx_comm import DMXController 
+from core.dmx_comm import DMXController, DEFAULT_REFRESH_RATE_HZ
+from core.dmx_fade import FadeEngine, DEFAULT_EASING
 from core.project_models import Progetto, UniversoStato, MidiMapping
 from core.midi_comm import MIDIController 
 from ui.components.settings_manager import SettingsManager 
@@ -34,22 +35,25 @@ from ui.mixins.dmx_comm_mixin import DMXCommunicationMixin
 from ui.mixins.fixture_control_mixin import FixtureControlMixin 
 from ui.mixins.scene_chaser_mixin import SceneChaserMixin 
 from ui.mixins.midi_control_mixin import MIDIControlMixin 
+from ui.mixins.cue_track_mixin import CueTrackMixin 
 
 class DMXControlWidget(QWidget, 
                      ProjectAndViewMixin, 
                      DMXCommunicationMixin, 
                      FixtureControlMixin, 
                      SceneChaserMixin,
-                     MIDIControlMixin):
+                     MIDIControlMixin,
+                     CueTrackMixin):
     
     # MODIFIED CONSTRUCTOR: Accepts the injected stage_view
-    def __init__(self, audio_engine, midi_engine, settings_manager, stage_view: StageViewWidget, parent=None):
+    def __init__(self, audio_engine, midi_engine, settings_manager, stage_view: StageViewWidget, parent=None, data_manager: DataManager | None = None):
         super().__init__(parent)
         
         # Assegna i motori condivisi
         self.audio_engine = audio_engine 
         self.midi_engine = midi_engine 
         self.settings_manager = settings_manager 
+        self.data_manager = data_manager # [NUOVO] Per le tracce cue DMX dei brani
         
         # 1. Carica Modelli Fixture e Progetto (Logica locale per Mixins)
         self.fixture_modelli: list[FixtureModello] = DataManager.carica_modelli()
@@ -83,7 +87,10 @@ class DMXControlWidget(QWidget,
         current_u_state = next((u for u in self.progetto.universi_stato if u.id_universo == self.universo_attivo.id_universo), Progetto.crea_vuoto().universi_stato[0])
         dmx_port = getattr(current_u_state, 'dmx_port_name', 'COM5') 
         
-        self.dmx_comm = DMXController(port_name=dmx_port) 
+        self.dmx_comm = DMXController(
+            port_name=dmx_port,
+            refresh_rate_hz=self.settings_manager.data.get("dmx_refresh_rate_hz", DEFAULT_REFRESH_RATE_HZ)
+        )
         self.dmx_comm.connect() 
         
         # 4. Stage View: Assign the injected widget
@@ -91,11 +98,22 @@ class DMXControlWidget(QWidget,
         
         # 5. Timer e Scene
         self.chaser_attivo: Chaser | None = None
+        self.chaser_timeline = None # TimelineChaser del chaser attivo (istanti assoluti dei passi)
         self.chaser_timer = QTimer(self)
+        self.chaser_timer.setSingleShot(True) # Riarmato ad ogni evento della timeline
+        self.chaser_timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.chaser_timer.timeout.connect(self._esegui_passo_chaser)
+        self.fade_engine = FadeEngine(easing=self.settings_manager.data.get('dmx_fade_easing', DEFAULT_EASING))
         self.fade_timer = QTimer(self) 
+        self.fade_timer.setTimerType(Qt.TimerType.PreciseTimer)
         self.fade_timer.setInterval(10)
         self.fade_timer.timeout.connect(self._fade_tick) 
+
+        # [NUOVO] Timer della traccia cue DMX (single shot, armato sul prossimo cue del brano)
+        self.cue_timer = QTimer(self)
+        self.cue_timer.setSingleShot(True)
+        self.cue_timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.cue_timer.timeout.connect(self._cue_tick)
         
         # 6. Setup MIDI Control (Input)
         self.midi_controller = MIDIController(parent=self)
@@ -127,13 +145,14 @@ class DMXControlWidget(QWidget,
 
         self._ricostruisci_scene_chasers(u_stato) 
         self.popola_controlli_fader()
+        self.cue_timer.start(0)
         
-        # [MODIFICATO] Invia il pacchetto DMX applicando il master dimmer (che è 255 di default qui)
+        # [MODIFICATO] Pubblica il frame DMX applicando il master dimmer (che è 255 di default qui)
         self.universo_attivo.aggiorna_canali_universali() # Popola l'array con valori non dimmati
         if hasattr(self, '_apply_master_dimmer_to_array_only'):
              self.universo_attivo.array_canali = self._apply_master_dimmer_to_array_only(self.universo_attivo.array_canali)
         
-        self.dmx_comm.send_dmx_packet(self.universo_attivo.array_canali)
+        self._publish_dmx_frame()
 
 
     def _setup_ui_layout(self):
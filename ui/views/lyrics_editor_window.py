@@ -8,22 +8,26 @@ from PyQt6.QtGui import QColor, QBrush
 
 import sounddevice as sd
 import soundfile as sf
-import threading
-import time
 import os 
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+# [NUOVO] Lettura in streaming e clock derivato dai frame, come nell'AudioEngine
+from engines.audio_stream import StreamerBrano
+from engines.audio_clock import ClockAudio
+from core.lyrics_timing import IndiceLyrics
+from core.lyrics_align import analizza_audio, suggerisci_timestamp
 
-# Tenta l'importazione di numpy per la gestione dei dati audio di fallback
-try:
-    import numpy as np
-except ImportError:
-    np = None
+# Tempo minimo (s) prima del quale nessuna riga è attiva
+ACTIVE_ROW_MIN_TIME_S = 0.04
+# [NUOVO] Intervallo (ms) di controllo dell'analisi audio in corso nel processo separato
+ANALYSIS_POLL_MS = 200
 
 
 class LyricsEditorWindow(QDialog):
     """
     Finestra di dialogo per la sincronizzazione dei lyrics con un file audio locale.
     """
-    def __init__(self, audio_file: str, text_lines: list[str], timestamps: list[float], parent=None):
+    def __init__(self, audio_file: str, text_lines: list[str], timestamps: list[float], parent=None, pcm_cache=None):
         super().__init__(parent)
         self.setWindowTitle("Lyrics Editor")
         self.setMinimumSize(900, 600)
@@ -37,13 +41,28 @@ class LyricsEditorWindow(QDialog):
             self.timestamps.append(0.0)
 
         # --- STATO AUDIO INTERNO ---
-        self.audio_data = None
+        # [MODIFICATO] Il file non viene caricato in memoria: viene letto a blocchi (o dal
+        # PCM in cache) da uno StreamerBrano solo durante la riproduzione
+        self.pcm_cache = pcm_cache
         self.samplerate = None
-        self.audio_pos = 0
+        self.channels = 0
+        self.audio_pos = 0              # Frame consegnati allo stream (posizione nel file)
+        self.stream = None
+        self.streamer: StreamerBrano | None = None
+        self.clock = ClockAudio()
         self.playing = False
-        self.start_time = 0.0
+        self._terminato = False
         self.pause_time = 0.0
         self.active_row = -1
+        # [NUOVO] Tempi ordinati per la ricerca binaria e intervallo in cui la riga attiva non cambia
+        self.lyrics_index = IndiceLyrics([])
+        self._finestra_riga = (0.0, 0.0)
+        self._aggiorna_indice()
+
+        # [NUOVO] Analisi onset/energia per i timestamp suggeriti: calcolata una volta in un processo separato
+        self._analisi = None
+        self._executor: ProcessPoolExecutor | None = None
+        self._analisi_future = None
 
         self.load_audio(audio_file)
         self.init_ui()
@@ -91,16 +110,21 @@ class LyricsEditorWindow(QDialog):
         self.btn_play = QPushButton("Play ▶️")
         self.btn_pause = QPushButton("Pausa ⏸️")
         self.btn_stop = QPushButton("Stop ⏹️")
+        self.btn_suggest = QPushButton("Suggerisci Timestamp 🎯")
+        self.btn_suggest.setToolTip("Propone i tempi delle righe senza timestamp analizzando la voce nel brano.\n"
+                                    "I timestamp già inseriti restano invariati e guidano l'allineamento.")
         self.btn_save = QPushButton("Salva e Chiudi ✅")
 
         self.btn_play.clicked.connect(self.play_audio)
         self.btn_pause.clicked.connect(self.pause_audio)
         self.btn_stop.clicked.connect(self.stop_audio)
+        self.btn_suggest.clicked.connect(self.suggest_timestamps)
         self.btn_save.clicked.connect(self.save_and_close)
 
         controls_layout.addWidget(self.btn_play)
         controls_layout.addWidget(self.btn_pause)
         controls_layout.addWidget(self.btn_stop)
+        controls_layout.addWidget(self.btn_suggest)
         controls_layout.addStretch()
         controls_layout.addWidget(self.btn_save)
         main_layout.addLayout(controls_layout)
@@ -109,55 +133,89 @@ class LyricsEditorWindow(QDialog):
     # AUDIO PLAYBACK (Interno, per Editing)
     # -------------------------------------------------------------
     def load_audio(self, path):
-        """Carica i dati audio del file per la riproduzione locale."""
+        """
+        [MODIFICATO] Legge solo i parametri del file (frequenza e canali): i campioni vengono
+        letti in streaming alla riproduzione, quindi l'apertura è immediata e la memoria
+        usata non dipende dalla durata del brano.
+        """
         try:
-            data, sr = sf.read(path, always_2d=True)
-            self.audio_data = data
-            self.samplerate = sr
+            in_cache = self.pcm_cache.ottieni(path) if self.pcm_cache is not None else None
+            if in_cache is not None:
+                pcm, sr = in_cache
+                self.samplerate, self.channels = sr, pcm.shape[1]
+            else:
+                info = sf.info(path)
+                self.samplerate, self.channels = info.samplerate, info.channels
             self.audio_pos = 0
-        except Exception:
-            # Fallback a dati silenziosi se il file non è trovato o è corrotto
-            self.audio_data = np.zeros((44100*10, 1)) if np else None
-            self.samplerate = 44100
+        except Exception as e:
+            print(f"Errore lettura file audio {path}: {e}")
+            self.samplerate = None
+            self.channels = 0
             
     def audio_callback(self, outdata, frames, time_info, status):
-        """Funzione di callback per sounddevice."""
-        if self.audio_data is None: return
-
-        if self.audio_pos + frames > len(self.audio_data):
-            remaining = len(self.audio_data) - self.audio_pos
-            if remaining > 0:
-                outdata[:remaining] = self.audio_data[self.audio_pos:]
-            outdata[remaining:] = 0
-            self.audio_pos = len(self.audio_data)
+        """Funzione di callback per sounddevice: copia dal ring buffer, nessuna lettura da disco."""
+        outdata.fill(0)
+        streamer = self.streamer
+        if not self.playing or streamer is None:
+            return
+
+        self.clock.aggiorna(self.audio_pos, frames, time_info)
+        streamer.lettori[0].leggi_in(outdata)
+        self.audio_pos += frames
+
+        if streamer.terminato:
+            # Fine del file: lo stream viene chiuso dal timer dell'interfaccia
             self.playing = False
-        else:
-            outdata[:] = self.audio_data[self.audio_pos:self.audio_pos + frames]
-            self.audio_pos += frames
+            self._terminato = True
+            self.clock.ferma(self.audio_pos / self.samplerate)
 
-    def _play_thread(self):
-        """Thread separato per la riproduzione sounddevice."""
+    def _avvia_stream(self, start_frame: int) -> bool:
+        """Apre il file in streaming dal frame indicato e avvia lo stream di output."""
+        self._chiudi_stream()
         try:
-            with sd.OutputStream(
+            self.streamer = StreamerBrano([{"file": self.audio_file}], self.samplerate,
+                                          start_frame=start_frame, pcm_cache=self.pcm_cache)
+            if not self.streamer.lettori:
+                self._chiudi_stream()
+                return False
+            self.streamer.avvia()
+            self.audio_pos = start_frame
+            self.stream = sd.OutputStream(
                 samplerate=self.samplerate,
-                channels=self.audio_data.shape[1],
-                callback=self.audio_callback
-            ):
-                while self.playing:
-                    sd.sleep(30)
+                channels=self.streamer.lettori[0].canali,
+                callback=self.audio_callback,
+                dtype='float32'
+            )
+            latenza = self.stream.latency
+            self.clock.avvia(start_frame, self.samplerate,
+                             float(latenza[1] if isinstance(latenza, (tuple, list)) else latenza))
+            self.playing = True
+            self.stream.start()
+            return True
         except Exception as e:
-            print(f"Errore nel thread audio: {e}")
-        
-        self.playing = False
-        self.pause_time = 0.0
-        self.active_row = -1
-        self.update_playback()
+            print(f"Errore avvio audio dell'editor: {e}")
+            self._chiudi_stream()
+            return False
 
+    def _chiudi_stream(self):
+        """Ferma lo stream di output e il thread di decodifica."""
+        self.playing = False
+        self._finestra_riga = (0.0, 0.0)
+        stream, self.stream = self.stream, None
+        if stream is not None:
+            try:
+                stream.stop()
+                stream.close()
+            except Exception as e:
+                print(f"Errore chiusura stream audio: {e}")
+        streamer, self.streamer = self.streamer, None
+        if streamer is not None:
+            streamer.ferma()
 
     def get_current_time(self) -> float:
-        """Restituisce il tempo di riproduzione corrente in secondi."""
+        """Restituisce il tempo di riproduzione corrente in secondi (derivato dai frame riprodotti)."""
         if self.playing:
-            return time.time() - self.start_time
+            return self.clock.posizione()
         elif self.pause_time > 0.0:
             return self.pause_time
         return 0.0
@@ -165,7 +223,7 @@ class LyricsEditorWindow(QDialog):
     def play_audio(self):
         """Avvia o riprende l'audio, con priorità al timestamp della riga selezionata."""
         if self.playing: return
-        if self.audio_data is None or self.audio_data.size == 0:
+        if not self.samplerate:
             print("Nessun dato audio caricato.")
             return
 
@@ -184,32 +242,38 @@ class LyricsEditorWindow(QDialog):
             start_ts = self.pause_time
             # print(f"Riproduzione ripresa da Pausa a {start_ts:.2f}s.")
         
-        self.playing = True
-        
-        # Calcola la posizione audio in frames
-        self.audio_pos = int(start_ts * self.samplerate)
-        
-        # Aggiorna il tempo di inizio per il tracking
-        self.start_time = time.time() - start_ts
+        self._terminato = False
         self.pause_time = 0.0
         
-        threading.Thread(target=self._play_thread, daemon=True).start()
+        # Calcola la posizione audio in frames
+        self._avvia_stream(int(start_ts * self.samplerate))
 
     def pause_audio(self):
         """Mette in pausa l'audio e registra il tempo."""
         if self.playing:
-            self.playing = False
-            self.pause_time = time.time() - self.start_time
+            self.pause_time = self.clock.posizione()
+            self.clock.ferma(self.pause_time)
+            self._chiudi_stream()
             # print(f"Pausa a {self.pause_time:.2f}s.")
 
     def stop_audio(self):
         """Ferma l'audio e resetta la posizione."""
-        self.playing = False
+        self._chiudi_stream()
+        self._terminato = False
         self.pause_time = 0.0
         self.audio_pos = 0
         self.active_row = -1 
         self.update_playback() 
 
+    def done(self, result):
+        """[NUOVO] Chiude lo stream audio alla chiusura del dialogo (Salva, Esc o chiusura finestra)."""
+        self.timer.stop()
+        self._chiudi_stream()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        super().done(result)
+
     # -------------------------------------------------------------
     # LOGICA LYRICS E TIMESTAMP
     # -------------------------------------------------------------
@@ -227,6 +291,7 @@ class LyricsEditorWindow(QDialog):
             
             if row < len(self.timestamps):
                 self.timestamps[row] = new_ts
+                self._aggiorna_indice()
             else:
                 return
 
@@ -241,6 +306,7 @@ class LyricsEditorWindow(QDialog):
             
             # Scrittura del timestamp nella casella
             ts_item.setText(f"{new_ts:.2f}") 
+            ts_item.setToolTip("")
             
             self.active_row = self.find_active_row(current_time)
             self.update_row_color(row)
@@ -291,20 +357,16 @@ class LyricsEditorWindow(QDialog):
     # COLORAZIONE E AGGIORNAMENTO
     # -------------------------------------------------------------
 
+    def _aggiorna_indice(self):
+        """[NUOVO] Ricostruisce l'indice dei tempi (solo righe con timestamp > 0) dopo una modifica."""
+        validi = [(ts, i) for i, ts in enumerate(self.timestamps) if ts > 0.0]
+        self.lyrics_index = IndiceLyrics([ts for ts, _ in validi], [i for _, i in validi])
+        self._finestra_riga = (0.0, 0.0)
+
     def find_active_row(self, current_time: float) -> int:
-        """Trova l'indice della riga attiva in base al tempo corrente."""
-        if not self.playing or current_time < 0.04: return -1
-        
-        valid_timestamps = sorted([(ts, i) for i, ts in enumerate(self.timestamps) if ts > 0.0], key=lambda x: x[0])
-        
-        active_index = -1
-        for ts, index in valid_timestamps:
-            if ts <= current_time:
-                active_index = index
-            else:
-                break 
-                
-        return active_index
+        """Trova l'indice della riga attiva in base al tempo corrente (ricerca binaria)."""
+        if not self.playing or current_time < ACTIVE_ROW_MIN_TIME_S: return -1
+        return self.lyrics_index.riga_attiva(current_time)
 
     def update_row_color(self, row):
         """Aggiorna il colore della riga (verde se attiva, bianco altrimenti)."""
@@ -325,10 +387,23 @@ class LyricsEditorWindow(QDialog):
 
     def update_playback(self):
         """Aggiorna la riga attiva e la colorazione tramite timer."""
+        if self._terminato:
+            # Fine del file raggiunta nel callback: chiude lo stream e riparte dall'inizio
+            self.stop_audio()
+            return
         if not self.playing and self.active_row == -1: return
             
         current_time = self.get_current_time()
+        # [NUOVO] Finché il tempo resta nell'intervallo della riga attiva non c'è nulla da fare
+        inizio, fine = self._finestra_riga
+        if self.playing and inizio <= current_time < fine:
+            return
+
         new_active_row = self.find_active_row(current_time)
+        if self.playing and current_time >= ACTIVE_ROW_MIN_TIME_S:
+            self._finestra_riga = self.lyrics_index.intervallo(current_time)
+        else:
+            self._finestra_riga = (0.0, 0.0)
         
         if new_active_row != self.active_row:
             if self.active_row != -1: self.update_row_color(self.active_row)
@@ -341,6 +416,77 @@ class LyricsEditorWindow(QDialog):
                 self.table.scrollToItem(self.table.item(self.active_row, 1), 
                                         QTableWidget.ScrollHint.EnsureVisible)
 
+    # -------------------------------------------------------------
+    # [NUOVO] TIMESTAMP SUGGERITI (analisi offline)
+    # -------------------------------------------------------------
+
+    def suggest_timestamps(self):
+        """
+        Avvia l'analisi del brano in un processo separato (la UI resta reattiva) oppure,
+        se già disponibile, applica subito i suggerimenti alle righe senza timestamp.
+        """
+        if self._analisi is not None:
+            self._applica_suggerimenti()
+            return
+        if self._analisi_future is not None:
+            return
+
+        # Se il PCM è già in cache il processo lo legge dal file .npy invece di decodificare
+        pcm_path, pcm_sr = None, 0
+        in_cache = self.pcm_cache.ottieni(self.audio_file) if self.pcm_cache is not None else None
+        if in_cache is not None:
+            pcm_path, pcm_sr = getattr(in_cache[0], "filename", None), in_cache[1]
+
+        try:
+            if self._executor is None:
+                # 'spawn': il processo figlio non eredita lo stato di Qt e dei thread audio
+                self._executor = ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn"))
+            self._analisi_future = self._executor.submit(analizza_audio, self.audio_file, pcm_path, pcm_sr)
+        except Exception as e:
+            print(f"Errore avvio analisi audio: {e}")
+            return
+
+        self.btn_suggest.setEnabled(False)
+        self.btn_suggest.setText("Analisi in corso...")
+        QTimer.singleShot(ANALYSIS_POLL_MS, self._controlla_analisi)
+
+    def _controlla_analisi(self):
+        """Controlla il risultato dell'analisi senza bloccare la UI."""
+        future = self._analisi_future
+        if future is None:
+            return
+        if not future.done():
+            QTimer.singleShot(ANALYSIS_POLL_MS, self._controlla_analisi)
+            return
+
+        self._analisi_future = None
+        self.btn_suggest.setEnabled(True)
+        self.btn_suggest.setText("Suggerisci Timestamp 🎯")
+        try:
+            self._analisi = future.result()
+        except Exception as e:
+            print(f"Errore analisi audio di {self.audio_file}: {e}")
+            return
+        self._applica_suggerimenti()
+
+    def _applica_suggerimenti(self):
+        """Scrive nella tabella i timestamp proposti per le righe che non ne hanno uno."""
+        suggeriti = suggerisci_timestamp(self._analisi, self.text_lines, self.timestamps)
+        modificate = 0
+        for row, ts in enumerate(suggeriti[:len(self.timestamps)]):
+            if self.timestamps[row] > 0.0 or ts <= 0.0:
+                continue
+            self.timestamps[row] = ts
+            ts_item = self.table.item(row, 0)
+            if ts_item is not None:
+                ts_item.setText(f"{ts:.2f}")
+                ts_item.setToolTip("Timestamp suggerito: verificare in riproduzione")
+            modificate += 1
+
+        self._aggiorna_indice()
+        self.table.viewport().update()
+        print(f"Timestamp suggeriti per {modificate} righe.")
+
     def save_and_close(self):
         """Formattazione e chiusura del dialogo."""
         lyrics_result = []
@@ -2,8 +2,10 @@ import sys
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QApplication, QPushButton, QSizePolicy, QSlider, QComboBox, QDialog
 from PyQt6.QtCore import Qt, QTimer, QPropertyAnimation, QPoint, QEasingCurve 
 from PyQt6.QtGui import QFont, QScreen, QRegion, QFontMetrics
-from math import floor
+from math import floor, ceil
 import time
+from core.lyrics_timing import IndiceLyrics
+from engines.transport_clock import TransportClock, STATO_PLAY, STATO_PAUSA
 
 class LyricsPlayerWidget(QWidget): 
     """
@@ -15,8 +17,10 @@ class LyricsPlayerWidget(QWidget):
     FIXED_SPACING = 0
     MIN_VISIBLE_LINES = 3
     BASE_HEIGHT_FACTOR = 2.0
+    # Anticipo (s) con cui una riga diventa attiva rispetto al suo timestamp
+    LYRICS_SYNC_TOLERANCE_S = 0.05
     
-    def __init__(self, audio_engine, midi_engine, settings_manager, parent=None):
+    def __init__(self, audio_engine, midi_engine, settings_manager, parent=None, transport_clock: TransportClock | None = None):
         super().__init__(parent)
         self.setWindowTitle("Lyrics Prompter") 
         
@@ -26,7 +30,10 @@ class LyricsPlayerWidget(QWidget):
         self.audio_engine = audio_engine
         self.midi_engine = midi_engine
         self.settings = settings_manager 
+        # [NUOVO] Publisher del trasporto condiviso (ne crea uno proprio se non iniettato)
+        self.transport = transport_clock or TransportClock(audio_engine, settings_manager, self)
         self.lyrics_data = [] 
+        self.lyrics_index = IndiceLyrics([])
         
         self.active_line_index = -1
         self.is_fullscreen = False 
@@ -264,6 +271,7 @@ class LyricsPlayerWidget(QWidget):
             self.audio_engine.start_playback(current_song_name) 
             self.midi_engine.start_playback(current_song_name)
         
+        self.transport.aggiorna()
         self.update_playback_buttons()
         
     def _stop_playback(self):
@@ -273,6 +281,7 @@ class LyricsPlayerWidget(QWidget):
             self.audio_engine.stop_playback(current_song_name)
             self.midi_engine.stop_playback(current_song_name)
         
+        self.transport.aggiorna()
         self.update_playback_buttons()
 
     def _on_slider_release(self):
@@ -291,6 +300,7 @@ class LyricsPlayerWidget(QWidget):
             self.audio_engine.start_playback(current_song_name, start_time_s=target_time_s)
             self.midi_engine.start_playback(current_song_name) # Riavvia MIDI sync
             
+            self.transport.aggiorna()
             self.update_playback_buttons()
 
     def _on_slider_moved(self, value):
@@ -325,46 +335,59 @@ class LyricsPlayerWidget(QWidget):
 
 
     def setup_timer(self):
-        """Configura il timer per l'aggiornamento dei testi e della barra di trasporto."""
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.update_lyrics_display)
-        self.timer.timeout.connect(self._update_transport_state)
-        self.timer.start(50)
-
-    def _update_transport_state(self):
-        """Aggiorna lo slider e l'etichetta del tempo in base ad AudioEngine."""
-        current_song_name = self.audio_engine.playing_song
-        is_playing_or_paused = current_song_name is not None and (not self.audio_engine.is_stopped() or self.audio_engine.pause_time > 0.0)
-
-        if is_playing_or_paused:
-            current_time = self.audio_engine.get_current_time()
-            duration = self.audio_engine.get_duration()
-            
-            # Aggiorna il titolo
-            self.title_label.setText(f"Lyrics: {current_song_name}")
-
-            if duration > 0:
-                progress = int((current_time / duration) * 1000)
-                if not self.is_slider_pressed:
-                     self.progress_slider.setValue(progress)
-
-            time_str = self._format_time(current_time)
-            duration_str = self._format_time(duration)
-            self.time_label.setText(f"{time_str} / {duration_str}")
+        """
+        [MODIFICATO] Si iscrive al TransportClock invece di interrogare l'AudioEngine ogni 50 ms:
+        barra di trasporto e pulsanti si aggiornano solo su tick di posizione e cambi di stato.
+        """
+        self.transport.position_changed.connect(self._update_transport_position)
+        self.transport.state_changed.connect(self._update_transport_state)
+        self.transport.seeked.connect(lambda _pos: self.lyrics_timer.start(0))
+
+        # [NUOVO] Timer single shot delle lyrics: armato sul prossimo cambio di riga
+        self.lyrics_timer = QTimer(self)
+        self.lyrics_timer.setSingleShot(True)
+        self.lyrics_timer.timeout.connect(self.update_lyrics_display)
+        self.lyrics_timer.start(0)
+
+    def _update_transport_state(self, stato: str, song_name: str):
+        """Cambio di stato del trasporto: titolo, pulsanti e riga attiva."""
+        if stato in (STATO_PLAY, STATO_PAUSA):
+            self.title_label.setText(f"Lyrics: {song_name}")
         else:
             self.title_label.setText("Nessun Brano in Riproduzione")
-            
         self.update_playback_buttons()
+        self.lyrics_timer.start(0)
+
+    def _update_transport_position(self, current_time: float, duration: float):
+        """Aggiorna lo slider e l'etichetta del tempo (solo se il valore visualizzato cambia)."""
+        if duration > 0 and not self.is_slider_pressed:
+            progress = int((current_time / duration) * 1000)
+            if progress != self.progress_slider.value():
+                self.progress_slider.setValue(progress)
+
+        testo = f"{self._format_time(current_time)} / {self._format_time(duration)}"
+        if testo != self.time_label.text():
+            self.time_label.setText(testo)
         
 
     def update_lyrics_display(self):
-        """Aggiorna le lyrics in base al tempo di riproduzione (Master Clock: AudioEngine)."""
+        """
+        Aggiorna le lyrics in base al tempo di riproduzione (Master Clock: AudioEngine).
+        [MODIFICATO] Chiamata dal lyrics_timer (single shot), riarmato sul prossimo cambio di riga.
+        Pausa, seek e cambio brano arrivano dai segnali del TransportClock.
+        """
+        prossimo_s = self._sync_lyrics_display()
+        if prossimo_s is not None:
+            self.lyrics_timer.start(max(0, ceil(prossimo_s * 1000)))
+
+    def _sync_lyrics_display(self) -> float | None:
+        """Aggiorna la riga attiva; restituisce i secondi mancanti al prossimo cambio di riga (None se non previsto)."""
         
         current_time_s = self.audio_engine.get_current_time() 
         duration = self.audio_engine.get_duration()
         
         if not self.lyrics_data:
-             return
+             return None
         
         # Logica di stop fine brano
         if current_time_s >= duration and duration > 0 and self.audio_engine.is_stopped():
@@ -373,7 +396,7 @@ class LyricsPlayerWidget(QWidget):
                  self.lyrics_wrapper.move(0, self.target_offset_y)
              if self.current_line_label:
                  self.current_line_label.setText("Riproduzione Terminata...")
-             return
+             return None
              
         if self.audio_engine.is_stopped() and current_time_s < 0.1:
              self.active_line_index = -1
@@ -381,16 +404,12 @@ class LyricsPlayerWidget(QWidget):
                  self.lyrics_wrapper.move(0, self.target_offset_y)
              if self.current_line_label:
                  self.current_line_label.setText("Riproduzione Ferma...")
-             return
-             
-        sync_time_s = current_time_s + self.read_ahead_time 
+             return None
              
-        new_active_index = -1
-        for i, entry in enumerate(self.lyrics_data):
-            if entry['time'] <= sync_time_s + 0.05: 
-                new_active_index = i
-            else:
-                break
+        # [MODIFICATO] Ricerca binaria sui tempi ordinati (niente scansione delle righe a ogni tick)
+        sync_time_s = current_time_s + self.read_ahead_time + self.LYRICS_SYNC_TOLERANCE_S
+        new_active_index = self.lyrics_index.riga_attiva(sync_time_s)
+        prossimo = self.lyrics_index.prossimo_cambio(sync_time_s)
         
         if new_active_index != self.active_line_index:
             self.active_line_index = new_active_index
@@ -405,6 +424,10 @@ class LyricsPlayerWidget(QWidget):
         if self.external_window and self.external_window.isVisible():
             # Forza l'aggiornamento visivo (redraw) della finestra esterna
             self.external_window.update() 
+
+        if prossimo is None or self.audio_engine.is_stopped():
+            return None
+        return prossimo - sync_time_s
     
     def update_fixed_labels_count(self, target_count):
         """Aggiunge o rimuove i QLabel per adattarsi al numero di linee visibili (solo in Fixed Mode)."""
@@ -463,6 +486,7 @@ class LyricsPlayerWidget(QWidget):
     def set_lyrics_data(self, lyrics_data: list[dict], song_name: str):
         """Aggiorna i dati dei lyrics e la UI, ricaricando i QLabel se necessario."""
         self.lyrics_data = sorted(lyrics_data, key=lambda x: x['time'])
+        self.lyrics_index = IndiceLyrics([entry['time'] for entry in self.lyrics_data])
         self.active_line_index = -1
         self.setWindowTitle(f"Lyrics Prompter - {song_name}")
         self.title_label.setText(f"Lyrics: {song_name}")
@@ -476,7 +500,8 @@ class LyricsPlayerWidget(QWidget):
         self.apply_settings()
         self.resize_and_reposition_wrapper(force=True)
         
-        self.update_lyrics_display()
+        # Il timer single shot era armato sull'indice precedente: lo riarma sui nuovi dati
+        self.lyrics_timer.start(0)
 
     def resizeEvent(self, event):
         """Ricalcola le dimensioni del viewport e del wrapper al ridimensionamento."""
@@ -511,6 +536,9 @@ class LyricsPlayerWidget(QWidget):
         
         saved_screen_name = self.settings.data.get("lyrics_prompter_screen", None)
         self._toggle_external_window(saved_screen_name)
+
+        # La scadenza del timer dipende da read_ahead_time: la ricalcola con il nuovo valore
+        self.lyrics_timer.start(0)
         
     def resize_and_reposition_wrapper(self, force=False):
         """
@@ -683,8 +711,7 @@ class LyricsPlayerWidget(QWidget):
 
     def closeEvent(self, event):
         """Gestione della chiusura. Chiude la finestra esterna se è aperta."""
-        if self.timer.isActive():
-            self.timer.stop()
+        self.lyrics_timer.stop()
         
         if self.external_window:
              self.external_window.close()
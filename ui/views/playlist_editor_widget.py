@@ -6,9 +6,11 @@ from PyQt6.QtWidgets import (
 )
 from PyQt6.QtCore import Qt, QMimeData, QTimer, QPoint 
 from PyQt6.QtGui import QMouseEvent
+import threading
 # Import adattato
 from ui.views.lyrics_player_window import LyricsPlayerWidget # RIFATTORIZZATO A WIDGET
 from core.data_manager import DataManager
+from engines.transport_clock import TransportClock, STATO_PLAY, STATO_PAUSA, STATO_FINE
 
 class PlaylistListWidget(QListWidget):
     """QListWidget customizzato per accettare il drag and drop di nomi di canzoni e riordinare."""
@@ -55,15 +57,18 @@ class PlaylistListWidget(QListWidget):
 
 class PlaylistEditorWidget(QWidget):
     
-    PLAYLIST_SYNC_INTERVAL_MS = 200
+    # [NUOVO] Ritardo dall'avvio di un brano alla preparazione del successivo (lascia partire prima il corrente)
+    PRELOAD_DELAY_MS = 2000
     
-    def __init__(self, playlist_name, audio_engine, midi_engine, data_manager, settings_manager, lyrics_player_widget: LyricsPlayerWidget | None = None, parent=None):
+    def __init__(self, playlist_name, audio_engine, midi_engine, data_manager, settings_manager, lyrics_player_widget: LyricsPlayerWidget | None = None, video_engine=None, video_player_widget=None, parent=None, transport_clock: TransportClock | None = None):
         super().__init__(parent)
         self.playlist_name = playlist_name
         self.audio_engine = audio_engine
         self.midi_engine = midi_engine
         self.data_manager = data_manager
         self.settings_manager = settings_manager
+        self.video_engine = video_engine
+        self.video_player = video_player_widget
         
         self.is_playing_playlist = False
         self.autoplay_enabled = False 
@@ -79,9 +84,10 @@ class PlaylistEditorWidget(QWidget):
         self.init_ui()
         self.load_playlist_songs()
         
-        self.playback_timer = QTimer(self)
-        self.playback_timer.timeout.connect(self.update_playback_state)
-        self.playback_timer.start(self.PLAYLIST_SYNC_INTERVAL_MS)
+        # [MODIFICATO] Slider, tempo e autoplay seguono i segnali del TransportClock (niente polling)
+        self.transport = transport_clock or TransportClock(audio_engine, settings_manager, self)
+        self.transport.position_changed.connect(self.update_playback_position)
+        self.transport.state_changed.connect(self.update_playback_state)
 
     def open_lyrics_prompter_on_init(self):
          """Avvia la finestra LyricsPlayerWindow all'inizializzazione con i dati del primo brano."""
@@ -249,7 +255,8 @@ class PlaylistEditorWidget(QWidget):
             self.midi_engine.tracks[song_name] = []
             
             for t in audio_tracks:
-                self.audio_engine.add_track(song_name, t['file'], t['output'], t.get('channels_used'), t.get('output_start_channel'))
+                self.audio_engine.add_track(song_name, t['file'], t['output'], t.get('channels_used'), t.get('output_start_channel'),
+                                            gain_db=t.get('gain_db'), mute=t.get('mute', False), solo=t.get('solo', False))
             for t in midi_tracks:
                 self.midi_engine.add_track(song_name, t['channel'], t['port'], file_path=t.get('file'))
             
@@ -257,14 +264,49 @@ class PlaylistEditorWidget(QWidget):
             
             if self.lyrics_player:
                  self.lyrics_player.set_lyrics_data(lyrics_data, song_name)
+
+            # Carica il video nel player per la sincronizzazione (come nel SongEditor)
+            if self.video_player:
+                 self.video_player.load_video_track(song_name, song_data.get("video_file"))
             
+        audio_tracks = self.data_manager.audio_tracks.get(song_name, [])
         bpm = audio_tracks[0].get('bpm', 120.0) if audio_tracks else 120.0
 
         self.audio_engine.start_playback(song_name, start_time_s)
         self.midi_engine.start_playback(song_name, bpm=bpm)
         
+        self.transport.aggiorna()
         self.update_playback_buttons()
+
+        if not is_resuming:
+            QTimer.singleShot(self.PRELOAD_DELAY_MS, lambda: self._prepara_brano_successivo(song_name))
         return True
+
+    def _prepara_brano_successivo(self, current_song_name):
+        """
+        [NUOVO] Pre-warm del brano successivo della playlist mentre il corrente suona:
+        metadati, apertura e decodifica dei primi secondi di audio e analisi dei file MIDI
+        avvengono in background; il video viene caricato dal QMediaPlayer in modo asincrono.
+        """
+        if self.audio_engine.playing_song != current_song_name:
+            return # Nel frattempo il brano è cambiato o la riproduzione è ferma
+        next_index = self.current_song_index + 1
+        if not (0 < next_index < len(self.playlist_songs)):
+            return
+
+        next_song_name = self.playlist_songs[next_index]
+        song_data = self.data_manager.load_song(next_song_name)
+        if not song_data:
+            return
+
+        self.audio_engine.prepara_brano(next_song_name, song_data.get("audio_tracks", []))
+
+        midi_files = [t.get("file") for t in song_data.get("midi_tracks", []) if t.get("file")]
+        if midi_files:
+            threading.Thread(target=self.midi_engine.prepara_file, args=(midi_files,), daemon=True).start()
+
+        if self.video_engine:
+            self.video_engine.prepare_video(song_data.get("video_file"))
         
     def pause_playback(self):
         """Mette in pausa la riproduzione e memorizza la posizione."""
@@ -272,6 +314,7 @@ class PlaylistEditorWidget(QWidget):
         if current_song_name and not self.audio_engine.is_stopped():
             self.audio_engine.pause_playback(current_song_name)
             self.midi_engine.pause_playback(current_song_name)
+            self.transport.aggiorna()
             self.update_playback_buttons()
 
     def next_song(self):
@@ -345,6 +388,7 @@ class PlaylistEditorWidget(QWidget):
         if current_song_name:
             self.audio_engine.stop_playback(current_song_name)
             self.midi_engine.stop_playback(current_song_name)
+            self.transport.aggiorna()
             
         if reset_state:
             self.is_playing_playlist = False
@@ -402,37 +446,42 @@ class PlaylistEditorWidget(QWidget):
         self.btn_lyrics.setEnabled((is_playing or is_currently_paused) and has_lyrics)
 
 
-    def update_playback_state(self):
-        """Aggiorna la barra di avanzamento e gestisce la transizione tra brani (Autoplay)."""
-        
-        current_song_name = self.audio_engine.playing_song
-        is_playing = current_song_name is not None and not self.audio_engine.is_stopped()
-
-        if is_playing or self.audio_engine.pause_time > 0.0:
-            current_time = self.audio_engine.get_current_time()
-            duration = self.audio_engine.get_duration()
-
-            if duration > 0:
-                progress = int((current_time / duration) * 1000)
-                if not self.is_slider_pressed:
-                     self.progress_slider.setValue(progress)
+    def update_playback_position(self, current_time: float, duration: float):
+        """[MODIFICATO] Tick di posizione del TransportClock: barra di avanzamento ed etichetta del tempo."""
+        if self.transport.stato not in (STATO_PLAY, STATO_PAUSA):
+            return
 
-            time_str = self._format_time(current_time)
-            duration_str = self._format_time(duration)
-            self.time_label.setText(f"{time_str} / {duration_str}")
+        if duration > 0:
+            progress = int((current_time / duration) * 1000)
+            if not self.is_slider_pressed and progress != self.progress_slider.value():
+                 self.progress_slider.setValue(progress)
+
+        testo = f"{self._format_time(current_time)} / {self._format_time(duration)}"
+        if testo != self.time_label.text():
+            self.time_label.setText(testo)
+
+        # Gestione Fine Brano e Transizione Playlist (FIX Autoplay)
+        if (self.autoplay_enabled and self.is_playing_playlist and self.transport.stato == STATO_PLAY
+                and current_time >= duration and duration > 0):
+            self._avanza_playlist()
+
+    def update_playback_state(self, stato: str, song_name: str):
+        """[MODIFICATO] Cambio di stato del TransportClock: pulsanti e transizione tra brani (Autoplay)."""
+        if stato == STATO_FINE and self.autoplay_enabled and self.is_playing_playlist:
+            # Fine brano segnalata dall'engine (lo stream resta aperto in silenzio)
+            self._avanza_playlist()
+        else:
+            self.update_playback_buttons()
 
-            # Gestione Fine Brano e Transizione Playlist (FIX Autoplay)
-            if self.autoplay_enabled and self.is_playing_playlist and is_playing and current_time >= duration and duration > 0:
-                self.current_song_index += 1
-                if self.current_song_index < len(self.playlist_songs):
-                    next_song_name = self.playlist_songs[self.current_song_index]
-                    self.play_song(next_song_name)
-                    self.playlist_list.setCurrentRow(self.current_song_index)
-                else:
-                    self.stop_playback()
-
-        elif self.audio_engine.playing_song is not None and self.audio_engine.is_stopped():
-             self.update_playback_buttons()
+    def _avanza_playlist(self):
+        """Passa al brano successivo in modalità Autoplay (o ferma la playlist se era l'ultimo)."""
+        self.current_song_index += 1
+        if self.current_song_index < len(self.playlist_songs):
+            next_song_name = self.playlist_songs[self.current_song_index]
+            self.play_song(next_song_name)
+            self.playlist_list.setCurrentRow(self.current_song_index)
+        else:
+            self.stop_playback()
 
 
     def _format_time(self, seconds):
@@ -509,5 +558,11 @@ class PlaylistEditorWidget(QWidget):
          self.update_playback_buttons()
          
     def closeEvent(self, event):
+         # Il TransportClock è condiviso e sopravvive all'editor: scollega i segnali
+         try:
+             self.transport.position_changed.disconnect(self.update_playback_position)
+             self.transport.state_changed.disconnect(self.update_playback_state)
+         except TypeError:
+             pass
          self.stop_playback()
          event.accept()
\ No newline at end of file
@@ -11,6 +11,7 @@ from PyQt6.QtCore import Qt, QMimeData
 from engines.audio_engine import AudioEngine
 from engines.midi_engine import MidiEngine
 from engines.video_engine import VideoEngine # IMPORT AGGIUNTO
+from engines.transport_clock import TransportClock
 from core.data_manager import DataManager as ScenografiaDataManager
 from ui.components.settings_manager import SettingsManager
 from ui.views.lyrics_player_window import LyricsPlayerWidget 
@@ -37,7 +38,7 @@ class SongListWidget(QListWidget):
 
 
 class ScenografiaDAWWidget(QWidget):
-    def __init__(self, audio_engine: AudioEngine, midi_engine: MidiEngine, video_engine: VideoEngine, data_manager: ScenografiaDataManager, settings_manager: SettingsManager, lyrics_player_widget: LyricsPlayerWidget, video_player_widget: VideoPlayerWidget, parent=None):
+    def __init__(self, audio_engine: AudioEngine, midi_engine: MidiEngine, video_engine: VideoEngine, data_manager: ScenografiaDataManager, settings_manager: SettingsManager, lyrics_player_widget: LyricsPlayerWidget, video_player_widget: VideoPlayerWidget, parent=None, transport_clock: TransportClock | None = None):
         super().__init__(parent)
         self.audio_engine = audio_engine
         self.midi_engine = midi_engine
@@ -46,6 +47,8 @@ class ScenografiaDAWWidget(QWidget):
         self.settings_manager = settings_manager
         self.lyrics_player_widget = lyrics_player_widget 
         self.video_player_widget = video_player_widget # AGGIUNTO
+        self.transport_clock = transport_clock # Publisher del trasporto condiviso con gli editor
+        self.dmx_controller = None # [NUOVO] DMXController del tab Fixtures (assegnato da main.py)
         self.current_editor = None 
 
         self.init_ui()
@@ -114,7 +117,8 @@ class ScenografiaDAWWidget(QWidget):
     # --- Metodi di gestione (Adattati per QWidget) ---
     def open_settings(self):
         """Apre la finestra di dialogo delle impostazioni audio/MIDI/Display."""
-        dlg = SettingsDialog(self.audio_engine, self.midi_engine, self.settings_manager)
+        dlg = SettingsDialog(self.audio_engine, self.midi_engine, self.settings_manager,
+                             dmx_controller=self.dmx_controller)
         dlg.exec()
 
     def load_lists(self):
@@ -137,7 +141,8 @@ class ScenografiaDAWWidget(QWidget):
             self.settings_manager,
             lyrics_player_widget=self.lyrics_player_widget, # INJECTED
             video_engine=self.video_engine, # INJECTED
-            video_player_widget=self.video_player_widget # INJECTED
+            video_player_widget=self.video_player_widget, # INJECTED
+            transport_clock=self.transport_clock
         )
         self.show_editor(editor)
 
@@ -152,7 +157,8 @@ class ScenografiaDAWWidget(QWidget):
             self.settings_manager,
             lyrics_player_widget=self.lyrics_player_widget, # INJECTED
             video_engine=self.video_engine, # INJECTED
-            video_player_widget=self.video_player_widget # INJECTED
+            video_player_widget=self.video_player_widget, # INJECTED
+            transport_clock=self.transport_clock
         )
         self.show_editor(editor)
 
@@ -2,7 +2,8 @@
 
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QHBoxLayout, QLabel, QListWidget,
-    QPushButton, QFileDialog, QComboBox, QInputDialog, QMessageBox, QDoubleSpinBox, QLineEdit 
+    QPushButton, QFileDialog, QComboBox, QInputDialog, QMessageBox, QDoubleSpinBox, QLineEdit,
+    QGridLayout, QCheckBox, QProgressBar
 )
 from PyQt6.QtCore import Qt, QTimer
 import soundfile as sf
@@ -14,17 +15,26 @@ from ui.components.midi_monitor_widget import MidiMonitorWidget
 # Import Engine e Player Video
 from engines.video_engine import VideoEngine 
 from ui.views.video_player_widget import VideoPlayerWidget 
-from core.data_manager import DataManager, INTERNAL_DMX_PORT # [MODIFICATO] Importa INTERNAL_DMX_PORT
+from engines.transport_clock import TransportClock, STATO_PLAY
+from core.data_manager import DataManager, INTERNAL_DMX_PORT, DEFAULT_TRACK_GAIN_DB # [MODIFICATO] Importa INTERNAL_DMX_PORT
 
 
 # [RIMOSSA LA RIDEFINIZIONE DELLA COSTANTE]
 
+# [NUOVO] Intervallo di aggiornamento dei meter del mixer (ms) e scala visualizzata (dBFS)
+METER_POLL_MS = 50
+METER_MIN_DB = -60.0
+# Decadimento del picco visualizzato (dB per aggiornamento)
+METER_DECAY_DB = 1.5
+# [NUOVO] Ritardo (ms) del salvataggio del brano dopo l'ultima modifica del guadagno (evita una scrittura per step)
+MIX_SAVE_DELAY_MS = 500
+
 
 class SongEditorWidget(QWidget):
     """
     Widget per la configurazione e l'editing di una singola canzone.
     """
-    def __init__(self, song_name, audio_engine, midi_engine, data_manager, settings_manager=None, lyrics_player_widget: LyricsPlayerWidget | None = None, video_engine: VideoEngine | None = None, video_player_widget: VideoPlayerWidget | None = None):
+    def __init__(self, song_name, audio_engine, midi_engine, data_manager, settings_manager=None, lyrics_player_widget: LyricsPlayerWidget | None = None, video_engine: VideoEngine | None = None, video_player_widget: VideoPlayerWidget | None = None, transport_clock: TransportClock | None = None):
         super().__init__()
         self.song_name = song_name
         self.audio_engine = audio_engine
@@ -40,9 +50,28 @@ class SongEditorWidget(QWidget):
         self.video_engine = video_engine
         self.video_player = video_player_widget
 
+        # [NUOVO] Controlli del mixer per traccia: [(spin gain, check mute, check solo, meter)]
+        self.mixer_rows = []
+        self._meter_picchi = []
+        # Il guadagno viene applicato subito all'engine; il file del brano viene scritto a modifica conclusa
+        self.mix_save_timer = QTimer(self)
+        self.mix_save_timer.setSingleShot(True)
+        self.mix_save_timer.timeout.connect(self._salva_mix)
+        self._mix_da_salvare = False
+
         self.init_ui()
         self.load_song()
 
+        self.meter_timer = QTimer(self)
+        self.meter_timer.timeout.connect(self.update_meters)
+        # [MODIFICATO] Con il TransportClock i meter vengono letti solo mentre questo brano suona
+        self.transport = transport_clock
+        if self.transport is not None:
+            self.transport.state_changed.connect(self._aggiorna_timer_meter)
+            self._aggiorna_timer_meter(self.transport.stato, self.transport.brano)
+        else:
+            self.meter_timer.start(METER_POLL_MS)
+
     def open_lyrics_prompter_on_init(self):
          """Avvia la finestra LyricsPlayerWindow all'inizializzazione con i dati del brano."""
          self.open_lyrics_prompter(force_show=True)
@@ -84,6 +113,10 @@ class SongEditorWidget(QWidget):
         btn_audio_layout.addWidget(self.btn_edit_audio_output)
         main_layout.addLayout(btn_audio_layout)
 
+        # --- [NUOVO] MIXER (gain/mute/solo e meter per traccia) ---
+        self.mixer_layout = QGridLayout()
+        main_layout.addLayout(self.mixer_layout)
+
         # --- MIDI TRACKS ---
         self.midi_label = QLabel("Tracce MIDI")
         main_layout.addWidget(self.midi_label)
@@ -222,7 +255,10 @@ class SongEditorWidget(QWidget):
                 t['file'], 
                 t.get("output"), 
                 channels_used=track_channels_used, 
-                output_start_channel=output_start_channel
+                output_start_channel=output_start_channel,
+                gain_db=t.get("gain_db", DEFAULT_TRACK_GAIN_DB),
+                mute=t.get("mute", False),
+                solo=t.get("solo", False)
             )
 
             channel_range = f"{output_start_channel}"
@@ -239,6 +275,8 @@ class SongEditorWidget(QWidget):
                 f"{file_name} -> Output: {output_name} ({output_channels_count} ch) | Canali Sorgente Usati: {track_channels_used} -> Output Ch: {channel_range}{bpm_info}"
             )
 
+        self._build_mixer(audio_tracks)
+
         # --- MIDI LIST ---
         self.midi_list.clear()
         self.data_manager.midi_tracks[self.song_name] = song_data.get("midi_tracks", [])
@@ -283,6 +321,95 @@ class SongEditorWidget(QWidget):
         self.update_playback_buttons()
 
 
+    # -------------------------------------------------------------
+    # MIXER E METER
+    # -------------------------------------------------------------
+    def _build_mixer(self, audio_tracks):
+        """[NUOVO] Ricostruisce una riga del mixer (gain, mute, solo, meter) per ogni traccia audio."""
+        while self.mixer_layout.count():
+            item = self.mixer_layout.takeAt(0)
+            if item.widget():
+                item.widget().deleteLater()
+        self.mixer_rows = []
+        self._meter_picchi = [METER_MIN_DB] * len(audio_tracks)
+
+        for i, t in enumerate(audio_tracks):
+            spin_gain = QDoubleSpinBox()
+            spin_gain.setRange(-60.0, 12.0)
+            spin_gain.setSingleStep(0.5)
+            spin_gain.setDecimals(1)
+            spin_gain.setSuffix(" dB")
+            spin_gain.setValue(t.get("gain_db", DEFAULT_TRACK_GAIN_DB))
+            spin_gain.valueChanged.connect(lambda value, idx=i: self.set_track_mix(idx, gain_db=value))
+            spin_gain.editingFinished.connect(self._salva_mix)
+
+            check_mute = QCheckBox("M")
+            check_mute.setChecked(t.get("mute", False))
+            check_mute.toggled.connect(lambda checked, idx=i: self.set_track_mix(idx, mute=checked))
+
+            check_solo = QCheckBox("S")
+            check_solo.setChecked(t.get("solo", False))
+            check_solo.toggled.connect(lambda checked, idx=i: self.set_track_mix(idx, solo=checked))
+
+            meter = QProgressBar()
+            meter.setRange(int(METER_MIN_DB), 0)
+            meter.setValue(int(METER_MIN_DB))
+            meter.setTextVisible(False)
+
+            self.mixer_layout.addWidget(QLabel(t['file'].split(os.sep)[-1]), i, 0)
+            self.mixer_layout.addWidget(spin_gain, i, 1)
+            self.mixer_layout.addWidget(check_mute, i, 2)
+            self.mixer_layout.addWidget(check_solo, i, 3)
+            self.mixer_layout.addWidget(meter, i, 4)
+            self.mixer_rows.append((spin_gain, check_mute, check_solo, meter))
+
+    def set_track_mix(self, index, gain_db=None, mute=None, solo=None):
+        """
+        [NUOVO] Applica subito al mixer dell'engine e salva nel brano gain/mute/solo della traccia.
+        Le variazioni di guadagno (trascinamento, rotella, frecce) vengono salvate con un debounce.
+        """
+        self.audio_engine.set_track_mix(self.song_name, index, gain_db=gain_db, mute=mute, solo=solo)
+        solo_guadagno = mute is None and solo is None
+        self.data_manager.update_audio_track_mix(self.song_name, index, gain_db=gain_db, mute=mute, solo=solo,
+                                                 salva=not solo_guadagno)
+        self._mix_da_salvare = solo_guadagno
+        if solo_guadagno:
+            self.mix_save_timer.start(MIX_SAVE_DELAY_MS)
+        else:
+            self.mix_save_timer.stop()
+
+    def _salva_mix(self):
+        """Salva il brano se ci sono modifiche di guadagno non ancora scritte."""
+        self.mix_save_timer.stop()
+        if self._mix_da_salvare:
+            self._mix_da_salvare = False
+            self.data_manager.save_song(self.song_name)
+
+    def update_meters(self):
+        """[NUOVO] Legge i livelli pubblicati dal callback audio e aggiorna i meter (picco con decadimento)."""
+        if not self.mixer_rows:
+            return
+        livelli = []
+        if getattr(self.audio_engine, 'playing_song', None) == self.song_name:
+            livelli = self.audio_engine.get_track_levels()
+
+        for i, (_, _, _, meter) in enumerate(self.mixer_rows):
+            picco_db, rms_db = livelli[i] if i < len(livelli) else (METER_MIN_DB, METER_MIN_DB)
+            self._meter_picchi[i] = max(picco_db, self._meter_picchi[i] - METER_DECAY_DB)
+            meter.setValue(int(max(METER_MIN_DB, self._meter_picchi[i])))
+            meter.setToolTip(f"Picco: {picco_db:.1f} dBFS | RMS: {rms_db:.1f} dBFS")
+
+    def _aggiorna_timer_meter(self, stato: str, song_name: str):
+        """Avvia il polling dei meter in riproduzione; da fermo lo sospende e azzera i meter."""
+        if stato == STATO_PLAY and song_name == self.song_name:
+            if not self.meter_timer.isActive():
+                self.meter_timer.start(METER_POLL_MS)
+            return
+        self.meter_timer.stop()
+        self._meter_picchi = [METER_MIN_DB] * len(self._meter_picchi)
+        for _, _, _, meter in self.mixer_rows:
+            meter.setValue(int(METER_MIN_DB))
+
     def save_song(self):
         """Salva tutti i dati della canzone, inclusi i lyrics aggiornati."""
         lyrics_data, txt_file = self.data_manager.get_lyrics_with_txt(self.song_name)
@@ -715,7 +842,8 @@ class SongEditorWidget(QWidget):
             audio_file=audio_file,
             text_lines=lines,
             timestamps=timestamps,
-            parent=self
+            parent=self,
+            pcm_cache=self.data_manager.pcm_cache
         )
 
         if editor.exec():
@@ -810,5 +938,12 @@ class SongEditorWidget(QWidget):
         self.update_playback_buttons()
         
     def closeEvent(self, event):
+         self._salva_mix()
+         self.meter_timer.stop()
+         if self.transport is not None:
+             try:
+                 self.transport.state_changed.disconnect(self._aggiorna_timer_meter)
+             except TypeError:
+                 pass
          self.stop_playback()
          super().closeEvent(event)
\ No newline at end of file
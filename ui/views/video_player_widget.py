@@ -9,13 +9,14 @@ from engines.video_engine import VideoEngine
 from engines.audio_engine import AudioEngine 
 from core.data_manager import DataManager 
 from ui.components.settings_manager import SettingsManager 
+from engines.transport_clock import TransportClock, STATO_PLAY
 
 class VideoPlayerWidget(QWidget):
     """
     Widget che visualizza la riproduzione video sincronizzata.
     Contiene un QVideoWidget e gestisce la traccia video tramite VideoEngine.
     """
-    def __init__(self, video_engine: VideoEngine, audio_engine: AudioEngine, settings_manager: SettingsManager, parent=None):
+    def __init__(self, video_engine: VideoEngine, audio_engine: AudioEngine, settings_manager: SettingsManager, parent=None, transport_clock: TransportClock | None = None):
         super().__init__(parent)
         self.video_engine = video_engine
         self.audio_engine = audio_engine
@@ -26,10 +27,12 @@ class VideoPlayerWidget(QWidget):
         
         self.init_ui()
         
-        # Timer per la sincronizzazione continua
-        self.sync_timer = QTimer(self)
-        self.sync_timer.timeout.connect(self.sync_playback_state)
-        self.sync_timer.start(50) # Sync a 20 FPS
+        # [MODIFICATO] Sincronizzazione guidata dal TransportClock invece di un timer a 50 ms:
+        # i cambi di stato e i seek riallineano il video, i tick di posizione correggono la deriva
+        self.transport = transport_clock or TransportClock(audio_engine, settings_manager, self)
+        self.transport.state_changed.connect(self.sync_playback_state)
+        self.transport.seeked.connect(self.sync_playback_state)
+        self.transport.position_changed.connect(self.sync_playback_position)
 
         
     def init_ui(self):
@@ -125,28 +128,27 @@ class VideoPlayerWidget(QWidget):
             
         print(f"--- Video Load End ---") # Debug: End Load
 
-    def sync_playback_state(self):
-        """Sincronizza lo stato di riproduzione (Play/Stop/Seek) con AudioEngine."""
+    def sync_playback_state(self, *_):
+        """Sincronizza lo stato di riproduzione (Play/Stop/Seek) con quello pubblicato dal TransportClock."""
         
         has_video_track = bool(self.video_engine.videos)
         
         # Condizioni iniziali
-        if not self.audio_engine.playing_song or not has_video_track:
+        if not self.transport.brano or not has_video_track:
             if has_video_track and self.video_engine.videos[0].player.playbackState() != self.video_engine.videos[0].player.PlaybackState.StoppedState:
                  self.video_engine.stop()
                  self.video_engine.seek(0)
                  self.status_label.setText(f"Video in Stop: {self.current_video_path.split('/')[-1]}")
                  self.status_label.show()
                  print("DEBUG SYNC: Audio stopped or song ended. Stopping video player.") # Debug: Stop
-            elif not has_video_track and self.audio_engine.playing_song and self.current_video_path is None:
+            elif not has_video_track and self.transport.brano and self.current_video_path is None:
                  self.status_label.setText("Nessun video associato al brano.")
                  self.status_label.show()
             return
             
-        current_time_ms = int(self.audio_engine.get_current_time() * 1000)
-        is_playing = self.audio_engine.playing_song is not None and not self.audio_engine.is_stopped()
+        current_time_ms = int(self.transport.posizione * 1000)
         
-        if is_playing:
+        if self.transport.stato == STATO_PLAY:
             self.video_engine.sync_to_position(current_time_ms)
             self.video_engine.play()
             self.status_label.hide()
@@ -155,4 +157,11 @@ class VideoPlayerWidget(QWidget):
             self.video_engine.pause()
             self.video_engine.sync_to_position(current_time_ms)
             self.status_label.setText(f"Video in Pausa: {self.current_video_path.split('/')[-1]}")
-            self.status_label.show()
\ No newline at end of file
+            self.status_label.show()
+
+    def sync_playback_position(self, posizione: float, durata: float):
+        """Tick di posizione in riproduzione: corregge la deriva del video (tolleranza in VideoEngine)."""
+        if self.transport.stato == STATO_PLAY and self.video_engine.videos:
+            self.video_engine.sync_to_position(int(posizione * 1000))
+            self.video_engine.play()
+            self.status_label.hide()